@@ -361,26 +361,22 @@ def api_bot_stop():
 def api_statistics():
     """API: Статистика системы"""
     try:
-        # Здесь должна быть реальная статистика из базы данных
-        # Пока возвращаем заглушку
+        # Заявки считаются по сверткам (день, ОКЭ, направление, должность) без просмотра заявок
+        applications = {"total": 0, "today": 0, "this_week": 0, "this_month": 0}
+        popular_directions = []
+        if ExcelIntegration is not None:
+            rollups = ExcelIntegration(data_dir="data").get_rollup_statistics()
+            applications = rollups["applications"]
+            popular_directions = rollups["popular_directions"]
+
         stats = {
-            "applications": {
-                "total": 156,
-                "today": 12,
-                "this_week": 89,
-                "this_month": 156
-            },
+            "applications": applications,
             "users": {
                 "total": 45,
                 "active_today": 23,
                 "active_this_week": 38
             },
-            "popular_directions": [
-                {"name": "Москва", "count": 45},
-                {"name": "Санкт-Петербург", "count": 32},
-                {"name": "Красноярск", "count": 28},
-                {"name": "Сочи", "count": 15}
-            ],
+            "popular_directions": popular_directions,
             "system_health": {
                 "bot_uptime": "2 дня 5 часов",
                 "last_error": None,
@@ -777,6 +773,21 @@ def api_restore_backup():
 
 # ==================== API ДЛЯ РАБОТЫ С ЗАЯВКАМИ ====================
 
+def _admin_application(app):
+    """Преобразует заявку ExcelIntegration в формат админ панели"""
+    app_id = app.get('ID заявки', '')
+    return {
+        "id": int(app_id) if app_id.isdigit() else None,
+        "status": app.get('Статус') or 'pending',
+        "full_name": app.get('ФИО', ''),
+        "direction": app.get('Направление', ''),
+        "created_at": app.get('Время подачи заявки', ''),
+        "departure_date": app.get('Информация о рейсе', '').split()[0] if app.get('Информация о рейсе') else '',
+        "position": app.get('Должность', ''),
+        "tab_num": app.get('Табельный номер', ''),
+        "oke": app['oke']
+    }
+
 @app.route('/api/applications', methods=['GET'])
 def api_get_applications():
     """API: Получение списка заявок из реальных данных"""
@@ -793,38 +804,32 @@ def api_get_applications():
         
         print(f"🔍 Ищем заявки в директории: {os.path.join(os.path.dirname(__file__), 'data')}")
         
-        # Получаем заявки из всех ОКЭ
-        for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']:
-            try:
-                print(f"📋 Читаем заявки из {oke}...")
-                applications = excel_integration.read_applications(oke)
-                print(f"📊 Найдено {len(applications)} заявок в {oke}")
-                
-                for i, app in enumerate(applications):
-                    # Преобразуем данные в формат для админ панели
-                    all_applications.append({
-                        "id": f"{oke}_{i+1}",
-                        "full_name": app.get('ФИО', ''),
-                        "direction": app.get('Направление', ''),
-                        "created_at": app.get('Время подачи заявки', ''),
-                        "departure_date": app.get('Информация о рейсе', '').split()[0] if app.get('Информация о рейсе') else '',
-                        "position": app.get('Должность', ''),
-                        "tab_num": app.get('Табельный номер', ''),
-                        "oke": oke
-                    })
-            except Exception as e:
-                print(f"❌ Ошибка чтения заявок из {oke}: {e}")
-                continue
+        # Заявки закрытых периодов лежат в архиве и показываются только по запросу
+        include_archive = request.args.get('include_archive') == '1'
+
+        # Фильтры отбираются по тем же битовым индексам, что и поиск SmartApp
+        oke = request.args.get('oke', '')
+        filters = {field: request.args.get(field, '') for field in ('status', 'position', 'direction')}
+
+        # Номер ленты изменений берем до чтения: изменения во время чтения придут повторно, а не потеряются
+        seq = excel_integration.get_changes_seq()
+
+        # Заявки сразу идут от новых к старым по индексу времени подачи
+        for app in excel_integration.iter_all_applications([oke] if oke else None,
+                                                           request.args.get('date_from', ''),
+                                                           request.args.get('date_to', ''),
+                                                           include_archive=include_archive,
+                                                           newest_first=True, filters=filters):
+            # Преобразуем данные в формат для админ панели
+            all_applications.append(_admin_application(app))
         
         print(f"✅ Всего заявок найдено: {len(all_applications)}")
         
-        # Сортируем по дате создания (новые сначала)
-        all_applications.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        
         return jsonify({
             "success": True,
             "applications": all_applications,
-            "total": len(all_applications)
+            "total": len(all_applications),
+            "seq": seq
         })
     except Exception as e:
         return jsonify({
@@ -832,11 +837,57 @@ def api_get_applications():
             "error": f"Ошибка получения заявок: {str(e)}"
         })
 
+@app.route('/api/applications/changes', methods=['GET'])
+def api_get_application_changes():
+    """API: Изменения заявок после номера ленты since
+
+    Параметры: since - номер из предыдущего ответа (или seq из /api/applications),
+    wait - сколько секунд ждать изменений, если их еще нет (не больше 30),
+    limit - максимальное количество изменений в ответе.
+    При reset=true изменений после since в ленте уже нет: список нужно загрузить заново.
+    """
+    try:
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return jsonify({
+                "success": False,
+                "error": "Не указан номер since"
+            }), 400
+        wait = min(max(request.args.get('wait', 0, type=float), 0), 30)
+        limit = min(max(request.args.get('limit', 1000, type=int), 1), 10000)
+
+        if ExcelIntegration is None:
+            return jsonify({
+                "success": False,
+                "error": "ExcelIntegration не доступен"
+            })
+
+        excel_integration = ExcelIntegration(data_dir="data")
+        result = excel_integration.get_changes(since, limit, wait)
+        changes = []
+        for change in result["changes"]:
+            item = {"seq": change["seq"], "op": change["op"], "id": change["id"], "at": change["at"]}
+            if "application" in change:
+                item["application"] = _admin_application({**change["application"], "oke": change["oke"]})
+            changes.append(item)
+
+        return jsonify({
+            "success": True,
+            "changes": changes,
+            "last_seq": result["last_seq"],
+            "reset": result["reset"]
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Ошибка получения изменений заявок: {str(e)}"
+        })
+
 @app.route('/api/applications/<int:app_id>/status', methods=['PUT'])
 def api_update_application_status(app_id):
     """API: Обновление статуса заявки"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         new_status = data.get('status')
         
         if not new_status:
@@ -844,9 +895,25 @@ def api_update_application_status(app_id):
                 "success": False,
                 "error": "Статус не указан"
             })
-        
-        # Здесь должна быть логика обновления статуса в базе данных
-        # Пока просто возвращаем успех
+
+        if ExcelIntegration is None:
+            return jsonify({
+                "success": False,
+                "error": "ExcelIntegration не доступен"
+            })
+
+        excel_integration = ExcelIntegration(data_dir="data")
+        result = excel_integration.update_application_statuses({app_id: new_status})
+        if result["invalid"]:
+            return jsonify({
+                "success": False,
+                "error": f"Недопустимый статус '{new_status}'"
+            }), 400
+        if result["not_found"]:
+            return jsonify({
+                "success": False,
+                "error": f"Заявка #{app_id} не найдена"
+            }), 404
         
         return jsonify({
             "success": True,
@@ -858,6 +925,56 @@ def api_update_application_status(app_id):
             "error": f"Ошибка обновления статуса: {str(e)}"
         })
 
+@app.route('/api/applications/status', methods=['POST'])
+def api_update_application_statuses():
+    """API: Пакетное обновление статусов заявок
+
+    Тело запроса: {"updates": [{"id": 1, "status": "approved"}, ...]}
+    или {"ids": [1, 2, 3], "status": "rejected"} для одного статуса на все заявки.
+    """
+    try:
+        data = request.get_json() or {}
+        updates = {}
+        try:
+            if 'updates' in data:
+                for item in data['updates']:
+                    updates[int(item['id'])] = item.get('status')
+            else:
+                for app_id in data.get('ids', []):
+                    updates[int(app_id)] = data.get('status')
+        except (TypeError, ValueError, KeyError):
+            return jsonify({
+                "success": False,
+                "error": "Некорректный формат запроса: нужны updates [{id, status}] или ids и status"
+            }), 400
+
+        if not updates:
+            return jsonify({
+                "success": False,
+                "error": "Не указаны заявки"
+            }), 400
+
+        if ExcelIntegration is None:
+            return jsonify({
+                "success": False,
+                "error": "ExcelIntegration не доступен"
+            })
+
+        excel_integration = ExcelIntegration(data_dir="data")
+        result = excel_integration.update_application_statuses(updates)
+        return jsonify({
+            "success": True,
+            "updated": len(result["updated"]),
+            "updated_ids": result["updated"],
+            "not_found": result["not_found"],
+            "invalid": result["invalid"]
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Ошибка обновления статусов: {str(e)}"
+        })
+
 @app.route('/api/applications/export', methods=['POST'])
 def api_export_applications():
     """API: Экспорт заявок в Excel"""
@@ -868,7 +985,6 @@ def api_export_applications():
         # Создаем Excel файл
         import openpyxl
         from openpyxl.styles import Font, PatternFill, Alignment
-        import datetime
         
         # Создаем новую книгу Excel
         wb = openpyxl.Workbook()
@@ -900,33 +1016,29 @@ def api_export_applications():
         excel_integration = ExcelIntegration(data_dir="data")
         applications = []
         
-        # Получаем заявки из всех ОКЭ
-        for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']:
-            try:
-                oke_applications = excel_integration.read_applications(oke)
-                for i, app in enumerate(oke_applications):
-                    # Преобразуем дату в формат дд.мм.гггг
-                    created_date = app.get('Время подачи заявки', '')
-                    if created_date:
-                        try:
-                            # Парсим дату из формата "2024-01-15 10:30:00"
-                            dt = datetime.datetime.strptime(created_date.split()[0], '%Y-%m-%d')
-                            created_date = dt.strftime('%d.%m.%Y')
-                        except:
-                            created_date = created_date.split()[0] if ' ' in created_date else created_date
-                    
-                    departure_date = app.get('Информация о рейсе', '').split()[0] if app.get('Информация о рейсе') else ''
-                    
-                    applications.append({
-                        'id': f"{oke}_{i+1}",
-                        'full_name': app.get('ФИО', ''),
-                        'direction': app.get('Направление', ''),
-                        'created_at': created_date,
-                        'departure_date': departure_date
-                    })
-            except Exception as e:
-                print(f"Ошибка чтения заявок из {oke}: {e}")
-                continue
+        # Получаем заявки из всех ОКЭ (включая архив закрытых периодов) за один потоковый проход
+        for app in excel_integration.iter_all_applications(include_archive=True):
+            # Преобразуем дату в формат дд.мм.гггг
+            created_date = app.get('Время подачи заявки', '')
+            if created_date:
+                parts = created_date.split()
+                day = parts[0] if parts else ''
+                # Дата в формате "2024-01-15 10:30:00" переставляется без разбора в datetime
+                if len(day) == 10 and day[4] == '-' and day[7] == '-':
+                    created_date = f"{day[8:10]}.{day[5:7]}.{day[:4]}"
+                else:
+                    created_date = day
+            
+            flight_parts = app.get('Информация о рейсе', '').split()
+            departure_date = flight_parts[0] if flight_parts else ''
+            
+            applications.append({
+                'id': app.get('ID заявки', ''),
+                'full_name': app.get('ФИО', ''),
+                'direction': app.get('Направление', ''),
+                'created_at': created_date,
+                'departure_date': departure_date
+            })
         
         # Записываем данные
         for row, app in enumerate(applications, 2):
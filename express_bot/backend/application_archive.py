@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Архив заявок закрытых периодов приема
+Неизменяемые сегменты gzip JSONL со сводкой по каждому сегменту в манифесте
+"""
+
+import os
+import gzip
+import json
+import fcntl
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from application_index import ApplicationRollups
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRNAME = "archive"
+ARCHIVE_MANIFEST_FILENAME = "manifest.json"
+
+# Строка архива: (ОКЭ, значения колонок в порядке ExcelIntegration.headers)
+ArchivedApplication = Tuple[str, List[str]]
+
+class ApplicationArchive:
+    """
+    Холодное хранилище заявок закрытых периодов
+
+    Перенос заявки в архив выполняется в два шага: сегмент записывается
+    и попадает в манифест незавершенным, затем заявки удаляются из рабочего
+    источника и сегмент отмечается завершенным. Читатели видят только
+    завершенные сегменты, поэтому заявка не бывает одновременно в обоих местах,
+    а после сбоя между шагами удаление просто повторяется.
+    """
+
+    MANIFEST_VERSION = 1
+    # Сколько распакованных сегментов держать в памяти
+    CACHE_SEGMENTS = 4
+
+    def __init__(self, archive_dir: str, id_column: int):
+        """
+        Args:
+            archive_dir: Директория сегментов и манифеста
+            id_column: Номер колонки идентификатора заявки (с нуля)
+        """
+        self.archive_dir = archive_dir
+        self.id_column = id_column
+        self.manifest_path = os.path.join(archive_dir, ARCHIVE_MANIFEST_FILENAME)
+        self.lock_path = f"{self.manifest_path}.lock"
+        self.lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_signature: Optional[Tuple[int, int, int]] = None
+        self._cache: "OrderedDict[str, List[ArchivedApplication]]" = OrderedDict()
+        # Свертки завершенных сегментов: (идентификаторы сегментов, свертки)
+        self._rollups: Tuple[Tuple[str, ...], Optional[ApplicationRollups]] = ((), None)
+        os.makedirs(archive_dir, exist_ok=True)
+
+    # ==================== МАНИФЕСТ ====================
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Возвращает манифест, перечитывая файл только после его замены"""
+        try:
+            st = os.stat(self.manifest_path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self.lock:
+            if self._manifest is not None and signature == self._manifest_signature:
+                return self._manifest
+            if signature is None:
+                manifest = {"version": self.MANIFEST_VERSION, "segments": []}
+            else:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            self._manifest = manifest
+            self._manifest_signature = signature
+            return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Атомарно записывает манифест (вызывается под блокировкой записи)"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        with self.lock:
+            self._manifest = None
+
+    @contextmanager
+    def write_lock(self):
+        """Межпроцессная блокировка переноса заявок в архив"""
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def segments(self, committed_only: bool = True) -> List[Dict[str, Any]]:
+        """
+        Сегменты архива в порядке создания
+
+        Args:
+            committed_only: Только завершенные сегменты (видимые читателям)
+
+        Returns:
+            Копии записей манифеста
+        """
+        return [dict(segment) for segment in self._load_manifest()["segments"]
+                if segment["committed"] or not committed_only]
+
+    # ==================== ЗАПИСЬ ====================
+
+    def _summarize(self, rows: List[ArchivedApplication]) -> Dict[str, Any]:
+        """
+        Сводка сегмента: количество заявок по ОКЭ и дням, ячейки сверток,
+        границы времени подачи и идентификаторов
+        """
+        by_oke: Dict[str, int] = {}
+        by_day: Dict[str, int] = {}
+        ids = []
+        submitted = []
+        rollups = ApplicationRollups()
+        for oke, row in rows:
+            rollups.add(oke, row)
+            by_oke[oke] = by_oke.get(oke, 0) + 1
+            day = row[0][:10]
+            if len(day) == 10:
+                by_day[day] = by_day.get(day, 0) + 1
+            if row[0]:
+                submitted.append(row[0])
+            if row[self.id_column].isdigit():
+                ids.append(int(row[self.id_column]))
+        return {
+            "by_oke": by_oke,
+            "by_day": by_day,
+            "first_submitted": min(submitted, default=""),
+            "last_submitted": max(submitted, default=""),
+            "min_id": min(ids, default=None),
+            "max_id": max(ids, default=None),
+            "rollups": [[*key, count] for key, count in rollups.cells.items()]
+        }
+
+    def write_segment(self, period: Dict[str, str], rows: List[ArchivedApplication]) -> Dict[str, Any]:
+        """
+        Записывает сегмент и добавляет его в манифест незавершенным (вызывается под write_lock)
+
+        Args:
+            period: Период приема: id, name, start, end (ISO)
+            rows: Заявки периода
+
+        Returns:
+            Запись манифеста о сегменте
+        """
+        manifest = json.loads(json.dumps(self._load_manifest()))
+        number = sum(1 for segment in manifest["segments"] if segment["period_id"] == period["id"]) + 1
+        segment_id = f"{period['id']}-{number}"
+        filename = "".join(c if c.isalnum() or c in "-_" else "_" for c in segment_id) + ".jsonl.gz"
+        path = os.path.join(self.archive_dir, filename)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as f:
+                for oke, row in rows:
+                    f.write((json.dumps({"oke": oke, "row": row}, ensure_ascii=False) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+
+        segment = {
+            "id": segment_id,
+            "period_id": period["id"],
+            "period_name": period.get("name", ""),
+            "start": period["start"],
+            "end": period["end"],
+            "file": filename,
+            "rows": len(rows),
+            "bytes": os.path.getsize(path),
+            "created_at": datetime.now().isoformat(),
+            "committed": False,
+            "summary": self._summarize(rows)
+        }
+        manifest["segments"].append(segment)
+        self._save_manifest(manifest)
+        logger.info(f"🧊 Записан архивный сегмент {segment_id}: {len(rows)} заявок, {segment['bytes']} байт")
+        return segment
+
+    def commit_segment(self, segment_id: str):
+        """Отмечает сегмент завершенным после удаления его заявок из рабочего источника (под write_lock)"""
+        manifest = json.loads(json.dumps(self._load_manifest()))
+        for segment in manifest["segments"]:
+            if segment["id"] == segment_id:
+                segment["committed"] = True
+        self._save_manifest(manifest)
+
+    # ==================== ЧТЕНИЕ ====================
+
+    def read_segment(self, segment: Dict[str, Any]) -> List[ArchivedApplication]:
+        """Распаковывает сегмент (последние прочитанные сегменты кэшируются)"""
+        with self.lock:
+            cached = self._cache.get(segment["id"])
+            if cached is not None:
+                self._cache.move_to_end(segment["id"])
+                return cached
+
+        with gzip.open(os.path.join(self.archive_dir, segment["file"]), "rb") as f:
+            rows = []
+            for line in f:
+                record = json.loads(line)
+                rows.append((record["oke"], record["row"]))
+
+        with self.lock:
+            self._cache[segment["id"]] = rows
+            while len(self._cache) > self.CACHE_SEGMENTS:
+                self._cache.popitem(last=False)
+        return rows
+
+    def iter_rows(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None) -> Iterator[ArchivedApplication]:
+        """
+        Перебирает архивные заявки, открывая только подходящие по сводке сегменты
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+
+        Returns:
+            Генератор пар (ОКЭ, значения колонок)
+        """
+        date_to_end = f"{date_to} 23:59:59" if date_to else None
+        for segment in self.segments():
+            summary = segment["summary"]
+            if okes is not None and not any(oke in summary["by_oke"] for oke in okes):
+                continue
+            if date_from and summary["last_submitted"] and summary["last_submitted"] < date_from:
+                continue
+            if date_to_end and summary["first_submitted"] and summary["first_submitted"] > date_to_end:
+                continue
+            for oke, row in self.read_segment(segment):
+                if okes is not None and oke not in okes:
+                    continue
+                if date_from and row[0] < date_from:
+                    continue
+                if date_to_end and row[0] > date_to_end:
+                    continue
+                yield oke, row
+
+    def rollups(self) -> ApplicationRollups:
+        """Свертки архивных заявок из сводок сегментов (пересобираются только при появлении новых сегментов)"""
+        segments = self.segments()
+        key = tuple(segment["id"] for segment in segments)
+        with self.lock:
+            if self._rollups[1] is not None and self._rollups[0] == key:
+                return self._rollups[1]
+        rollups = ApplicationRollups()
+        for segment in segments:
+            cells = segment["summary"].get("rollups")
+            if cells is None:
+                # Сегмент записан до появления сверток в сводке
+                cells = ApplicationRollups()
+                for oke, row in self.read_segment(segment):
+                    cells.add(oke, row)
+                rollups.add_cells(cells.cells.items())
+            else:
+                rollups.add_cells((tuple(cell[:4]), cell[4]) for cell in cells)
+        with self.lock:
+            self._rollups = (key, rollups)
+        return rollups
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        Счетчики архивных заявок по сводкам сегментов, без распаковки
+
+        Returns:
+            Словарь с ключами total, by_oke, by_day, by_month
+        """
+        totals = {"total": 0, "by_oke": {}, "by_day": {}, "by_month": {}}
+        for segment in self.segments():
+            totals["total"] += segment["rows"]
+            for oke, count in segment["summary"]["by_oke"].items():
+                totals["by_oke"][oke] = totals["by_oke"].get(oke, 0) + count
+            for day, count in segment["summary"]["by_day"].items():
+                totals["by_day"][day] = totals["by_day"].get(day, 0) + count
+                totals["by_month"][day[:7]] = totals["by_month"].get(day[:7], 0) + count
+        return totals
+
+
+# Архивы общие для всех экземпляров ExcelIntegration в процессе
+_archives: Dict[str, ApplicationArchive] = {}
+_archives_lock = threading.Lock()
+
+def get_application_archive(archive_dir: str, id_column: int) -> ApplicationArchive:
+    """
+    Возвращает общий для процесса архив заявок
+
+    Args:
+        archive_dir: Директория архива
+        id_column: Номер колонки идентификатора заявки
+
+    Returns:
+        Экземпляр ApplicationArchive
+    """
+    key = os.path.abspath(archive_dir)
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = ApplicationArchive(key, id_column)
+        return _archives[key]
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Лента изменений заявок (change data capture)
+Каждая запись заявки получает номер, растущий без пропусков во всех процессах;
+потребители запрашивают только изменения после известного им номера
+"""
+
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Операции ленты
+CHANGE_INSERT = "insert"  # новая заявка
+CHANGE_UPDATE = "update"  # изменена существующая заявка (например, статус)
+CHANGE_DELETE = "delete"  # заявка убрана из рабочего набора (перенесена в архив)
+
+class ApplicationChangeFeed:
+    """
+    Журнал изменений заявок в файле JSONL, общий для всех процессов
+
+    Номер следующей записи определяется под flock по последней записи файла,
+    поэтому процессы, пишущие заявки независимо, не выдают одинаковых номеров.
+    Запись данных выполняется внутри recording() под той же блокировкой, что и
+    запись ленты: порядок номеров совпадает с порядком записей, а подтвержденная
+    запись не может оказаться без своего изменения в ленте.
+    Хранится только хвост ленты: потребитель, отставший сильнее, получает
+    признак сброса и перечитывает список заявок целиком.
+    """
+
+    # Интервал проверки файла при ожидании изменений других процессов (секунды)
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, path: str, retain: int = 10000):
+        """
+        Args:
+            path: Путь к файлу ленты
+            retain: Сколько последних записей хранить (файл обрезается при двукратном превышении)
+        """
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.retain = retain
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        # Запись данных и ленты; читатели ее не ждут
+        self.write_lock = threading.Lock()
+        # Хвост ленты: номера идут подряд, позиция записи - seq минус номер первой
+        self._records: List[Dict[str, Any]] = []
+        self._file_records = 0
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._last_seq = 0
+
+    def _refresh_locked(self):
+        """Дочитывает записи, добавленные в файл с прошлого чтения (вызывается под self.lock)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._records.clear()
+            self._file_records = self._offset = self._last_seq = 0
+            self._inode = None
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # Файл обрезан или создан заново: читаем с начала
+            self._records.clear()
+            self._file_records = self._offset = 0
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(st.st_size - self._offset)
+        # Недописанную строку оставляем до следующего чтения
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            record = json.loads(line)
+            self._records.append(record)
+            self._file_records += 1
+            self._last_seq = record["seq"]
+        self._offset += len(complete)
+        self._forget_locked()
+
+    def _forget_locked(self):
+        """Отбрасывает из памяти записи старше хранимого хвоста (раз в retain записей)"""
+        if len(self._records) > 2 * self.retain:
+            del self._records[:-self.retain]
+
+    @contextmanager
+    def _exclusive(self):
+        """Блокировка записи ленты в процессе и между процессами"""
+        with self.write_lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def recording(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Критическая секция записи заявок
+
+        Внутри выполняется запись данных, а ее изменения добавляются в выдаваемый
+        список; при выходе без исключения они дописываются в ленту с fsync до снятия
+        блокировки. Ошибка записи ленты не отменяет уже выполненную запись данных.
+
+        Returns:
+            Список, в который добавляются изменения (словари как в append)
+        """
+        with self._exclusive():
+            changes: List[Dict[str, Any]] = []
+            yield changes
+            if changes:
+                try:
+                    self._write_locked(changes)
+                except OSError as e:
+                    logger.error(f"❌ Ошибка записи ленты изменений заявок: {e}")
+
+    def append(self, changes: List[Dict[str, Any]]) -> int:
+        """
+        Дописывает изменения в ленту
+
+        Args:
+            changes: Словари с ключами op, id и, для insert/update, oke и row
+
+        Returns:
+            Номер последней записанной записи
+        """
+        if not changes:
+            return self.last_seq()
+        with self._exclusive():
+            return self._write_locked(changes)
+
+    def _write_locked(self, changes: List[Dict[str, Any]]) -> int:
+        """Дописывает изменения в файл ленты с fsync (вызывается под _exclusive)"""
+        with self.lock:
+            self._refresh_locked()
+            at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            records = []
+            for seq, change in enumerate(changes, self._last_seq + 1):
+                records.append({"seq": seq, "at": at, **change})
+            data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Память обновляется только после успешной записи файла
+            self._records.extend(records)
+            self._last_seq = records[-1]["seq"]
+            if self._inode is None:
+                self._inode = os.stat(self.path).st_ino
+            self._offset += len(data)
+            self._file_records += len(records)
+            if self._file_records > 2 * self.retain:
+                self._trim_locked()
+            self._forget_locked()
+            self.condition.notify_all()
+            return self._last_seq
+
+    def _trim_locked(self):
+        """Оставляет в файле только хранимый хвост ленты (под self.lock и _exclusive)"""
+        tail = self._records[-self.retain:]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for record in tail:
+                f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        st = os.stat(self.path)
+        self._records = tail
+        self._inode, self._offset, self._file_records = st.st_ino, st.st_size, len(tail)
+
+    def last_seq(self) -> int:
+        """Номер последней записи ленты (0, если лента пуста)"""
+        with self.lock:
+            self._refresh_locked()
+            return self._last_seq
+
+    def changes_since(self, since: int, limit: int = 1000) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Изменения после указанного номера
+
+        Args:
+            since: Последний номер, известный потребителю
+            limit: Максимальное количество записей в ответе
+
+        Returns:
+            Записи (по возрастанию номера), номер, с которого продолжать, и признак сброса:
+            если он установлен, записей после since уже нет в ленте и список нужно перечитать
+        """
+        with self.lock:
+            self._refresh_locked()
+            first_seq = self._records[0]["seq"] if self._records else self._last_seq + 1
+            if since > self._last_seq or since < first_seq - 1:
+                return [], self._last_seq, True
+            # Номера в хвосте идут подряд, поэтому позиция вычисляется по номеру, срез - O(limit)
+            start = since - first_seq + 1
+            records = self._records[start:start + limit]
+            return records, records[-1]["seq"] if records else since, False
+
+    def wait(self, since: int, timeout: float) -> bool:
+        """
+        Ждет появления записей после указанного номера (long-poll)
+
+        Args:
+            since: Последний номер, известный потребителю
+            timeout: Максимальное время ожидания (секунды)
+
+        Returns:
+            True если новые записи появились
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self._refresh_locked()
+                if self._last_seq != since:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                # Записи этого процесса будят сразу, записи других процессов видны при проверке файла
+                self.condition.wait(min(remaining, self.POLL_INTERVAL))
+
+
+# Ленты общие для всех экземпляров ExcelIntegration в процессе
+_feeds: Dict[str, ApplicationChangeFeed] = {}
+_feeds_lock = threading.Lock()
+
+def get_change_feed(path: str) -> ApplicationChangeFeed:
+    """
+    Возвращает общую для процесса ленту изменений
+
+    Args:
+        path: Путь к файлу ленты
+
+    Returns:
+        Экземпляр ApplicationChangeFeed
+    """
+    key = os.path.abspath(path)
+    with _feeds_lock:
+        if key not in _feeds:
+            _feeds[key] = ApplicationChangeFeed(key)
+        return _feeds[key]
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Кэш разобранных заявок с индексами в памяти
+Общий для всех экземпляров ExcelIntegration в процессе, перечитывает источник только после его изменения
+"""
+
+import os
+import time
+import logging
+import threading
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from application_journal import StatusEntry
+from application_store import DATA_COLUMNS
+from application_index import ApplicationCounters, ApplicationFacets, ApplicationRollups
+from search_index import (BitmapIndex, FuzzyNameIndex, QueryResultCache, TimestampIndex, TrigramIndex,
+                          iter_bits, normalize_text, parse_day)
+from columnar_engine import ColumnarApplications
+
+logger = logging.getLogger(__name__)
+
+ALL_OKES = ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']
+
+# Служебные колонки после данных заявки: идентификатор и статус
+ID_COLUMN = DATA_COLUMNS
+STATUS_COLUMN = DATA_COLUMNS + 1
+
+# Колонки, по которым ведется полнотекстовый поиск: ФИО, табельный номер, должность, направление, рейс
+SEARCH_COLUMNS = [1, 2, 3, 4, 5]
+
+# Колонка ФИО для нечеткого поиска с опечатками
+NAME_COLUMN = 1
+
+# Поля битовых индексов отбора: ОКЭ, должность, направление, статус
+BITMAP_FIELDS = ("oke", "position", "direction", "status")
+
+# Сколько последних поисковых запросов хранить в кэше результатов (0 - кэш отключен)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "32"))
+
+def bitmap_values(oke: str, row: List[str]) -> Tuple[str, str, str, str]:
+    """Значения полей битовых индексов строки в порядке BITMAP_FIELDS"""
+    return oke, row[3].strip(), row[4].strip(), row[STATUS_COLUMN].strip()
+
+def matches_filters(oke: str, row: List[str], filters: Optional[Dict[str, str]]) -> bool:
+    """Проверяет фильтры по полям битовых индексов для строки вне кэша (например, архивной)"""
+    if not filters:
+        return True
+    values = dict(zip(BITMAP_FIELDS, bitmap_values(oke, row)))
+    return all(normalize_text(value) in normalize_text(values[field]) for field, value in filters.items() if value)
+
+def group_value(field: str, oke: str, row: List[str]) -> str:
+    """Значение поля группировки для строки заявки ('' - заявка в группировку не попадает)"""
+    if field == "day" or field == "month":
+        submitted_at = row[0]
+        if len(submitted_at) < 10 or submitted_at[4:5] != "-":
+            return ""
+        return submitted_at[:10] if field == "day" else submitted_at[:7]
+    return bitmap_values(oke, row)[BITMAP_FIELDS.index(field)]
+
+def order_key(item: Tuple[str, List[str]]) -> Tuple[str, int]:
+    """Ключ порядка заявок по времени подачи: (время подачи, идентификатор заявки)"""
+    return item[1][0], order_id(item[1])
+
+def relevance_key(pair: Tuple[int, Tuple[str, List[str]]]) -> Tuple[int, Tuple[str, int]]:
+    """Ключ выдачи нечеткого поиска по убыванию: сначала меньшая оценка, затем новые заявки"""
+    return -pair[0], order_key(pair[1])
+
+def order_id(row: List[str]) -> int:
+    """Идентификатор заявки для упорядочивания (0 для заявок без идентификатора)"""
+    return parse_id(row[ID_COLUMN]) or 0
+
+def parse_id(value) -> Optional[int]:
+    """Идентификатор заявки из значения ячейки ('' - идентификатор еще не присвоен)"""
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+# Версия источника данных: версии его частей (мастер-файл, журнал, хранилище)
+DatasetValidator = Dict[str, object]
+
+class ApplicationDataset:
+    """
+    Разобранные заявки, общие для всех экземпляров ExcelIntegration в процессе
+
+    Данные перечитываются, только если изменилась версия источника (в том числе
+    после записи другим процессом). Записи текущего процесса применяются
+    в памяти без повторного разбора файла.
+    """
+
+    def __init__(self, load: Callable[[], Tuple[List[str], Dict[str, List[List[str]]]]],
+                 validate: Callable[[], DatasetValidator]):
+        """
+        Args:
+            load: Функция, читающая (список листов, строки по ОКЭ) из источника
+            validate: Функция, возвращающая текущую версию источника
+        """
+        self.load = load
+        self.validate = validate
+        self.lock = threading.RLock()
+        self.validator: Optional[DatasetValidator] = None
+        self.sheetnames: List[str] = []
+        self.rows: Dict[str, List[List[str]]] = {}
+        # Индекс идентификаторов: id -> (ОКЭ, позиция строки в self.rows[ОКЭ])
+        self.locations: Dict[int, Tuple[str, int]] = {}
+        # Все строки подряд; позиция в списке - номер строки в индексах поиска
+        self.entries: List[Tuple[str, List[str]]] = []
+        # Индекс триграмм строится при первом поиске после загрузки
+        self._text_index: Optional[TrigramIndex] = None
+        # Индекс нечеткого поиска по ФИО, тоже строится при первом обращении
+        self._name_index: Optional[FuzzyNameIndex] = None
+        # Время подачи разбирается один раз при загрузке и записи строки
+        self._time_index = TimestampIndex()
+        # Битовые карты строк по ОКЭ, должности, направлению и статусу
+        self._bitmaps = BitmapIndex(BITMAP_FIELDS)
+        # Номер строки в self.entries по идентификатору заявки
+        self.row_numbers: Dict[int, int] = {}
+        # Поколение данных: растет при каждом изменении кэша (перечитывание, запись, удаление)
+        self.generation = 0
+        # Колоночное представление: строится при первом обращении, дальше дополняется записями
+        self._columnar: Optional[ColumnarApplications] = None
+        # Место строки в порядке "новые сначала" и поколение, для которого оно посчитано
+        self._order_ranks: Optional[Tuple[int, array]] = None
+        self.counters = ApplicationCounters()
+        self.rollups = ApplicationRollups()
+        self.facets = ApplicationFacets()
+        # Результаты поиска по условиям запроса, действительные для поколения данных
+        self.search_results = QueryResultCache(SEARCH_CACHE_SIZE)
+
+    def ensure_fresh(self):
+        """Перечитывает источник, если его версия изменилась"""
+        # Версию снимаем до чтения: запись во время чтения приведет к повторному чтению
+        current = self.validate()
+        with self.lock:
+            if current == self.validator:
+                return
+            sheetnames, rows = self.load()
+            self.sheetnames = sheetnames
+            self.rows = rows
+            self._reindex_locked()
+            self._columnar = None
+            self.counters.rebuild(self.entries)
+            self.rollups.rebuild(self.entries)
+            self.facets.rebuild(self.entries)
+            self.validator = current
+            self.generation += 1
+            logger.info(f"📚 Данные заявок загружены в кэш: {self.counters.count()} заявок")
+
+    def _reindex_locked(self):
+        """Перестраивает индексы строк по self.rows (вызывается под блокировкой)"""
+        self.locations = {}
+        self.row_numbers = {}
+        self.entries = []
+        self._text_index = None
+        self._name_index = None
+        for oke, oke_rows in self.rows.items():
+            for index, row in enumerate(oke_rows):
+                self._index_row(oke, index, row)
+                self.entries.append((oke, row))
+        self._time_index.rebuild((row[0], order_id(row)) for _, row in self.entries)
+        self._bitmaps.rebuild(bitmap_values(oke, row) for oke, row in self.entries)
+
+    def _index_row(self, oke: str, index: int, row: List[str]):
+        """Добавляет строку в индекс идентификаторов (вызывается под блокировкой до добавления в entries)"""
+        app_id = parse_id(row[ID_COLUMN])
+        if app_id is not None:
+            self.locations[app_id] = (oke, index)
+            self.row_numbers[app_id] = len(self.entries)
+
+    def apply_local_write(self, part: str, before: object, after: object,
+                          rows: List[Tuple[str, List[str]]], statuses: Optional[List[StatusEntry]] = None):
+        """
+        Применяет запись текущего процесса к кэшу
+
+        Args:
+            part: Часть источника, в которую выполнена запись
+            before: Версия части до записи
+            after: Версия части после записи
+            rows: Записанные строки
+            statuses: Записанные смены статусов
+        """
+        with self.lock:
+            if self.validator is None or self.validator.get(part) != before:
+                # Между чтением и записью источник менял кто-то еще: перечитаем при обращении
+                self.validator = None
+                return
+            if self._columnar is not None:
+                self._columnar.append(rows)
+            for oke, row in rows:
+                if oke not in self.rows:
+                    self.rows[oke] = []
+                    if oke not in self.sheetnames:
+                        self.sheetnames.append(oke)
+                self.rows[oke].append(row)
+                self._index_row(oke, len(self.rows[oke]) - 1, row)
+                self._time_index.add(len(self.entries), row[0], order_id(row))
+                self._bitmaps.add(len(self.entries), bitmap_values(oke, row))
+                self.entries.append((oke, row))
+                if self._text_index is not None:
+                    self._text_index.add(len(self.entries) - 1, row)
+                if self._name_index is not None:
+                    self._name_index.add(len(self.entries) - 1, row)
+                self.counters.add(oke, row[0] if row else "")
+                self.rollups.add(oke, row)
+                self.facets.add(oke, row)
+            for _, app_id, status in statuses or []:
+                location = self.locations.get(app_id)
+                if location is not None:
+                    row = self.rows[location[0]][location[1]]
+                    self.facets.change_status(row[STATUS_COLUMN], status)
+                    self._bitmaps.change("status", self.row_numbers[app_id],
+                                         row[STATUS_COLUMN].strip(), status.strip())
+                    if self._columnar is not None:
+                        self._columnar.set_status(self.row_numbers[app_id], status)
+                    row[STATUS_COLUMN] = status
+            self.validator = {**self.validator, part: after}
+            self.generation += 1
+
+    def apply_local_remove(self, part: str, before: object, after: object, ids: set):
+        """
+        Применяет удаление заявок текущим процессом к кэшу без повторного чтения источника
+
+        Args:
+            part: Часть источника, из которой удалены заявки
+            before: Версия части до удаления
+            after: Версия части после удаления
+            ids: Идентификаторы удаленных заявок
+        """
+        with self.lock:
+            if self.validator is None or self.validator.get(part) != before:
+                self.validator = None
+                return
+            for oke, oke_rows in self.rows.items():
+                kept = []
+                for row in oke_rows:
+                    if parse_id(row[ID_COLUMN]) in ids:
+                        self.counters.remove(oke, row[0] if row else "")
+                        self.rollups.remove(oke, row)
+                        self.facets.remove(oke, row)
+                    else:
+                        kept.append(row)
+                if len(kept) != len(oke_rows):
+                    # Новый список: начатые обходы iter_rows дочитают прежний
+                    self.rows[oke] = kept
+            # Прежние номера строк, чтобы переставить колоночное представление вслед за кэшем
+            previous = {id(row): row_id for row_id, (_, row) in enumerate(self.entries)}
+            self._reindex_locked()
+            if self._columnar is not None:
+                self._columnar.reorder([previous[id(row)] for _, row in self.entries])
+            self.validator = {**self.validator, part: after}
+            self.generation += 1
+
+    def invalidate(self):
+        """Помечает кэш устаревшим"""
+        with self.lock:
+            self.validator = None
+
+    def iter_rows(self, okes: Optional[List[str]] = None) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Перебирает заявки из кэша
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+
+        Returns:
+            Генератор пар (ОКЭ, значения колонок)
+        """
+        self.ensure_fresh()
+        with self.lock:
+            order = okes if okes is not None else ALL_OKES + [oke for oke in self.rows if oke not in ALL_OKES]
+            # Списки только дополняются, поэтому достаточно запомнить их длину
+            snapshot = [(oke, self.rows[oke], len(self.rows[oke])) for oke in order if oke in self.rows]
+        for oke, oke_rows, length in snapshot:
+            for i in range(length):
+                yield oke, oke_rows[i]
+
+    def select(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+               date_to: Optional[str] = None, query: Optional[str] = None,
+               newest_first: bool = False,
+               filters: Optional[Dict[str, str]] = None) -> List[Tuple[str, List[str]]]:
+        """
+        Отбирает заявки по индексам: период подачи - двоичным поиском по времени,
+        текст - по индексу триграмм, ОКЭ и фильтры полей - пересечением битовых карт
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            query: Подстрока полей поиска (регистр и 'ё' не учитываются)
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+            newest_first: Упорядочить от новых к старым (иначе - от старых к новым,
+                а без периода и порядка - в порядке строк кэша)
+
+        Returns:
+            Пары (ОКЭ, значения колонок)
+        """
+        self.ensure_fresh()
+        with self.lock:
+            row_ids: Optional[List[int]] = None
+            if date_from or date_to or newest_first:
+                row_ids = self._time_index.select(date_from, date_to, newest_first)
+                if row_ids is None:
+                    # Некорректная граница периода: подходящих заявок нет
+                    return []
+            candidates = self._candidates_locked(okes, filters, query)
+            entries = self.entries
+            if candidates is None:
+                return [entries[row_id] for row_id in (row_ids if row_ids is not None else range(len(entries)))]
+            if row_ids is None:
+                return [entries[row_id] for row_id in sorted(candidates)]
+            return [entries[row_id] for row_id in row_ids if row_id in candidates]
+
+    def page(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, query: Optional[str] = None,
+             filters: Optional[Dict[str, str]] = None, after: Optional[Tuple[str, int]] = None,
+             limit: int = 20) -> Tuple[List[Tuple[str, List[str]]], bool, int, bool]:
+        """
+        Заявки от новых к старым после ключа курсора (keyset)
+
+        Индекс времени обходится в обратном порядке от ключа курсора, строки проверяются
+        по кандидатам запроса (ОКЭ, фильтры полей, текст), обход останавливается
+        на первой подходящей строке сверх limit. Кандидаты кэшируются до изменения данных,
+        поэтому следующие страницы запроса не отбираются заново.
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            query: Подстрока полей поиска (регистр и 'ё' не учитываются)
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+            after: Ключ (время подачи, идентификатор заявки) последней выданной заявки
+            limit: Сколько заявок вернуть
+
+        Returns:
+            (заявки, есть ли подходящие заявки дальше, количество заявок запроса,
+            точное ли количество) - без периода количество равно числу кандидатов,
+            с периодом оценивается сверху меньшим из числа кандидатов и строк периода
+        """
+        self.ensure_fresh()
+        with self.lock:
+            candidates = self._cached_candidates_locked(okes, filters, query)
+            total = self._time_index.count(date_from, date_to)
+            exact = candidates is None or not (date_from or date_to)
+            if candidates is not None:
+                total = min(total, len(candidates))
+            if total == 0:
+                return [], False, 0, True
+            entries = self.entries
+            found = []
+            for row_id in self._time_index.iter_newest(date_from, date_to, after):
+                if candidates is not None and row_id not in candidates:
+                    continue
+                if len(found) == limit:
+                    return found, True, total, exact
+                found.append(entries[row_id])
+            return found, False, total, exact
+
+    def _cached_candidates_locked(self, okes: Optional[List[str]], filters: Optional[Dict[str, str]],
+                                  query: Optional[str]) -> Optional[Set[int]]:
+        """Кандидаты запроса (см. _candidates_locked) из кэша результатов текущего поколения"""
+        if okes is None and not query and not any((filters or {}).values()):
+            return None
+        key = (
+            "candidates",
+            tuple(sorted(set(okes))) if okes is not None else None,
+            normalize_text(query or ""),
+            tuple(sorted((field, normalize_text(value)) for field, value in (filters or {}).items() if value))
+        )
+        candidates = self.search_results.get(key, self.generation)
+        if candidates is None:
+            candidates = self._candidates_locked(okes, filters, query)
+            self.search_results.put(key, self.generation, candidates)
+        return candidates
+
+    def select_columnar(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                        date_to: Optional[str] = None, query: Optional[str] = None,
+                        newest_first: bool = False,
+                        filters: Optional[Dict[str, str]] = None) -> List[Tuple[str, List[str]]]:
+        """
+        Отбирает заявки векторными операциями колоночного представления (аналог select)
+
+        Returns:
+            Пары (ОКЭ, значения колонок) в том же порядке, что и select
+        """
+        self.ensure_fresh()
+        with self.lock:
+            mask = self._columnar_mask_locked(okes, date_from, date_to, query, filters)
+            if mask is None:
+                return []
+            columnar = self._columnar
+            if newest_first:
+                row_ids = columnar.select(mask, newest_first=True)
+            elif date_from or date_to:
+                # Как и индекс времени, период отдается от старых к новым
+                row_ids = columnar.select(mask, newest_first=True)[::-1]
+            else:
+                row_ids = columnar.select(mask)
+            entries = self.entries
+            return [entries[row_id] for row_id in row_ids.tolist()]
+
+    def group_columnar(self, field: str, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, query: Optional[str] = None,
+                       filters: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        """
+        Количество заявок по значениям поля векторными операциями колоночного представления
+
+        Returns:
+            Значение поля -> количество заявок (без пустых значений)
+        """
+        self.ensure_fresh()
+        with self.lock:
+            mask = self._columnar_mask_locked(okes, date_from, date_to, query, filters)
+            if mask is None:
+                return {}
+            return self._columnar.group_counts(field, mask)
+
+    def _columnar_mask_locked(self, okes: Optional[List[str]], date_from: Optional[str],
+                              date_to: Optional[str], query: Optional[str],
+                              filters: Optional[Dict[str, str]]):
+        """
+        Маска строк колоночного представления под условия отбора
+
+        Колоночное представление строится при первом обращении после загрузки
+        и дальше поддерживается записями кэша; текстовый запрос по-прежнему
+        отбирается индексом триграмм.
+
+        Returns:
+            Маска строк или None при некорректной границе периода
+        """
+        if self._columnar is None:
+            started = time.monotonic()
+            self._columnar = ColumnarApplications(self.entries, ID_COLUMN, STATUS_COLUMN)
+            logger.info(f"🧮 Колоночное представление построено: {len(self.entries)} заявок "
+                        f"за {time.monotonic() - started:.2f} с")
+        for day in (date_from, date_to):
+            if day and parse_day(day) is None:
+                return None
+        row_ids = self._search_text_locked(query) if query else None
+        return self._columnar.mask(okes, date_from, date_to, filters, row_ids)
+
+    def _bitmap_locked(self, okes: Optional[List[str]], filters: Optional[Dict[str, str]]) -> Optional[int]:
+        """Битовая карта строк, подходящих под ОКЭ и фильтры полей (None, если условий нет)"""
+        bitmap: Optional[int] = None
+        if okes is not None:
+            bitmap = self._bitmaps.match("oke", values=okes)
+        for field, value in (filters or {}).items():
+            if value:
+                matched = self._bitmaps.match(field, substring=value)
+                bitmap = matched if bitmap is None else bitmap & matched
+        return bitmap
+
+    def _candidates_locked(self, okes: Optional[List[str]], filters: Optional[Dict[str, str]],
+                           query: Optional[str]) -> Optional[Set[int]]:
+        """
+        Номера строк, подходящих под ОКЭ, фильтры полей и текстовый запрос
+
+        Returns:
+            Множество номеров строк или None, если ни одного условия нет
+        """
+        bitmap = self._bitmap_locked(okes, filters)
+        candidates = set(iter_bits(bitmap)) if bitmap is not None else None
+        if query:
+            matched_rows = self._search_text_locked(query)
+            candidates = set(matched_rows) if candidates is None else candidates.intersection(matched_rows)
+        return candidates
+
+    def _search_text_locked(self, query: str) -> List[int]:
+        """Номера строк, подходящих под текстовый запрос (индекс строится при первом обращении)"""
+        if self._text_index is None:
+            started = time.monotonic()
+            self._text_index = TrigramIndex(SEARCH_COLUMNS)
+            for row_id, (_, row) in enumerate(self.entries):
+                self._text_index.add(row_id, row)
+            logger.info(f"🔎 Индекс поиска построен: {len(self.entries)} заявок, "
+                        f"{len(self._text_index.postings)} триграмм за {time.monotonic() - started:.2f} с")
+        return self._text_index.search(query)
+
+    def search_names(self, query: str, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None,
+                     filters: Optional[Dict[str, str]] = None) -> List[Tuple[int, Tuple[str, List[str]]]]:
+        """
+        Нечеткий поиск по ФИО с учетом опечаток и начала слова
+
+        Args:
+            query: Слова ФИО (регистр и 'ё' не учитываются)
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+
+        Returns:
+            Пары (оценка, (ОКЭ, значения колонок)) по возрастанию оценки (меньше - ближе
+            к запросу), при равной оценке - от новых к старым
+        """
+        self.ensure_fresh()
+        date_to_end = f"{date_to} 23:59:59" if date_to else None
+        with self.lock:
+            if self._name_index is None:
+                started = time.monotonic()
+                self._name_index = FuzzyNameIndex(NAME_COLUMN)
+                for row_id, (_, row) in enumerate(self.entries):
+                    self._name_index.add(row_id, row)
+                logger.info(f"🔎 Индекс ФИО построен: {len(self._name_index.words)} слов "
+                            f"за {time.monotonic() - started:.2f} с")
+            scores = self._name_index.search(query)
+            bitmap = self._bitmap_locked(okes, filters)
+            entries = self.entries
+            found = []
+            for row_id, score in scores.items():
+                if bitmap is not None and not bitmap >> row_id & 1:
+                    continue
+                row = entries[row_id][1]
+                if date_from and row[0] < date_from:
+                    continue
+                if date_to_end and row[0] > date_to_end:
+                    continue
+                found.append((score, row_id))
+            # Порядок "новые сначала" берется из индекса времени без разбора ключей строк
+            if self._order_ranks is None or self._order_ranks[0] != self.generation:
+                ranks = array("I", bytes(4 * len(entries)))
+                for rank, row_id in enumerate(self._time_index.select(newest_first=True)):
+                    ranks[row_id] = rank
+                self._order_ranks = (self.generation, ranks)
+            ranks = self._order_ranks[1]
+            size = len(entries)
+            found.sort(key=lambda pair: pair[0] * size + ranks[pair[1]])
+            return [(score, entries[row_id]) for score, row_id in found]
+
+    def has_sheet(self, oke: str) -> bool:
+        """Проверяет, есть ли лист ОКЭ в источнике"""
+        self.ensure_fresh()
+        with self.lock:
+            return oke in self.sheetnames
+
+    def locate(self, app_id: int) -> Optional[Tuple[str, List[str]]]:
+        """
+        Находит заявку по идентификатору
+
+        Args:
+            app_id: Идентификатор заявки
+
+        Returns:
+            Пара (ОКЭ, значения колонок) или None, если заявки нет
+        """
+        self.ensure_fresh()
+        with self.lock:
+            location = self.locations.get(app_id)
+            if location is None:
+                return None
+            return location[0], self.rows[location[0]][location[1]]
+
+    def max_id(self) -> int:
+        """Наибольший идентификатор заявки в источнике (0, если заявок с идентификатором нет)"""
+        self.ensure_fresh()
+        with self.lock:
+            return max(self.locations, default=0)
+
+
+# Кэши общие для всех экземпляров ExcelIntegration в процессе (по источнику заявок)
+_datasets: Dict[Tuple[str, str], ApplicationDataset] = {}
+_datasets_lock = threading.Lock()
+
+def get_application_dataset(key: Tuple[str, str],
+                            load: Callable[[], Tuple[List[str], Dict[str, List[List[str]]]]],
+                            validate: Callable[[], DatasetValidator]) -> ApplicationDataset:
+    """
+    Возвращает общий для процесса кэш заявок
+
+    Args:
+        key: Источник заявок (путь и тип хранилища)
+        load: Функция, читающая (список листов, строки по ОКЭ) из источника
+        validate: Функция, возвращающая текущую версию источника
+
+    Returns:
+        Экземпляр ApplicationDataset
+    """
+    with _datasets_lock:
+        if key not in _datasets:
+            _datasets[key] = ApplicationDataset(load, validate)
+        return _datasets[key]
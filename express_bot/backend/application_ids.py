@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Выдача идентификаторов заявок
+Счетчик в файле под межпроцессной блокировкой: идентификатор присваивается при подаче и больше не меняется
+"""
+
+import os
+import fcntl
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class ApplicationIdSequence:
+    """Возрастающая последовательность идентификаторов заявок, общая для всех процессов"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к файлу счетчика (хранит последний выданный идентификатор)
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def allocate(self, count: int, floor: Callable[[], int]) -> int:
+        """
+        Выдает подряд идущие идентификаторы
+
+        Args:
+            count: Количество идентификаторов
+            floor: Функция, возвращающая наибольший уже занятый идентификатор;
+                вызывается, только если файла счетчика еще нет или он поврежден
+
+        Returns:
+            Первый выданный идентификатор (остальные идут за ним подряд)
+        """
+        with self.lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                data = os.pread(fd, 64, 0).strip()
+                try:
+                    last = int(data)
+                except ValueError:
+                    if data:
+                        logger.error(f"❌ Поврежденный счетчик идентификаторов заявок: {self.path}")
+                    last = floor()
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, f"{last + count}\n".encode("ascii"), 0)
+                os.fsync(fd)
+                return last + 1
+            finally:
+                os.close(fd)
+
+
+# Последовательности общие для всех экземпляров ExcelIntegration в процессе
+_sequences: Dict[str, ApplicationIdSequence] = {}
+_sequences_lock = threading.Lock()
+
+def get_id_sequence(path: str) -> ApplicationIdSequence:
+    """
+    Возвращает общую для процесса последовательность идентификаторов
+
+    Args:
+        path: Путь к файлу счетчика
+
+    Returns:
+        Экземпляр ApplicationIdSequence
+    """
+    key = os.path.abspath(path)
+    with _sequences_lock:
+        if key not in _sequences:
+            _sequences[key] = ApplicationIdSequence(key)
+        return _sequences[key]
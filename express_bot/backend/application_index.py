@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Индексы заявок в памяти
+Счетчики и агрегаты, которые обновляются при записи и не требуют чтения Excel
+"""
+
+import heapq
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ApplicationCounters:
+    """Счетчики заявок по ОКЭ, дням и месяцам"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.by_oke: Dict[str, int] = {}
+        self.by_day: Dict[str, int] = {}
+        self.by_month: Dict[str, int] = {}
+
+    def _add_locked(self, oke: str, submitted_at: str, count: int = 1):
+        """Учитывает одну заявку или, при count=-1, снимает ее (вызывается под блокировкой)"""
+        self.total += count
+        keys = [(self.by_oke, oke)]
+
+        # Время подачи хранится в формате 'YYYY-MM-DD HH:MM:SS'
+        day = submitted_at[:10]
+        if len(day) == 10:
+            keys += [(self.by_day, day), (self.by_month, day[:7])]
+        for counts, key in keys:
+            counts[key] = counts.get(key, 0) + count
+            if not counts[key]:
+                del counts[key]
+
+    def add(self, oke: str, submitted_at: str):
+        """
+        Учитывает новую заявку
+
+        Args:
+            oke: Название ОКЭ
+            submitted_at: Время подачи заявки
+        """
+        with self.lock:
+            self._add_locked(oke, submitted_at)
+
+    def remove(self, oke: str, submitted_at: str):
+        """
+        Снимает удаленную заявку
+
+        Args:
+            oke: Название ОКЭ
+            submitted_at: Время подачи заявки
+        """
+        with self.lock:
+            self._add_locked(oke, submitted_at, -1)
+
+    def rebuild(self, rows: Iterable[Tuple[str, List[str]]]):
+        """
+        Пересчитывает счетчики за один проход по заявкам
+
+        Args:
+            rows: Пары (ОКЭ, значения колонок), время подачи - первая колонка
+        """
+        fresh = ApplicationCounters()
+        for oke, row in rows:
+            fresh._add_locked(oke, row[0] if row else "")
+
+        with self.lock:
+            self.total = fresh.total
+            self.by_oke = fresh.by_oke
+            self.by_day = fresh.by_day
+            self.by_month = fresh.by_month
+        logger.info(f"🔢 Счетчики заявок пересчитаны: {self.total} заявок")
+
+    def count(self, oke: str = None) -> int:
+        """Количество заявок (всего или по ОКЭ)"""
+        with self.lock:
+            if oke is None:
+                return self.total
+            return self.by_oke.get(oke, 0)
+
+    def snapshot(self) -> Dict:
+        """Копия всех счетчиков"""
+        with self.lock:
+            return {
+                "total": self.total,
+                "by_oke": dict(self.by_oke),
+                "by_day": dict(self.by_day),
+                "by_month": dict(self.by_month)
+            }
+
+
+# Ключ свертки: (день подачи 'YYYY-MM-DD', ОКЭ, направление, должность)
+RollupKey = Tuple[str, str, str, str]
+
+class ApplicationRollups:
+    """
+    Свертки заявок по (день подачи, ОКЭ, направление, должность)
+
+    Количество ячеек зависит от числа дней и различных значений, а не от числа
+    заявок, поэтому сводки за день, неделю и месяц и популярные направления
+    считаются без просмотра заявок.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cells: Dict[RollupKey, int] = {}
+        self.by_day: Dict[str, int] = {}
+        self.by_direction: Dict[str, int] = {}
+        self.total = 0
+
+    @staticmethod
+    def key_of(oke: str, row: List[str]) -> RollupKey:
+        """Ключ свертки для строки заявки (день пустой, если время подачи в другом формате)"""
+        submitted_at = row[0] if row else ""
+        day = submitted_at[:10] if len(submitted_at) >= 10 and submitted_at[4:5] == "-" else ""
+        direction = row[4].strip() if len(row) > 4 else ""
+        position = row[3].strip() if len(row) > 3 else ""
+        return day, oke, direction, position
+
+    def _apply_locked(self, key: RollupKey, count: int):
+        """Добавляет count заявок в ячейку и производные счетчики (вызывается под блокировкой)"""
+        self.cells[key] = self.cells.get(key, 0) + count
+        if not self.cells[key]:
+            del self.cells[key]
+        self.by_day[key[0]] = self.by_day.get(key[0], 0) + count
+        self.by_direction[key[2]] = self.by_direction.get(key[2], 0) + count
+        self.total += count
+
+    def add(self, oke: str, row: List[str]):
+        """
+        Учитывает новую заявку
+
+        Args:
+            oke: Название ОКЭ
+            row: Значения колонок заявки
+        """
+        with self.lock:
+            self._apply_locked(self.key_of(oke, row), 1)
+
+    def remove(self, oke: str, row: List[str]):
+        """
+        Снимает удаленную заявку
+
+        Args:
+            oke: Название ОКЭ
+            row: Значения колонок заявки
+        """
+        with self.lock:
+            self._apply_locked(self.key_of(oke, row), -1)
+
+    def add_cells(self, cells: Iterable[Tuple[RollupKey, int]]):
+        """Добавляет готовые ячейки (например, из сводки архивного сегмента)"""
+        with self.lock:
+            for key, count in cells:
+                self._apply_locked(tuple(key), count)
+
+    def rebuild(self, rows: Iterable[Tuple[str, List[str]]]):
+        """
+        Пересчитывает свертки за один проход по заявкам источника
+
+        Args:
+            rows: Пары (ОКЭ, значения колонок)
+        """
+        fresh = ApplicationRollups()
+        for oke, row in rows:
+            fresh._apply_locked(self.key_of(oke, row), 1)
+        with self.lock:
+            self.cells = fresh.cells
+            self.by_day = fresh.by_day
+            self.by_direction = fresh.by_direction
+            self.total = fresh.total
+
+    def count_days(self, day_from: date, day_to: date) -> int:
+        """Количество заявок, поданных в дни с day_from по day_to включительно"""
+        with self.lock:
+            count = 0
+            day = day_from
+            while day <= day_to:
+                count += self.by_day.get(day.isoformat(), 0)
+                day += timedelta(days=1)
+            return count
+
+    def group(self, field: str, day_from: Optional[str] = None, day_to: Optional[str] = None,
+              oke: Optional[str] = None) -> Dict[str, int]:
+        """
+        Количество заявок по значениям одного поля ключа
+
+        Args:
+            field: 'day', 'oke', 'direction' или 'position'
+            day_from: Первый день ('YYYY-MM-DD', включительно)
+            day_to: Последний день ('YYYY-MM-DD', включительно)
+            oke: Фильтр по ОКЭ
+
+        Returns:
+            Значение поля -> количество заявок
+        """
+        index = ("day", "oke", "direction", "position").index(field)
+        result: Dict[str, int] = {}
+        with self.lock:
+            for key, count in self.cells.items():
+                if (day_from and key[0] < day_from) or (day_to and key[0] > day_to):
+                    continue
+                if oke and key[1] != oke:
+                    continue
+                result[key[index]] = result.get(key[index], 0) + count
+        return result
+
+    @staticmethod
+    def summarize(rollups: List["ApplicationRollups"], today: Optional[date] = None,
+                  top_directions: int = 5) -> Dict:
+        """
+        Сводка для панели администратора по нескольким сверткам (рабочие заявки и архив)
+
+        Args:
+            rollups: Свертки, которые нужно сложить
+            today: Текущий день (по умолчанию сегодня)
+            top_directions: Количество популярных направлений
+
+        Returns:
+            Словарь applications (total, today, this_week с понедельника,
+            this_month с первого числа) и popular_directions
+        """
+        today = today or date.today()
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
+        directions: Dict[str, int] = {}
+        applications = {"total": 0, "today": 0, "this_week": 0, "this_month": 0}
+        for rollup in rollups:
+            applications["total"] += rollup.total
+            applications["today"] += rollup.count_days(today, today)
+            applications["this_week"] += rollup.count_days(week_start, today)
+            applications["this_month"] += rollup.count_days(month_start, today)
+            with rollup.lock:
+                for direction, count in rollup.by_direction.items():
+                    if direction:
+                        directions[direction] = directions.get(direction, 0) + count
+        popular = heapq.nlargest(top_directions, directions.items(), key=lambda item: item[1])
+        return {
+            "applications": applications,
+            "popular_directions": [{"name": name, "count": count} for name, count in popular]
+        }
+
+
+# Поля фасетов фильтров поиска
+FACET_FIELDS = ("oke", "position", "direction", "month", "status")
+
+class ApplicationFacets:
+    """
+    Фасеты фильтров поиска: значение -> количество заявок для ОКЭ, должности,
+    направления, месяца подачи и статуса
+
+    Обновляются при каждой записи (удаление и смена статуса уменьшают счетчики),
+    поэтому список вариантов фильтров отдается без просмотра заявок.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+
+    @staticmethod
+    def key_of(oke: str, row: List[str]) -> Tuple[str, str, str, str, str]:
+        """Значения фасетов строки заявки в порядке FACET_FIELDS"""
+        submitted_at = row[0] if row else ""
+        month = submitted_at[:7] if len(submitted_at) >= 7 and submitted_at[4:5] == "-" else ""
+        position = row[3].strip() if len(row) > 3 else ""
+        direction = row[4].strip() if len(row) > 4 else ""
+        status = row[7].strip() if len(row) > 7 else ""
+        return oke, position, direction, month, status
+
+    def _apply_locked(self, field: str, value: str, count: int):
+        """Изменяет счетчик значения; значения без заявок удаляются (вызывается под блокировкой)"""
+        if not value:
+            return
+        values = self.values[field]
+        values[value] = values.get(value, 0) + count
+        if values[value] <= 0:
+            del values[value]
+
+    def add(self, oke: str, row: List[str]):
+        """Учитывает новую заявку"""
+        with self.lock:
+            for field, value in zip(FACET_FIELDS, self.key_of(oke, row)):
+                self._apply_locked(field, value, 1)
+
+    def remove(self, oke: str, row: List[str]):
+        """Снимает удаленную заявку"""
+        with self.lock:
+            for field, value in zip(FACET_FIELDS, self.key_of(oke, row)):
+                self._apply_locked(field, value, -1)
+
+    def change_status(self, old_status: str, new_status: str):
+        """
+        Переносит заявку между значениями фасета статуса
+
+        Args:
+            old_status: Прежний статус заявки
+            new_status: Новый статус
+        """
+        with self.lock:
+            self._apply_locked("status", old_status.strip(), -1)
+            self._apply_locked("status", new_status.strip(), 1)
+
+    def rebuild(self, rows: Iterable[Tuple[str, List[str]]]):
+        """
+        Пересчитывает фасеты за один проход по заявкам источника
+
+        Args:
+            rows: Пары (ОКЭ, значения колонок)
+        """
+        fresh = ApplicationFacets()
+        for oke, row in rows:
+            for field, value in zip(FACET_FIELDS, fresh.key_of(oke, row)):
+                fresh._apply_locked(field, value, 1)
+        with self.lock:
+            self.values = fresh.values
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Копия фасетов: поле -> {значение: количество заявок}"""
+        with self.lock:
+            return {field: dict(values) for field, values in self.values.items()}
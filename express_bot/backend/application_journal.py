@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Append-only журнал заявок
+Принимает заявки в JSONL файл с fsync и в фоне переносит их в мастер-файл Excel
+"""
+
+import os
+import json
+import uuid
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Запись журнала: (ОКЭ, значения колонок)
+JournalEntry = Tuple[str, List[str]]
+# Смена статуса заявки: (ОКЭ, идентификатор заявки, новый статус)
+StatusEntry = Tuple[str, int, str]
+
+# Версия файла: (inode, mtime в наносекундах, размер)
+FileSignature = Tuple[int, int, int]
+
+def file_signature(st: os.stat_result) -> FileSignature:
+    """Версия файла по результату stat"""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class ApplicationJournal:
+    """Журнал заявок, ожидающих переноса в мастер-файл"""
+
+    def __init__(self, journal_path: str):
+        """
+        Инициализация журнала
+
+        Args:
+            journal_path: Путь к JSONL файлу журнала
+        """
+        self.journal_path = journal_path
+        self.checkpoint_path = f"{journal_path}.checkpoint"
+        self.compaction_lock_path = f"{journal_path}.lock"
+        self.lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+        self._compactor_thread: Optional[threading.Thread] = None
+        self._compact_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._compact_threshold = 0
+
+    # ==================== ЗАПИСЬ ====================
+
+    def append(self, oke: str, row: List[str]) -> Tuple[FileSignature, FileSignature]:
+        """
+        Добавляет заявку в журнал и дожидается fsync
+
+        Args:
+            oke: Название ОКЭ
+            row: Значения колонок заявки
+
+        Returns:
+            Версии файла журнала до и после записи (сняты под блокировкой)
+        """
+        return self._append_lines([{"oke": oke, "row": row}])
+
+    def append_statuses(self, statuses: List[StatusEntry]) -> Tuple[FileSignature, FileSignature]:
+        """
+        Добавляет в журнал смену статусов заявок одной записью с fsync
+
+        Args:
+            statuses: Список (ОКЭ, идентификатор заявки, новый статус)
+
+        Returns:
+            Версии файла журнала до и после записи (сняты под блокировкой)
+        """
+        return self._append_lines([
+            {"status": {"oke": oke, "id": app_id, "value": value}} for oke, app_id, value in statuses
+        ])
+
+    def _append_lines(self, records: List[Dict]) -> Tuple[FileSignature, FileSignature]:
+        """Дописывает записи в журнал одним вызовом write и дожидается fsync"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+        with self.lock:
+            while True:
+                fd = self._open()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # Журнал мог быть заменен компактором (в том числе в другом процессе)
+                if not self._is_current(fd):
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    self._close()
+                    continue
+                try:
+                    before = file_signature(os.fstat(fd))
+                    size = before[2]
+                    if size and os.pread(fd, 1, size - 1) != b"\n":
+                        # Хвост оборванной записи после сбоя: начинаем с новой строки
+                        os.write(fd, b"\n")
+                    os.write(fd, data)
+                    os.fsync(fd)
+                    after = file_signature(os.fstat(fd))
+                    break
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+        if self._compact_threshold and after[2] >= self._compact_threshold:
+            self._compact_event.set()
+        return before, after
+
+    def _open(self) -> int:
+        """Открывает файл журнала на дозапись"""
+        if self._fd is None:
+            self._fd = os.open(self.journal_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _close(self):
+        """Закрывает файл журнала"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _is_current(self, fd: int) -> bool:
+        """Проверяет, что дескриптор указывает на актуальный файл журнала"""
+        try:
+            return os.fstat(fd).st_ino == os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            return False
+
+    # ==================== ЧТЕНИЕ ====================
+
+    def read_pending(self, applied_generation: Optional[str] = None) -> Tuple[List[JournalEntry], List[StatusEntry]]:
+        """
+        Читает записи, еще не перенесенные в мастер-файл
+
+        Args:
+            applied_generation: Поколение компактации, записанное в мастер-файл
+
+        Returns:
+            Новые заявки и смены статусов в порядке записи
+        """
+        data = self._read_bytes()
+        checkpoint = self._read_checkpoint()
+        if checkpoint and checkpoint["generation"] == applied_generation and self._checkpoint_matches(checkpoint):
+            # Компактация уже применена к мастер-файлу, но журнал еще не обрезан
+            data = data[checkpoint["bytes"]:]
+        entries, statuses, _ = self._parse(data)
+        return entries, statuses
+
+    def _read_bytes(self) -> bytes:
+        """Читает содержимое журнала"""
+        try:
+            with open(self.journal_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    @staticmethod
+    def _parse(data: bytes) -> Tuple[List[JournalEntry], List[StatusEntry], int]:
+        """
+        Разбирает JSONL журнал
+
+        Returns:
+            Новые заявки, смены статусов и количество байт, занятых полными строками
+        """
+        complete = data.rfind(b"\n") + 1
+        entries = []
+        statuses = []
+        for line in data[:complete].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if "status" in record:
+                    status = record["status"]
+                    statuses.append((status["oke"], int(status["id"]), status["value"]))
+                else:
+                    entries.append((record["oke"], record["row"]))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"❌ Поврежденная запись журнала пропущена: {e}")
+        return entries, statuses, complete
+
+    # ==================== КОМПАКТАЦИЯ ====================
+
+    @contextmanager
+    def _compaction_lock(self):
+        """Межпроцессная блокировка компактации"""
+        with open(self.compaction_lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def compact(self, fold: Callable[[List[JournalEntry], List[StatusEntry], str], None],
+                get_applied_generation: Callable[[], Optional[str]]) -> int:
+        """
+        Переносит накопленные записи в мастер-файл
+
+        Args:
+            fold: Функция, записывающая заявки и смены статусов в мастер-файл вместе с поколением
+            get_applied_generation: Функция, возвращающая поколение из мастер-файла
+
+        Returns:
+            Количество перенесенных записей
+        """
+        with self._compaction_lock():
+            self._recover(get_applied_generation)
+
+            entries, statuses, complete = self._parse(self._read_bytes())
+            if not entries and not statuses:
+                return 0
+
+            generation = uuid.uuid4().hex
+            self._write_checkpoint({
+                "generation": generation,
+                "bytes": complete,
+                "inode": os.stat(self.journal_path).st_ino
+            })
+            try:
+                fold(entries, statuses, generation)
+            except Exception:
+                # Мастер-файл сохраняется атомарно, значит записи остались только в журнале
+                self._remove_checkpoint()
+                raise
+
+            self._drop_prefix(complete)
+            self._remove_checkpoint()
+            logger.info(f"🗜️ Перенесено {len(entries)} заявок и {len(statuses)} смен статуса из журнала в мастер-файл")
+            return len(entries) + len(statuses)
+
+    def _recover(self, get_applied_generation: Callable[[], Optional[str]]):
+        """Завершает компактацию, прерванную аварийно"""
+        checkpoint = self._read_checkpoint()
+        if not checkpoint:
+            return
+        if checkpoint["generation"] == get_applied_generation() and self._checkpoint_matches(checkpoint):
+            self._drop_prefix(checkpoint["bytes"])
+            logger.info("♻️ Завершена прерванная компактация журнала")
+        self._remove_checkpoint()
+
+    def _drop_prefix(self, size: int):
+        """Удаляет из журнала первые size байт, заменяя файл атомарно"""
+        tmp_path = f"{self.journal_path}.tmp"
+        fd = os.open(self.journal_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with open(self.journal_path, "rb") as f:
+                f.seek(size)
+                tail = f.read()
+            # Под блокировкой незавершенных записей нет, неполная строка - след сбоя
+            tail = tail[:tail.rfind(b"\n") + 1]
+            with open(tmp_path, "wb") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.journal_path)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _checkpoint_matches(self, checkpoint: Dict) -> bool:
+        """Проверяет, что контрольная точка относится к текущему файлу журнала"""
+        try:
+            return os.stat(self.journal_path).st_ino == checkpoint.get("inode")
+        except FileNotFoundError:
+            return False
+
+    def _read_checkpoint(self) -> Optional[Dict]:
+        """Читает контрольную точку компактации"""
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.error("❌ Поврежденная контрольная точка журнала удалена")
+            self._remove_checkpoint()
+            return None
+
+    def _write_checkpoint(self, checkpoint: Dict):
+        """Записывает контрольную точку компактации"""
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _remove_checkpoint(self):
+        """Удаляет контрольную точку компактации"""
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    # ==================== ФОНОВЫЙ КОМПАКТОР ====================
+
+    def start_compactor(self, compact: Callable[[], int], interval: float = 30.0,
+                        threshold_bytes: int = 1024 * 1024):
+        """
+        Запускает фоновый компактор
+
+        Args:
+            compact: Функция компактации
+            interval: Период компактации в секундах
+            threshold_bytes: Размер журнала, при котором компактация запускается досрочно
+        """
+        if self.is_compactor_running():
+            return
+
+        self._compact_threshold = threshold_bytes
+        self._stop_event.clear()
+
+        def worker():
+            while not self._stop_event.is_set():
+                self._compact_event.wait(timeout=interval)
+                self._compact_event.clear()
+                if self._stop_event.is_set():
+                    break
+                try:
+                    compact()
+                except Exception as e:
+                    logger.error(f"❌ Ошибка компактации журнала: {e}")
+
+        self._compactor_thread = threading.Thread(target=worker, name="journal-compactor", daemon=True)
+        self._compactor_thread.start()
+        logger.info(f"🔄 Компактор журнала запущен (интервал {interval}с, порог {threshold_bytes} байт)")
+
+    def is_compactor_running(self) -> bool:
+        """Проверяет, запущен ли фоновый компактор"""
+        return self._compactor_thread is not None and self._compactor_thread.is_alive()
+
+    def stop_compactor(self):
+        """Останавливает фоновый компактор"""
+        self._stop_event.set()
+        self._compact_event.set()
+        if self._compactor_thread:
+            self._compactor_thread.join(timeout=5)
+            self._compactor_thread = None
+
+
+# Журналы общие для всех экземпляров ExcelIntegration в процессе
+_journals: Dict[str, ApplicationJournal] = {}
+_journals_lock = threading.Lock()
+
+def get_application_journal(journal_path: str) -> ApplicationJournal:
+    """
+    Возвращает общий для процесса журнал по пути к файлу
+
+    Args:
+        journal_path: Путь к JSONL файлу журнала
+
+    Returns:
+        Экземпляр ApplicationJournal
+    """
+    key = os.path.abspath(journal_path)
+    with _journals_lock:
+        if key not in _journals:
+            _journals[key] = ApplicationJournal(key)
+        return _journals[key]
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Выборки, поиск и постраничная выдача заявок
+Рабочие заявки отбираются по индексам кэша, архивные - по сегментам закрытых периодов
+"""
+
+import os
+import heapq
+import itertools
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from application_archive import ApplicationArchive
+from application_dataset import (NAME_COLUMN, SEARCH_COLUMNS, ApplicationDataset, group_value,
+                                 matches_filters, order_key, relevance_key)
+from application_store import ApplicationStore
+from search_index import FuzzyNameIndex, decode_cursor, encode_cursor, normalize_text
+from columnar_engine import GROUP_FIELDS, PANDAS_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+# Движок выборок заявок: 'index' - индексы в памяти (битовые карты, индекс времени),
+# 'pandas' - колоночное представление на pandas/NumPy (если pandas установлен)
+QUERY_ENGINE_INDEX = "index"
+QUERY_ENGINE_PANDAS = "pandas"
+DEFAULT_QUERY_ENGINE = os.getenv("APPLICATION_QUERY_ENGINE", QUERY_ENGINE_INDEX)
+
+# Заявка: (ОКЭ, значения колонок)
+Application = Tuple[str, List[str]]
+
+class ApplicationSearch:
+    """
+    Отбор заявок по ОКЭ, периоду подачи, тексту и полям, группировки и страницы поиска
+
+    Рабочие заявки берутся из общего кэша процесса, архивные читаются
+    по требованию только для запросов, которые их включают.
+    """
+
+    def __init__(self, dataset: ApplicationDataset, archive: ApplicationArchive, headers: List[str],
+                 store: Optional[ApplicationStore] = None, query_engine: str = DEFAULT_QUERY_ENGINE):
+        """
+        Args:
+            dataset: Кэш рабочих заявок
+            archive: Архив закрытых периодов
+            headers: Заголовки колонок (ключи словарей заявок)
+            store: Хранилище заявок, если оно используется вместо мастер-файла
+            query_engine: Движок выборок и группировок ('index' или 'pandas')
+        """
+        if query_engine == QUERY_ENGINE_PANDAS and not PANDAS_AVAILABLE:
+            logger.warning("⚠️ pandas не установлен, выборки выполняются по индексам в памяти")
+            query_engine = QUERY_ENGINE_INDEX
+        elif query_engine not in (QUERY_ENGINE_INDEX, QUERY_ENGINE_PANDAS):
+            logger.warning(f"⚠️ Неизвестный движок выборок '{query_engine}', используется '{QUERY_ENGINE_INDEX}'")
+            query_engine = QUERY_ENGINE_INDEX
+        self.dataset = dataset
+        self.archive = archive
+        self.headers = headers
+        self.store = store
+        self.query_engine = query_engine
+
+    def iter_rows(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None, include_archive: Optional[bool] = None,
+                  query: Optional[str] = None, newest_first: bool = False,
+                  filters: Optional[Dict[str, str]] = None) -> Iterator[Application]:
+        """
+        Читает заявки из кэша, перечитывая источник только после его изменения
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            include_archive: Читать ли архив закрытых периодов; по умолчанию - только
+                для запросов с периодом подачи (открываются сегменты, пересекающиеся с ним)
+            query: Подстрока ФИО, табельного номера, должности, направления или рейса
+            newest_first: Упорядочить по времени подачи от новых к старым
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+        """
+        query = (query or "").strip()
+        filters = {field: value for field, value in (filters or {}).items() if value} or None
+        if include_archive is None:
+            include_archive = bool(date_from or date_to)
+        archived: Iterable[Application] = ()
+        if include_archive:
+            archived = self._iter_archived_rows(okes, date_from, date_to, query, filters)
+
+        if newest_first:
+            # Рабочие заявки уже упорядочены индексом времени, архивные сортируются
+            # отдельно; сегменты архива могут пересекаться по времени с рабочими заявками
+            hot = self._select_hot(okes, date_from, date_to, query, True, filters)
+            archived = sorted(archived, key=order_key, reverse=True)
+            yield from heapq.merge(hot, archived, key=order_key, reverse=True)
+            return
+
+        # Архивные заявки старше рабочих, поэтому идут первыми
+        yield from archived
+
+        if self.store is not None and (date_from or date_to) and not query and not filters:
+            # Хранилище отбирает период само (сегментированное открывает только нужные месяцы)
+            for oke in okes if okes is not None else [None]:
+                yield from self.store.iter_applications(oke=oke, date_from=date_from or None,
+                                                        date_to=date_to or None)
+            return
+
+        if query or date_from or date_to or filters:
+            # Период - двоичным поиском по времени подачи, текст - по индексу триграмм,
+            # поля - пересечением битовых карт
+            yield from self._select_hot(okes, date_from, date_to, query, False, filters)
+            return
+
+        yield from self.dataset.iter_rows(okes)
+
+    def _iter_archived_rows(self, okes: Optional[List[str]], date_from: Optional[str], date_to: Optional[str],
+                            query: str, filters: Optional[Dict[str, str]]) -> Iterator[Application]:
+        """Архивные заявки под условия отбора (проверяются по строкам: архив не индексируется)"""
+        normalized = normalize_text(query) if query else None
+        for oke, row in self.archive.iter_rows(okes, date_from or None, date_to or None):
+            if normalized and not any(normalized in normalize_text(row[column]) for column in SEARCH_COLUMNS):
+                continue
+            if not matches_filters(oke, row, filters):
+                continue
+            yield oke, row
+
+    def _select_hot(self, okes: Optional[List[str]], date_from: Optional[str], date_to: Optional[str],
+                    query: str, newest_first: bool,
+                    filters: Optional[Dict[str, str]]) -> List[Application]:
+        """Отбирает рабочие заявки выбранным движком выборок"""
+        if self.query_engine == QUERY_ENGINE_PANDAS:
+            return self.dataset.select_columnar(okes, date_from, date_to, query, newest_first, filters)
+        return self.dataset.select(okes, date_from, date_to, query, newest_first, filters)
+
+    def group(self, field: str, okes: Optional[List[str]] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              query: Optional[str] = None, filters: Optional[Dict[str, str]] = None,
+              include_archive: Optional[bool] = None) -> Dict[str, int]:
+        """
+        Количество заявок по значениям поля с произвольными фильтрами
+
+        В отличие от сверток, учитывает статус, текстовый запрос и фильтры полей.
+        Движок 'pandas' считает рабочие заявки по колонкам, движок 'index' - по строкам
+        отобранным индексами; архивные заявки считаются по строкам сегментов.
+
+        Args:
+            field: 'oke', 'position', 'direction', 'status', 'day' или 'month'
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            query: Подстрока полей поиска
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+            include_archive: Учитывать ли архив (по умолчанию - при заданном периоде подачи)
+
+        Returns:
+            Значение поля -> количество заявок (без пустых значений)
+        """
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Группировка по полю {field} не поддерживается")
+        query = (query or "").strip()
+        filters = {name: value for name, value in (filters or {}).items() if value} or None
+        if include_archive is None:
+            include_archive = bool(date_from or date_to)
+
+        result: Dict[str, int] = {}
+        if self.query_engine == QUERY_ENGINE_PANDAS:
+            result = self.dataset.group_columnar(field, okes, date_from or None, date_to or None,
+                                                 query, filters)
+            rows: Iterable[Application] = ()
+        else:
+            rows = self.dataset.select(okes, date_from or None, date_to or None, query, filters=filters)
+        if include_archive:
+            rows = itertools.chain(rows, self._iter_archived_rows(okes, date_from, date_to, query, filters))
+        for oke, row in rows:
+            value = group_value(field, oke, row)
+            if value:
+                result[value] = result.get(value, 0) + 1
+        return result
+
+    def _search_key(self, kind: str, okes: Optional[List[str]], date_from: Optional[str],
+                    date_to: Optional[str], query: str, filters: Optional[Dict[str, str]]) -> Tuple:
+        """Нормализованные условия поиска: ключ кэша результатов"""
+        return (
+            kind,
+            tuple(sorted(set(okes))) if okes is not None else None,
+            date_from or None,
+            date_to or None,
+            normalize_text(query),
+            tuple(sorted((field, normalize_text(value)) for field, value in (filters or {}).items()))
+        )
+
+    def _archived_results(self, okes: Optional[List[str]], date_from: Optional[str], date_to: Optional[str],
+                          query: str, filters: Optional[Dict[str, str]]) -> List[Application]:
+        """
+        Архивные заявки под условия поиска от новых к старым (из кэша результатов)
+
+        Архив не индексируется, поэтому отобранные строки сохраняются целиком до изменения
+        набора завершенных сегментов; страницы продолжаются двоичным поиском по курсору.
+        """
+        key = self._search_key("archive", okes, date_from, date_to, query, filters)
+        version = tuple(segment["id"] for segment in self.archive.segments())
+        items = self.dataset.search_results.get(key, version)
+        if items is None:
+            items = sorted(self._iter_archived_rows(okes, date_from, date_to, query, filters),
+                           key=order_key, reverse=True)
+            self.dataset.search_results.put(key, version, items)
+        return items
+
+    def _ranked_results(self, okes: Optional[List[str]], date_from: Optional[str], date_to: Optional[str],
+                        query: str, filters: Optional[Dict[str, str]],
+                        include_archive: bool) -> List[Tuple[int, Application]]:
+        """
+        Заявки, ФИО которых похоже на запрос, с оценкой близости: сначала ближайшие,
+        при равной оценке - новые (из кэша результатов)
+
+        Порядок выдачи задает оценка всего набора совпадений, поэтому он сохраняется
+        целиком до следующего изменения заявок или архива.
+        """
+        self.dataset.ensure_fresh()
+        key = self._search_key("fuzzy", okes, date_from, date_to, query, filters) + (include_archive,)
+        segments = tuple(segment["id"] for segment in self.archive.segments()) if include_archive else ()
+        # Поколение снимаем до отбора: запись во время отбора сделает результат устаревшим
+        version = (self.dataset.generation, segments)
+        items = self.dataset.search_results.get(key, version)
+        if items is not None:
+            return items
+
+        found = self.dataset.search_names(query, okes, date_from or None, date_to or None, filters)
+        if include_archive:
+            score = FuzzyNameIndex.matcher(query)
+            archived = []
+            for oke, row in self._iter_archived_rows(okes, date_from, date_to, "", filters):
+                row_score = score(row[NAME_COLUMN])
+                if row_score is not None:
+                    archived.append((row_score, (oke, row)))
+            if archived:
+                archived.sort(key=relevance_key, reverse=True)
+                found = list(heapq.merge(found, archived, key=relevance_key, reverse=True))
+        self.dataset.search_results.put(key, version, found)
+        return found
+
+    def _ranked_page(self, okes: Optional[List[str]], date_from: Optional[str], date_to: Optional[str],
+                     query: str, filters: Optional[Dict[str, str]], include_archive: bool,
+                     after: Optional[Tuple[str, int, Optional[int]]], skip: int,
+                     per_page: int) -> Tuple[List[Application], Optional[str], int]:
+        """Страница нечеткого поиска: продолжение с курсора двоичным поиском по (оценка, ключ)"""
+        items = self._ranked_results(okes, date_from, date_to, query, filters, include_archive)
+        start = skip
+        if after is not None:
+            if after[2] is None:
+                raise ValueError("Некорректный курсор страницы")
+            # Первая заявка после курсора: список упорядочен по убыванию relevance_key
+            bound = (-after[2], (after[0], after[1]))
+            low, high = 0, len(items)
+            while low < high:
+                middle = (low + high) // 2
+                if relevance_key(items[middle]) < bound:
+                    high = middle
+                else:
+                    low = middle + 1
+            start = low
+
+        page_items = items[start:start + per_page]
+        next_cursor = None
+        if start + per_page < len(items) and page_items:
+            score, item = page_items[-1]
+            next_cursor = encode_cursor(*order_key(item), score)
+        return [item for _, item in page_items], next_cursor, len(items)
+
+    def page(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, query: Optional[str] = None,
+             filters: Optional[Dict[str, str]] = None, include_archive: Optional[bool] = None,
+             cursor: Optional[str] = None, per_page: int = 20, page: int = 1,
+             fuzzy: bool = False) -> Dict[str, Any]:
+        """
+        Страница результатов поиска от новых к старым с курсором продолжения (keyset)
+
+        Курсор хранит ключ (время подачи, идентификатор) последней заявки страницы.
+        Рабочие заявки отбираются обратным обходом индекса времени от ключа курсора
+        до per_page подходящих строк, архивные - срезом отсортированного списка
+        после ключа; потоки сливаются по времени подачи. Общее количество берется
+        из числа кандидатов и строк периода и при заданном периоде вместе с другими
+        условиями является оценкой сверху. Нечеткий поиск выдается по близости
+        к запросу, курсор дополнительно хранит оценку заявки. Без курсора
+        страница page отсчитывается от начала выдачи.
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            query: Подстрока полей поиска
+            filters: Подстроки значений полей 'position', 'direction', 'status'
+            include_archive: Читать ли архив закрытых периодов (по умолчанию - при заданном периоде подачи)
+            cursor: Курсор из ответа на предыдущую страницу
+            per_page: Количество заявок на странице
+            page: Номер страницы, если курсор не передан
+            fuzzy: Искать запрос в ФИО с учетом опечаток, выдача - по близости к запросу
+
+        Returns:
+            Словарь с ключами applications, next_cursor, total, total_is_estimate
+        """
+        query = (query or "").strip()
+        filters = {field: value for field, value in (filters or {}).items() if value} or None
+        if include_archive is None:
+            include_archive = bool(date_from or date_to)
+        after = None
+        skip = max(page - 1, 0) * per_page
+        if cursor:
+            after = decode_cursor(cursor)
+            if after is None:
+                raise ValueError("Некорректный курсор страницы")
+            skip = 0
+
+        if fuzzy and query:
+            page_items, next_cursor, total = self._ranked_page(okes, date_from, date_to, query, filters,
+                                                               bool(include_archive), after, skip, per_page)
+            exact = True
+        else:
+            key = after[:2] if after is not None else None
+            # Пропущенные страницы (без курсора) тоже проходятся обходом индекса
+            need = skip + per_page
+            hot, more, total, exact = self.dataset.page(okes, date_from or None, date_to or None, query,
+                                                        filters, key, need)
+            items: List[Application] = hot
+            if include_archive:
+                archived = self._archived_results(okes, date_from, date_to, query, filters)
+                start = 0
+                if key is not None:
+                    # Первая архивная заявка старше курсора: список упорядочен по убыванию ключа
+                    low, high = 0, len(archived)
+                    while low < high:
+                        middle = (low + high) // 2
+                        if order_key(archived[middle]) < key:
+                            high = middle
+                        else:
+                            low = middle + 1
+                    start = low
+                more = more or start + need < len(archived)
+                items = list(heapq.merge(hot, archived[start:start + need + 1], key=order_key, reverse=True))
+                total += len(archived)
+            more = more or len(items) > need
+            page_items = items[skip:need]
+            next_cursor = encode_cursor(*order_key(page_items[-1])) if more and page_items else None
+
+        return {
+            "applications": [{**dict(zip(self.headers, row)), "oke": oke} for oke, row in page_items],
+            "next_cursor": next_cursor,
+            "total": total,
+            "total_is_estimate": not exact
+        }
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Бинарный снимок заявок мастер-файла
+Колоночный файл с префиксами длины для быстрой загрузки без разбора XLSX
+"""
+
+import os
+import json
+import struct
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"EXAPPSNP"
+SNAPSHOT_VERSION = 1
+
+# Заголовок файла: сигнатура, версия формата, длина JSON описания
+_PREFIX = struct.Struct("<8sHI")
+# Длина блока колонки
+_BLOCK_LENGTH = struct.Struct("<I")
+# Разделитель значений внутри колонки: символ NUL недопустим в XML, значит и в ячейках XLSX
+_SEPARATOR = "\x00"
+
+class WorkbookSnapshot(NamedTuple):
+    """Содержимое мастер-файла на момент снимка"""
+    source: List[int]                   # Версия мастер-файла: (inode, mtime в наносекундах, размер)
+    generation: Optional[str]           # Поколение компактации журнала, записанное в файл
+    sheetnames: List[str]               # Листы файла
+    rows: Dict[str, List[List[str]]]    # Строки заявок по ОКЭ
+
+
+def write_snapshot(path: str, snapshot: WorkbookSnapshot, columns: int):
+    """
+    Атомарно записывает снимок
+
+    Формат: префикс (сигнатура, версия, длина описания), JSON описание
+    (версия источника, поколение, листы, количество строк по ОКЭ), затем для каждого
+    ОКЭ по одному блоку на колонку: длина в байтах и значения в UTF-8 через NUL.
+
+    Args:
+        path: Путь к файлу снимка
+        snapshot: Данные снимка
+        columns: Количество колонок в строке
+    """
+    okes = list(snapshot.rows)
+    header = json.dumps({
+        "source": list(snapshot.source),
+        "generation": snapshot.generation,
+        "sheetnames": snapshot.sheetnames,
+        "columns": columns,
+        "sheets": [{"oke": oke, "rows": len(snapshot.rows[oke])} for oke in okes]
+    }, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for oke in okes:
+            oke_rows = snapshot.rows[oke]
+            for col in range(columns):
+                block = _SEPARATOR.join(
+                    row[col].replace(_SEPARATOR, "") if col < len(row) else "" for row in oke_rows
+                ).encode("utf-8")
+                f.write(_BLOCK_LENGTH.pack(len(block)))
+                f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, expected_source: Optional[List[int]] = None) -> Optional[WorkbookSnapshot]:
+    """
+    Загружает снимок
+
+    Args:
+        path: Путь к файлу снимка
+        expected_source: Текущая версия мастер-файла; снимок другой версии считается устаревшим
+
+    Returns:
+        Данные снимка или None, если снимка нет, он устарел или поврежден
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        magic, version, header_length = _PREFIX.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            logger.info(f"ℹ️ Снимок заявок другого формата пропущен: {path}")
+            return None
+        offset = _PREFIX.size
+        header = json.loads(data[offset:offset + header_length])
+        offset += header_length
+        if expected_source is not None and list(expected_source) != header["source"]:
+            return None
+
+        columns = header["columns"]
+        rows: Dict[str, List[List[str]]] = {}
+        for sheet in header["sheets"]:
+            values = []
+            for _ in range(columns):
+                (length,) = _BLOCK_LENGTH.unpack_from(data, offset)
+                offset += _BLOCK_LENGTH.size
+                values.append(data[offset:offset + length].decode("utf-8").split(_SEPARATOR))
+                offset += length
+            count = sheet["rows"]
+            if count and any(len(column) != count for column in values):
+                raise ValueError(f"длина колонок не совпадает с количеством строк листа '{sheet['oke']}'")
+            rows[sheet["oke"]] = [list(row) for row in zip(*values)] if count else []
+        if offset != len(data):
+            raise ValueError("лишние данные в конце файла")
+    except (struct.error, ValueError, KeyError, UnicodeDecodeError) as e:
+        logger.error(f"❌ Поврежденный снимок заявок пропущен ({path}): {e}")
+        return None
+
+    return WorkbookSnapshot(header["source"], header["generation"], header["sheetnames"], rows)
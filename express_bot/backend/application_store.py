@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+"""
+Хранилища заявок на рейсы
+Интерфейс ApplicationStore, встроенный бэкенд SQLite (WAL) и сегменты по (ОКЭ, месяц)
+"""
+
+import os
+import json
+import fcntl
+import heapq
+import bisect
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SQLITE_STORE_FILENAME = "applications.db"
+PARTITIONS_DIRNAME = "partitions"
+MANIFEST_FILENAME = "manifest.json"
+STATUSES_FILENAME = "statuses.jsonl"
+
+# Статусы заявок; новая заявка получает статус по умолчанию
+APPLICATION_STATUSES = ["pending", "approved", "rejected", "completed"]
+DEFAULT_APPLICATION_STATUS = "pending"
+
+# Количество колонок данных заявки (без идентификатора и статуса)
+DATA_COLUMNS = 6
+
+# Строка заявки: (ОКЭ, значения колонок в порядке ExcelIntegration.headers);
+# при чтении последние две колонки - идентификатор заявки и статус
+StoredApplication = Tuple[str, List[str]]
+
+def _status_of(row: List[str]) -> str:
+    """Статус из строки заявки (если не задан - статус по умолчанию)"""
+    if len(row) > DATA_COLUMNS + 1 and row[DATA_COLUMNS + 1]:
+        return str(row[DATA_COLUMNS + 1])
+    return DEFAULT_APPLICATION_STATUS
+
+def _order_for_migration(rows: Iterable[StoredApplication],
+                         first_free_id: int) -> List[Tuple[Optional[int], str, List[str]]]:
+    """
+    Упорядочивает заявки мастер-файла для переноса с сохранением их идентификаторов
+
+    Args:
+        rows: Заявки мастер-файла
+        first_free_id: Наименьший свободный идентификатор хранилища
+
+    Returns:
+        Тройки (идентификатор, ОКЭ, значения колонок): сначала заявки с сохраняемым
+        'ID заявки' по возрастанию, затем заявки без него (повторы, пустые и занятые
+        идентификаторы) с None - им хранилище выдаст новые после максимального
+    """
+    kept: Dict[int, Tuple[Optional[int], str, List[str]]] = {}
+    fresh: List[Tuple[Optional[int], str, List[str]]] = []
+    for oke, row in rows:
+        try:
+            app_id = int(str(row[DATA_COLUMNS])) if len(row) > DATA_COLUMNS else None
+        except ValueError:
+            app_id = None
+        if app_id is None or app_id < first_free_id or app_id in kept:
+            fresh.append((None, oke, row))
+        else:
+            kept[app_id] = (app_id, oke, row)
+    return [kept[app_id] for app_id in sorted(kept)] + fresh
+
+class ApplicationStore(ABC):
+    """Интерфейс хранилища заявок"""
+
+    @abstractmethod
+    def add(self, oke: str, row: List[str]) -> int:
+        """
+        Добавляет одну заявку
+
+        Returns:
+            Идентификатор заявки; он же версия хранилища после добавления (см. fingerprint)
+        """
+
+    @abstractmethod
+    def add_many(self, rows: Iterable[StoredApplication]) -> List[int]:
+        """
+        Добавляет пакет заявок одной транзакцией
+
+        Returns:
+            Идентификаторы добавленных заявок (подряд идущие, в порядке пакета)
+        """
+
+    @abstractmethod
+    def update_statuses(self, updates: Dict[int, str]) -> Tuple[List[int], int]:
+        """
+        Меняет статусы заявок одной транзакцией
+
+        Args:
+            updates: Идентификатор заявки -> новый статус
+
+        Returns:
+            Идентификаторы найденных и измененных заявок и ревизия хранилища после изменения
+        """
+
+    @abstractmethod
+    def remove(self, ids: Iterable[int]) -> Tuple[List[int], int]:
+        """
+        Удаляет заявки одной транзакцией (при переносе в архив)
+
+        Args:
+            ids: Идентификаторы заявок
+
+        Returns:
+            Идентификаторы найденных и удаленных заявок и ревизия хранилища после удаления
+        """
+
+    @abstractmethod
+    def revision(self) -> int:
+        """Ревизия уже поданных заявок: растет с каждой сменой статусов и удалением заявок"""
+
+    @abstractmethod
+    def iter_applications(self, oke: Optional[str] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, tab_num: Optional[str] = None,
+                          direction: Optional[str] = None) -> Iterator[StoredApplication]:
+        """
+        Возвращает заявки в порядке подачи
+
+        Args:
+            oke: Фильтр по ОКЭ
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            tab_num: Фильтр по табельному номеру
+            direction: Фильтр по направлению
+        """
+
+    @abstractmethod
+    def count(self, oke: Optional[str] = None) -> int:
+        """Количество заявок (всего или по ОКЭ)"""
+
+    @abstractmethod
+    def counts_by_oke(self) -> Dict[str, int]:
+        """Количество заявок по каждому ОКЭ"""
+
+    @abstractmethod
+    def fingerprint(self) -> int:
+        """
+        Версия данных хранилища
+
+        Последний выданный идентификатор: растет на единицу с каждой добавленной
+        заявкой (перенос из Excel может его сдвинуть), поэтому по ней
+        можно проверить, что между двумя чтениями не было чужих записей.
+        """
+
+    @abstractmethod
+    def is_migrated(self) -> bool:
+        """Проверяет, выполнен ли перенос данных из мастер-файла Excel"""
+
+    @abstractmethod
+    def migrate(self, rows: Iterable[StoredApplication]) -> int:
+        """
+        Однократно переносит заявки из мастер-файла Excel
+
+        Идентификаторы заявок ('ID заявки') сохраняются, заявки без идентификатора
+        получают новые после максимального.
+
+        Returns:
+            Количество перенесенных заявок
+        """
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища"""
+
+
+class SQLiteApplicationStore(ApplicationStore):
+    """Хранилище заявок во встроенной базе SQLite в режиме WAL"""
+
+    COLUMNS = ["submitted_at", "fio", "tab_num", "position", "direction", "flight_info"]
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Путь к файлу базы данных
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self.lock = threading.Lock()
+        self._create_schema()
+        logger.info(f"🗄️ SQLite хранилище заявок: {self.db_path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Соединение текущего потока (Flask обслуживает запросы в разных потоках)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self.lock:
+                self._connections.append(conn)
+        return conn
+
+    def _create_schema(self):
+        """Создает таблицы и индексы"""
+        conn = self._connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    oke TEXT NOT NULL,
+                    submitted_at TEXT NOT NULL,
+                    fio TEXT NOT NULL,
+                    tab_num TEXT NOT NULL DEFAULT '',
+                    position TEXT NOT NULL DEFAULT '',
+                    direction TEXT NOT NULL DEFAULT '',
+                    flight_info TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL DEFAULT 'pending'
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(applications)")}
+            if "status" not in columns:
+                # База создана до появления статусов
+                conn.execute("ALTER TABLE applications ADD COLUMN status TEXT NOT NULL DEFAULT 'pending'")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_applications_oke ON applications(oke, submitted_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_applications_submitted_at ON applications(submitted_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_applications_tab_num ON applications(tab_num)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_applications_direction ON applications(direction)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    INSERT = f"INSERT INTO applications (oke, {', '.join(COLUMNS)}, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    # Явный id; NULL вместо id - новый идентификатор после максимального
+    INSERT_WITH_ID = (f"INSERT INTO applications (id, oke, {', '.join(COLUMNS)}, status) "
+                      f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+    @staticmethod
+    def _to_params(oke: str, row: List[str]) -> Tuple[str, ...]:
+        """Готовит параметры INSERT из строки заявки (идентификатор из строки не используется)"""
+        values = [str(value) if value is not None else "" for value in row[:DATA_COLUMNS]]
+        values += [""] * (DATA_COLUMNS - len(values))
+        return (oke, *values, _status_of(row))
+
+    def add(self, oke: str, row: List[str]) -> int:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(self.INSERT, self._to_params(oke, row))
+        return cursor.lastrowid
+
+    def add_many(self, rows: Iterable[StoredApplication]) -> List[int]:
+        conn = self._connection()
+        with conn:
+            # Блокировка записи берется сразу, поэтому идентификаторы пакета идут подряд
+            conn.execute("BEGIN IMMEDIATE")
+            last_id = self._last_id(conn)
+            cursor = conn.executemany(self.INSERT, (self._to_params(oke, row) for oke, row in rows))
+        return list(range(last_id + 1, last_id + 1 + max(cursor.rowcount, 0)))
+
+    @staticmethod
+    def _last_id(conn: sqlite3.Connection) -> int:
+        """Последний выданный идентификатор (AUTOINCREMENT не переиспользует id)"""
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'applications'").fetchone()
+        return row[0] if row else 0
+
+    def update_statuses(self, updates: Dict[int, str]) -> Tuple[List[int], int]:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = []
+            for app_id, status in updates.items():
+                cursor = conn.execute("UPDATE applications SET status = ? WHERE id = ?", (status, app_id))
+                if cursor.rowcount:
+                    updated.append(app_id)
+            version = self._bump_revision(conn, bool(updated))
+        return updated, version
+
+    def remove(self, ids: Iterable[int]) -> Tuple[List[int], int]:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = []
+            for app_id in ids:
+                if conn.execute("DELETE FROM applications WHERE id = ?", (app_id,)).rowcount:
+                    removed.append(app_id)
+            version = self._bump_revision(conn, bool(removed))
+        return removed, version
+
+    @staticmethod
+    def _bump_revision(conn: sqlite3.Connection, changed: bool) -> int:
+        """Увеличивает ревизию в таблице meta, если транзакция что-то изменила"""
+        version = SQLiteApplicationStore._revision(conn)
+        if changed:
+            version += 1
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('revision', ?)", (str(version),))
+        return version
+
+    @staticmethod
+    def _revision(conn: sqlite3.Connection) -> int:
+        """Ревизия из таблицы meta"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def revision(self) -> int:
+        return self._revision(self._connection())
+
+    def iter_applications(self, oke: Optional[str] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, tab_num: Optional[str] = None,
+                          direction: Optional[str] = None) -> Iterator[StoredApplication]:
+        conditions = []
+        params: List[str] = []
+        if oke:
+            conditions.append("oke = ?")
+            params.append(oke)
+        if date_from:
+            conditions.append("submitted_at >= ?")
+            params.append(date_from)
+        if date_to:
+            # Время хранится как 'YYYY-MM-DD HH:MM:SS', поэтому сравниваем с концом дня
+            conditions.append("submitted_at <= ?")
+            params.append(f"{date_to} 23:59:59")
+        if tab_num:
+            conditions.append("tab_num = ?")
+            params.append(tab_num)
+        if direction:
+            conditions.append("direction = ?")
+            params.append(direction)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self._connection().execute(
+            f"SELECT oke, {', '.join(self.COLUMNS)}, id, status FROM applications {where} ORDER BY id",
+            params
+        )
+        for record in cursor:
+            row = list(record[1:])
+            row[DATA_COLUMNS] = str(row[DATA_COLUMNS])
+            yield record[0], row
+
+    def count(self, oke: Optional[str] = None) -> int:
+        conn = self._connection()
+        if oke:
+            return conn.execute("SELECT COUNT(*) FROM applications WHERE oke = ?", (oke,)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+    def counts_by_oke(self) -> Dict[str, int]:
+        cursor = self._connection().execute("SELECT oke, COUNT(*) FROM applications GROUP BY oke")
+        return {oke: count for oke, count in cursor}
+
+    def fingerprint(self) -> int:
+        # AUTOINCREMENT не переиспользует id, поэтому последний выданный id - счетчик добавлений
+        return self._last_id(self._connection())
+
+    def is_migrated(self) -> bool:
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'migrated_from_excel'"
+        ).fetchone()
+        return row is not None
+
+    def migrate(self, rows: Iterable[StoredApplication]) -> int:
+        conn = self._connection()
+        with conn:
+            # Повторная проверка внутри транзакции: миграцию мог выполнить другой процесс
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_excel'").fetchone():
+                return 0
+            # AUTOINCREMENT сам продвигает sqlite_sequence за явно вставленные id
+            ordered = _order_for_migration(rows, self._last_id(conn) + 1)
+            cursor = conn.executemany(self.INSERT_WITH_ID,
+                                      ((app_id, *self._to_params(oke, row)) for app_id, oke, row in ordered))
+            migrated = max(cursor.rowcount, 0)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_excel', datetime('now'))"
+            )
+        logger.info(f"📦 Перенесено {migrated} заявок из Excel в SQLite")
+        return migrated
+
+    def close(self) -> None:
+        with self.lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # Соединение создано в другом потоке
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class PartitionedApplicationStore(ApplicationStore):
+    """
+    Хранилище заявок, разбитое на сегменты по (ОКЭ, месяц подачи)
+
+    Каждый сегмент - JSONL файл, в который только дописываются строки.
+    Манифест перечисляет сегменты с количеством строк и размером в байтах;
+    читается только та часть сегмента, которая учтена в манифесте, поэтому
+    недописанный при сбое хвост не виден и обрезается при следующей записи.
+    Сегменты прошедших месяцев помечаются закрытыми и кэшируются в памяти.
+    Смены статусов дописываются в отдельный файл, который так же учитывается
+    манифестом и при чтении накладывается на строки сегментов. Удаление заявок
+    (перенос в архив) переписывает затронутые сегменты целиком.
+
+    Только нужные сегменты открывает iter_applications с ОКЭ или периодом подачи
+    (чтение заявок за период без текстового запроса и фильтров полей). Кэш заявок
+    ExcelIntegration для поиска, выгрузки и статистики при перечитывании читает все
+    сегменты; закрытые сегменты при этом берутся из памяти.
+    """
+
+    MANIFEST_VERSION = 1
+    UNKNOWN_MONTH = "unknown"
+
+    def __init__(self, root_dir: str):
+        """
+        Args:
+            root_dir: Директория сегментов и манифеста
+        """
+        self.root_dir = root_dir
+        self.manifest_path = os.path.join(root_dir, MANIFEST_FILENAME)
+        self.statuses_path = os.path.join(root_dir, STATUSES_FILENAME)
+        self.lock_path = f"{self.manifest_path}.lock"
+        self.lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._manifest_signature: Optional[Tuple[int, int, int]] = None
+        # Закрытые сегменты: файл -> (учтенный размер, записи)
+        self._sealed_cache: Dict[str, Tuple[int, List[Tuple[int, str, List[str]]]]] = {}
+        # Статусы: (учтенный размер файла статусов, идентификатор -> статус)
+        self._statuses: Tuple[int, Dict[int, str]] = (0, {})
+        os.makedirs(root_dir, exist_ok=True)
+        logger.info(f"🗂️ Сегментированное хранилище заявок: {self.root_dir}")
+
+    # ==================== МАНИФЕСТ ====================
+
+    @classmethod
+    def _empty_manifest(cls) -> Dict[str, Any]:
+        """Манифест пустого хранилища"""
+        return {"version": cls.MANIFEST_VERSION, "next_id": 1, "migrated_from_excel": None, "partitions": {},
+                "status_bytes": 0, "revision": 0}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """Возвращает манифест, перечитывая файл только после его замены"""
+        try:
+            st = os.stat(self.manifest_path)
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self.lock:
+            if self._manifest is not None and signature == self._manifest_signature:
+                return self._manifest
+            if signature is None:
+                manifest = self._empty_manifest()
+            else:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            self._manifest = manifest
+            self._manifest_signature = signature
+            return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        """Атомарно записывает манифест (вызывается под блокировкой записи)"""
+        current_month = datetime.now().strftime("%Y-%m")
+        for partition in manifest["partitions"].values():
+            # Сегменты прошедших месяцев больше не меняются при обычной подаче заявок
+            partition["sealed"] = partition["month"] < current_month
+
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        with self.lock:
+            self._manifest = None
+
+    @contextmanager
+    def _write_lock(self):
+        """Межпроцессная блокировка записи; внутри манифест всегда актуален"""
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield self._load_manifest()
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        Список сегментов из манифеста
+
+        Returns:
+            Словари с ключами oke, month, file, rows, bytes, sealed
+        """
+        manifest = self._load_manifest()
+        return [dict(partition) for partition in sorted(
+            manifest["partitions"].values(), key=lambda p: (p["oke"], p["month"])
+        )]
+
+    # ==================== СЕГМЕНТЫ ====================
+
+    @classmethod
+    def _month_of(cls, submitted_at: str) -> str:
+        """Месяц подачи 'YYYY-MM' из времени 'YYYY-MM-DD HH:MM:SS'"""
+        month = submitted_at[:7]
+        if len(month) == 7 and month[4] == "-" and month[:4].isdigit() and month[5:].isdigit():
+            return month
+        return cls.UNKNOWN_MONTH
+
+    @staticmethod
+    def _segment_file(oke: str, month: str) -> str:
+        """Относительный путь к файлу сегмента"""
+        safe_oke = "".join(c for c in oke if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')
+        return os.path.join(safe_oke or "_", f"{month}.jsonl")
+
+    def _write(self, rows: Iterable[StoredApplication], mark_migrated: bool = False) -> Tuple[int, int]:
+        """
+        Дописывает заявки в сегменты и обновляет манифест
+
+        Returns:
+            Количество добавленных заявок и id последней из них
+        """
+        with self._write_lock() as manifest:
+            manifest = json.loads(json.dumps(manifest))
+            if mark_migrated and manifest["migrated_from_excel"]:
+                # Миграцию уже выполнил другой процесс
+                return 0, manifest["next_id"] - 1
+
+            next_id = manifest["next_id"]
+            if mark_migrated:
+                # Идентификаторы из мастер-файла сохраняются, next_id уходит за максимальный
+                records = _order_for_migration(rows, next_id)
+            else:
+                records = [(None, oke, row) for oke, row in rows]
+            added = 0
+            lines: Dict[str, List[bytes]] = {}
+            for app_id, oke, row in records:
+                app_id = app_id if app_id is not None else next_id
+                values = [str(value) if value is not None else "" for value in row]
+                values += [""] * (DATA_COLUMNS - len(values))
+                month = self._month_of(values[0])
+                key = f"{oke}|{month}"
+                if key not in manifest["partitions"]:
+                    manifest["partitions"][key] = {
+                        "oke": oke, "month": month, "file": self._segment_file(oke, month),
+                        "rows": 0, "bytes": 0, "first_id": app_id, "last_id": app_id, "sealed": False
+                    }
+                record = {"id": app_id, "row": values[:DATA_COLUMNS], "status": _status_of(values)}
+                lines.setdefault(key, []).append(
+                    (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                )
+                manifest["partitions"][key]["last_id"] = app_id
+                manifest["partitions"][key]["rows"] += 1
+                next_id = app_id + 1
+                added += 1
+
+            for key, partition_lines in lines.items():
+                partition = manifest["partitions"][key]
+                path = os.path.join(self.root_dir, partition["file"])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "ab") as f:
+                    # Отбрасываем хвост, не попавший в манифест из-за сбоя
+                    f.truncate(partition["bytes"])
+                    data = b"".join(partition_lines)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                partition["bytes"] += len(data)
+
+            manifest["next_id"] = next_id
+            if mark_migrated:
+                manifest["migrated_from_excel"] = datetime.now().isoformat()
+            if added or mark_migrated:
+                self._save_manifest(manifest)
+            return added, next_id - 1
+
+    def _read_segment(self, partition: Dict[str, Any]) -> List[Tuple[int, str, List[str]]]:
+        """Читает учтенную в манифесте часть сегмента"""
+        path = os.path.join(self.root_dir, partition["file"])
+        if partition.get("sealed"):
+            with self.lock:
+                cached = self._sealed_cache.get(path)
+            if cached is not None and cached[0] == partition["bytes"]:
+                return cached[1]
+
+        with open(path, "rb") as f:
+            data = f.read(partition["bytes"])
+        records = []
+        for line in data.splitlines():
+            record = json.loads(line)
+            row = record["row"] + [str(record["id"]), record.get("status") or DEFAULT_APPLICATION_STATUS]
+            records.append((record["id"], partition["oke"], row))
+
+        if partition.get("sealed"):
+            with self.lock:
+                self._sealed_cache[path] = (partition["bytes"], records)
+        return records
+
+    # ==================== СТАТУСЫ ====================
+
+    def _load_statuses(self, manifest: Dict[str, Any]) -> Dict[int, str]:
+        """Статусы, измененные после подачи заявок (учтенная в манифесте часть файла)"""
+        size = manifest.get("status_bytes", 0)
+        with self.lock:
+            cached_size, statuses = self._statuses
+        if cached_size == size:
+            return statuses
+
+        statuses = {}
+        if size:
+            with open(self.statuses_path, "rb") as f:
+                data = f.read(size)
+            for line in data.splitlines():
+                record = json.loads(line)
+                statuses[record["id"]] = record["status"]
+        with self.lock:
+            self._statuses = (size, statuses)
+        return statuses
+
+    def update_statuses(self, updates: Dict[int, str]) -> Tuple[List[int], int]:
+        with self._write_lock() as manifest:
+            manifest = json.loads(json.dumps(manifest))
+            # Идентификаторы выдаются подряд; удаленные заявки отсеивает вызывающий по своему индексу
+            updated = [app_id for app_id in updates if 1 <= app_id < manifest["next_id"]]
+            version = manifest.get("revision", 0)
+            if not updated:
+                return [], version
+
+            data = b"".join(
+                (json.dumps({"id": app_id, "status": updates[app_id]}, ensure_ascii=False) + "\n").encode("utf-8")
+                for app_id in updated
+            )
+            with open(self.statuses_path, "ab") as f:
+                # Отбрасываем хвост, не попавший в манифест из-за сбоя
+                f.truncate(manifest.get("status_bytes", 0))
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            manifest["status_bytes"] = manifest.get("status_bytes", 0) + len(data)
+            manifest["revision"] = version + 1
+            self._save_manifest(manifest)
+            return updated, version + 1
+
+    def revision(self) -> int:
+        return self._load_manifest().get("revision", 0)
+
+    # ==================== УДАЛЕНИЕ ====================
+
+    def remove(self, ids: Iterable[int]) -> Tuple[List[int], int]:
+        ids = set(ids)
+        ordered = sorted(ids)
+        with self._write_lock() as manifest:
+            manifest = json.loads(json.dumps(manifest))
+            version = manifest.get("revision", 0)
+            removed: List[int] = []
+            for key, partition in list(manifest["partitions"].items()):
+                # Сегмент затронут, если в диапазон его идентификаторов попадает хотя бы один удаляемый
+                position = bisect.bisect_left(ordered, partition["first_id"])
+                if position == len(ordered) or ordered[position] > partition["last_id"]:
+                    continue
+                kept = []
+                path = os.path.join(self.root_dir, partition["file"])
+                with open(path, "rb") as f:
+                    data = f.read(partition["bytes"])
+                for line in data.splitlines(keepends=True):
+                    app_id = json.loads(line)["id"]
+                    if app_id in ids:
+                        removed.append(app_id)
+                    else:
+                        kept.append((app_id, line))
+                if len(kept) == partition["rows"]:
+                    continue
+
+                with self.lock:
+                    self._sealed_cache.pop(path, None)
+                if not kept:
+                    os.remove(path)
+                    del manifest["partitions"][key]
+                    continue
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(b"".join(line for _, line in kept))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                partition.update(rows=len(kept), bytes=os.path.getsize(path),
+                                 first_id=kept[0][0], last_id=kept[-1][0])
+
+            if not removed:
+                return [], version
+            manifest["revision"] = version + 1
+            self._save_manifest(manifest)
+            return removed, version + 1
+
+    # ==================== ИНТЕРФЕЙС ХРАНИЛИЩА ====================
+
+    def add(self, oke: str, row: List[str]) -> int:
+        _, last_id = self._write([(oke, row)])
+        return last_id
+
+    def add_many(self, rows: Iterable[StoredApplication]) -> List[int]:
+        added, last_id = self._write(rows)
+        return list(range(last_id - added + 1, last_id + 1))
+
+    def iter_applications(self, oke: Optional[str] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, tab_num: Optional[str] = None,
+                          direction: Optional[str] = None) -> Iterator[StoredApplication]:
+        manifest = self._load_manifest()
+        month_from = date_from[:7] if date_from else None
+        month_to = date_to[:7] if date_to else None
+        date_to_end = f"{date_to} 23:59:59" if date_to else None
+
+        # Открываем только сегменты, подходящие по ОКЭ и месяцу
+        partitions = []
+        for partition in manifest["partitions"].values():
+            if oke and partition["oke"] != oke:
+                continue
+            if month_from or month_to:
+                if partition["month"] == self.UNKNOWN_MONTH:
+                    continue
+                if month_from and partition["month"] < month_from:
+                    continue
+                if month_to and partition["month"] > month_to:
+                    continue
+            partitions.append(partition)
+
+        def matches(row: List[str]) -> bool:
+            if date_from and row[0] < date_from:
+                return False
+            if date_to_end and row[0] > date_to_end:
+                return False
+            if tab_num and row[2] != tab_num:
+                return False
+            if direction and row[4] != direction:
+                return False
+            return True
+
+        # Сегменты упорядочены по id внутри себя, слияние дает общий порядок подачи
+        segments = [self._read_segment(partition) for partition in partitions]
+        statuses = self._load_statuses(manifest)
+        for app_id, record_oke, row in heapq.merge(*segments, key=lambda record: record[0]):
+            if matches(row):
+                row = list(row)
+                if app_id in statuses:
+                    row[DATA_COLUMNS + 1] = statuses[app_id]
+                yield record_oke, row
+
+    def count(self, oke: Optional[str] = None) -> int:
+        partitions = self._load_manifest()["partitions"].values()
+        return sum(p["rows"] for p in partitions if not oke or p["oke"] == oke)
+
+    def counts_by_oke(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for partition in self._load_manifest()["partitions"].values():
+            counts[partition["oke"]] = counts.get(partition["oke"], 0) + partition["rows"]
+        return counts
+
+    def fingerprint(self) -> int:
+        # Идентификаторы выдаются подряд, поэтому последний выданный растет с каждым добавлением
+        return self._load_manifest()["next_id"] - 1
+
+    def is_migrated(self) -> bool:
+        return bool(self._load_manifest()["migrated_from_excel"])
+
+    def migrate(self, rows: Iterable[StoredApplication]) -> int:
+        migrated, _ = self._write(rows, mark_migrated=True)
+        logger.info(f"📦 Перенесено {migrated} заявок из Excel в сегменты")
+        return migrated
+
+    def close(self) -> None:
+        with self.lock:
+            self._sealed_cache.clear()
+            self._statuses = (0, {})
+            self._manifest = None
+
+
+# Хранилища общие для всех экземпляров ExcelIntegration в процессе
+_stores: Dict[str, ApplicationStore] = {}
+_stores_lock = threading.Lock()
+
+def create_application_store(kind: Optional[str], data_dir: str) -> Optional[ApplicationStore]:
+    """
+    Возвращает общее для процесса хранилище заявок по названию бэкенда
+
+    Args:
+        kind: Название бэкенда ('sqlite', 'partitioned') или None/'excel' для работы напрямую с мастер-файлом
+        data_dir: Директория данных
+
+    Returns:
+        Экземпляр ApplicationStore или None
+    """
+    if not kind or kind == "excel":
+        return None
+    if kind == "sqlite":
+        db_path = os.path.abspath(os.path.join(data_dir, SQLITE_STORE_FILENAME))
+        with _stores_lock:
+            if db_path not in _stores:
+                _stores[db_path] = SQLiteApplicationStore(db_path)
+            return _stores[db_path]
+    if kind == "partitioned":
+        root_dir = os.path.abspath(os.path.join(data_dir, PARTITIONS_DIRNAME))
+        with _stores_lock:
+            if root_dir not in _stores:
+                _stores[root_dir] = PartitionedApplicationStore(root_dir)
+            return _stores[root_dir]
+    logger.warning(f"⚠️ Неизвестное хранилище заявок '{kind}', используется мастер-файл Excel")
+    return None
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Разбор потоков заявок для массовой загрузки
+Читает JSONL и CSV построчно и приводит записи к полям ExcelIntegration.add_applications_bulk
+"""
+
+import csv
+import json
+import logging
+from typing import Dict, Iterable, Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+BULK_FORMAT_JSONL = "jsonl"
+BULK_FORMAT_CSV = "csv"
+
+# Названия колонок: английские ключи API и заголовки листов мастер-файла
+FIELD_ALIASES = {
+    "oke": "oke",
+    "ОКЭ": "oke",
+    "submitted_at": "submitted_at",
+    "Время подачи заявки": "submitted_at",
+    "fio": "fio",
+    "ФИО": "fio",
+    "tab_num": "tab_num",
+    "Табельный номер": "tab_num",
+    "position": "position",
+    "Должность": "position",
+    "direction": "direction",
+    "Направление": "direction",
+    "flight_info": "flight_info",
+    "Информация о рейсе": "flight_info"
+}
+
+# Запись потока: словарь полей или ошибка разбора строки
+BulkRecord = Union[Dict[str, str], ValueError]
+
+def normalize_record(record: Dict) -> Dict[str, str]:
+    """
+    Приводит названия полей записи к ключам API
+
+    Args:
+        record: Запись с английскими ключами или заголовками листа
+
+    Returns:
+        Словарь с известными полями (неизвестные отбрасываются)
+    """
+    normalized = {}
+    for key, value in record.items():
+        field = FIELD_ALIASES.get(str(key).strip()) if key is not None else None
+        if field is not None:
+            normalized[field] = "" if value is None else str(value).strip()
+    return normalized
+
+def iter_jsonl_records(lines: Iterable[str]) -> Iterator[BulkRecord]:
+    """
+    Построчно разбирает JSONL поток
+
+    Args:
+        lines: Строки потока
+
+    Returns:
+        Генератор записей; для строки, которую не удалось разобрать, - ValueError
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Некорректный JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield ValueError("Строка должна быть JSON объектом")
+            continue
+        yield normalize_record(record)
+
+def iter_csv_records(lines: Iterable[str]) -> Iterator[BulkRecord]:
+    """
+    Построчно разбирает CSV поток с заголовком
+
+    Args:
+        lines: Строки потока (первая - заголовок)
+
+    Returns:
+        Генератор записей
+    """
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield ValueError(f"Некорректная строка CSV: {e}")
+            continue
+        if not any((value or "").strip() for value in record.values() if isinstance(value, str)):
+            continue
+        yield normalize_record(record)
+
+def iter_bulk_records(lines: Iterable[str], fmt: str) -> Iterator[BulkRecord]:
+    """
+    Разбирает поток заявок в указанном формате
+
+    Args:
+        lines: Строки потока
+        fmt: Формат ('jsonl' или 'csv')
+
+    Returns:
+        Генератор записей
+    """
+    if fmt == BULK_FORMAT_CSV:
+        return iter_csv_records(lines)
+    if fmt == BULK_FORMAT_JSONL:
+        return iter_jsonl_records(lines)
+    raise ValueError(f"Неподдерживаемый формат загрузки '{fmt}'")
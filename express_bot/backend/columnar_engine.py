@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Колоночное представление заявок на pandas/NumPy
+Фильтры, группировки и сортировки выполняются векторными операциями над колонками
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+from search_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Колонки с небольшим числом значений хранятся как категории: коды int8/int16 и словарь значений
+CATEGORICAL_FIELDS = ("oke", "position", "direction", "status")
+
+# Поля, по которым доступна группировка
+GROUP_FIELDS = CATEGORICAL_FIELDS + ("day", "month")
+
+class ColumnarApplications:
+    """
+    Снимок рабочих заявок в колонках DataFrame
+
+    Строится из строк кэша заявок (номер строки сохраняется в колонке row_id) один раз
+    и дальше поддерживается записями кэша: новые строки копятся и дописываются одним
+    блоком перед следующим запросом, смена статуса меняет код категории на месте.
+    Время подачи разбирается один раз в datetime64, ОКЭ, должность, направление
+    и статус кодируются категориями.
+    """
+
+    def __init__(self, entries: List[Tuple[str, List[str]]], id_column: int, status_column: int):
+        """
+        Args:
+            entries: Пары (ОКЭ, значения колонок) по порядку номеров строк
+            id_column: Номер колонки идентификатора заявки
+            status_column: Номер колонки статуса
+        """
+        if not PANDAS_AVAILABLE:
+            raise RuntimeError("pandas не установлен")
+        self.id_column = id_column
+        self.status_column = status_column
+        self.frame = self._build(entries, 0)
+        # Добавленные строки, еще не перенесенные в колонки
+        self.pending: List[Tuple[str, List[str]]] = []
+
+    @property
+    def size(self) -> int:
+        """Количество строк вместе с еще не перенесенными в колонки"""
+        return len(self.frame) + len(self.pending)
+
+    def _build(self, entries: List[Tuple[str, List[str]]], start: int) -> "pd.DataFrame":
+        """Колонки для строк с номерами от start"""
+        columns = list(zip(*[row for _, row in entries])) if entries else [()] * (self.status_column + 1)
+        submitted = pd.Series(columns[0], dtype="object")
+        return pd.DataFrame({
+            "row_id": np.arange(start, start + len(entries), dtype=np.int64),
+            "submitted": pd.to_datetime(submitted, format="%Y-%m-%d %H:%M:%S", errors="coerce"),
+            "app_id": pd.to_numeric(pd.Series(columns[self.id_column], dtype="object"),
+                                    errors="coerce").fillna(0).astype(np.int64),
+            "oke": pd.Categorical([oke for oke, _ in entries]),
+            "position": pd.Categorical(pd.Series(columns[3], dtype="object").str.strip()),
+            "direction": pd.Categorical(pd.Series(columns[4], dtype="object").str.strip()),
+            "status": pd.Categorical(pd.Series(columns[self.status_column], dtype="object").str.strip()),
+        })
+
+    def append(self, entries: List[Tuple[str, List[str]]]):
+        """
+        Добавляет строки, дописанные в конец кэша заявок
+
+        Строки переносятся в колонки одним блоком при следующем запросе, поэтому
+        серия записей между запросами стоит одного объединения колонок.
+
+        Args:
+            entries: Пары (ОКЭ, значения колонок) со следующими номерами строк
+        """
+        self.pending.extend(entries)
+
+    def set_status(self, row_id: int, status: str):
+        """
+        Меняет статус строки на месте (код категории, при новом значении - с новой категорией)
+
+        Args:
+            row_id: Номер строки
+            status: Новый статус
+        """
+        if row_id >= len(self.frame):
+            # Строка еще не перенесена: статус будет прочитан из нее при переносе
+            return
+        value = status.strip()
+        column = self.frame["status"]
+        if value not in column.cat.categories:
+            self.frame["status"] = column.cat.add_categories([value])
+        self.frame.at[row_id, "status"] = value
+
+    def reorder(self, row_ids: List[int]):
+        """
+        Оставляет строки с указанными номерами в указанном порядке (после удаления заявок)
+
+        Args:
+            row_ids: Прежние номера оставшихся строк по порядку новых номеров
+        """
+        self.flush()
+        frame = self.frame.iloc[np.asarray(row_ids, dtype=np.int64)].reset_index(drop=True)
+        frame["row_id"] = np.arange(len(frame), dtype=np.int64)
+        self.frame = frame
+
+    def flush(self):
+        """Переносит добавленные строки в колонки"""
+        if not self.pending:
+            return
+        tail = self._build(self.pending, len(self.frame))
+        self.pending = []
+        frame = self.frame
+        for field in CATEGORICAL_FIELDS:
+            # Новые значения дописываются в конец словаря: коды прежних строк не меняются
+            known = frame[field].cat.categories
+            added = tail[field].cat.categories.difference(known)
+            if len(added):
+                frame[field] = frame[field].cat.add_categories(list(added))
+            tail[field] = tail[field].cat.set_categories(frame[field].cat.categories)
+        self.frame = pd.concat([frame, tail], ignore_index=True)
+
+    def _category_mask(self, field: str, values: Optional[Iterable[str]] = None,
+                       substring: Optional[str] = None) -> "np.ndarray":
+        """
+        Маска строк по значениям категории: условие проверяется по словарю
+        значений, строки отбираются сравнением кодов
+        """
+        column = self.frame[field].cat
+        categories = list(column.categories)
+        if values is not None:
+            wanted = set(values)
+            codes = [code for code, value in enumerate(categories) if value in wanted]
+        else:
+            needle = normalize_text(substring)
+            codes = [code for code, value in enumerate(categories) if needle in normalize_text(value)]
+        return np.isin(column.codes.to_numpy(), codes)
+
+    def mask(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, filters: Optional[Dict[str, str]] = None,
+             row_ids: Optional[Iterable[int]] = None) -> "np.ndarray":
+        """
+        Булева маска строк, подходящих под условия
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            filters: Подстроки значений полей 'position', 'direction', 'status' (без учета регистра)
+            row_ids: Ограничить отбор этими номерами строк (например, найденными по тексту)
+
+        Returns:
+            Массив bool длиной в число строк
+        """
+        self.flush()
+        result = np.ones(self.size, dtype=bool)
+        if okes is not None:
+            result &= self._category_mask("oke", values=okes)
+        for field, value in (filters or {}).items():
+            if value:
+                result &= self._category_mask(field, substring=value)
+        submitted = self.frame["submitted"]
+        if date_from:
+            result &= (submitted >= pd.Timestamp(date_from)).to_numpy()
+        if date_to:
+            result &= (submitted < pd.Timestamp(date_to) + pd.Timedelta(days=1)).to_numpy()
+        if row_ids is not None:
+            selected = np.zeros(self.size, dtype=bool)
+            selected[np.fromiter(row_ids, dtype=np.int64)] = True
+            result &= selected
+        return result
+
+    def select(self, mask: "np.ndarray", newest_first: bool = False) -> "np.ndarray":
+        """
+        Номера строк по маске
+
+        Args:
+            mask: Маска строк из mask()
+            newest_first: Упорядочить по (время подачи, ID) от новых к старым;
+                строки без времени подачи идут последними
+
+        Returns:
+            Массив номеров строк
+        """
+        self.flush()
+        frame = self.frame[mask]
+        if newest_first:
+            frame = frame.sort_values(["submitted", "app_id"], ascending=False, na_position="last",
+                                      kind="stable")
+        return frame["row_id"].to_numpy()
+
+    def group_counts(self, field: str, mask: Optional["np.ndarray"] = None) -> Dict[str, int]:
+        """
+        Количество заявок по значениям поля
+
+        Args:
+            field: 'oke', 'position', 'direction', 'status', 'day' или 'month'
+            mask: Маска строк из mask() (по умолчанию все строки)
+
+        Returns:
+            Значение поля -> количество заявок (без пустых значений)
+        """
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Группировка по полю {field} не поддерживается")
+        self.flush()
+        frame = self.frame if mask is None else self.frame[mask]
+        if field in CATEGORICAL_FIELDS:
+            # Подсчет по кодам категорий без сравнения строк
+            codes = frame[field].cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(frame[field].cat.categories))
+            return {value: int(count) for value, count in zip(frame[field].cat.categories, counts)
+                    if count and value}
+        # Время подачи округляется до дня или месяца в datetime64, в строки переводятся только ключи групп
+        submitted = frame["submitted"].dropna().to_numpy()
+        keys, counts = np.unique(submitted.astype("datetime64[D]" if field == "day" else "datetime64[M]"),
+                                 return_counts=True)
+        return {str(key): int(count) for key, count in zip(keys, counts)}
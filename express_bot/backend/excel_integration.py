@@ -5,35 +5,263 @@
 """
 
 import os
+import time
+import queue
 import logging
+import tempfile
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from application_archive import ARCHIVE_DIRNAME, get_application_archive
+from application_changes import CHANGE_DELETE, CHANGE_INSERT, CHANGE_UPDATE, get_change_feed
+from application_ids import get_id_sequence
+from application_journal import FileSignature, StatusEntry, file_signature, get_application_journal
+from application_store import (APPLICATION_STATUSES, DEFAULT_APPLICATION_STATUS,
+                               ApplicationStore, create_application_store)
+from application_index import ApplicationRollups
+from application_snapshot import WorkbookSnapshot, read_snapshot, write_snapshot
+from application_dataset import (ALL_OKES, ID_COLUMN, STATUS_COLUMN, ApplicationDataset, DatasetValidator,
+                                 get_application_dataset, parse_id)
+from application_search import DEFAULT_QUERY_ENGINE, ApplicationSearch
+from xlsx_appender import (RowRemovals, RowUpdates, XlsxAppendUnsupported, append_rows, remove_rows,
+                            set_column_widths)
+from xlsx_reader import FastXlsxReader
+from write_coordinator import WriteCoordinator, get_write_coordinator
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MASTER_EXCEL_FILENAME = "все_заявки.xlsx"
-ALL_OKES = ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']
+JOURNAL_FILENAME = "все_заявки.journal.jsonl"
+JOURNAL_GENERATION_PROPERTY = "journal_generation"
+SNAPSHOT_FILENAME = "все_заявки.snapshot.bin"
+IDS_FILENAME = "все_заявки.ids"
+CHANGES_FILENAME = "все_заявки.changes.jsonl"
+
+# Режимы записи заявок в мастер-файл
+WRITE_MODE_JOURNAL = "journal"            # append-only журнал + фоновый перенос в Excel
+WRITE_MODE_GROUP_COMMIT = "group_commit"  # пакетная запись одним сохранением, вызов ждет сохранения
+WRITE_MODE_DIRECT = "direct"              # загрузка и сохранение файла на каждую заявку
+DEFAULT_WRITE_MODE = os.getenv("EXCEL_WRITE_MODE", WRITE_MODE_JOURNAL)
+
+# Дозапись строк правкой XML листа в zip-архиве вместо пересохранения книги через openpyxl
+FAST_APPEND_ENABLED = os.getenv("EXCEL_FAST_APPEND", "1") != "0"
+
+# Хранилище заявок: 'excel' - мастер-файл является основным хранилищем, 'sqlite' - SQLite (WAL),
+# 'partitioned' - сегменты по (ОКЭ, месяц подачи) с манифестом
+DEFAULT_APPLICATION_STORE = os.getenv("APPLICATION_STORE", "excel")
+
+# Задержка выгрузки мастер-файла из хранилища после записи (секунды): записи за это время
+# попадают в одну выгрузку; 0 - мастер-файл выгружается только вызовом export_master_file
+MASTER_EXPORT_DELAY = float(os.getenv("MASTER_EXPORT_DELAY", "10"))
+
+# Сколько ошибок массовой загрузки возвращается в отчете
+MAX_BULK_ERRORS = 1000
 
 try:
     from openpyxl import Workbook, load_workbook
     from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.packaging.custom import StringProperty
+    from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
 except ImportError:
     # Fallback для случаев, когда openpyxl не установлен
     OPENPYXL_AVAILABLE = False
     logger.warning("openpyxl не установлен. Excel функциональность будет недоступна.")
 
+class _GroupCommitWriter:
+    """Поток записи, объединяющий одновременные заявки в одно сохранение мастер-файла"""
+
+    def __init__(self, commit: Callable[[List[Tuple[str, List[str]]]], None],
+                 window: float = 0.05, max_rows: int = 200):
+        """
+        Args:
+            commit: Функция, записывающая пакет строк за одно сохранение
+            window: Время ожидания остальных заявок пакета после первой (секунды)
+            max_rows: Максимальный размер пакета
+        """
+        self.commit = commit
+        self.window = window
+        self.max_rows = max_rows
+        self.queue: "queue.Queue[Tuple[str, List[str], Future]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="excel-group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, oke: str, row: List[str]) -> Future:
+        """Ставит строку в очередь, Future завершится после сохранения пакета"""
+        future: Future = Future()
+        self.queue.put((oke, row, future))
+        return future
+
+    def _run(self):
+        """Основной цикл: собирает пакет за окно ожидания и сохраняет его"""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.commit([(oke, row) for oke, row, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, _, future in batch:
+                    future.set_result(True)
+                logger.info(f"💾 Пакет из {len(batch)} заявок записан одним сохранением")
+
+
+class _DeferredExport:
+    """Поток выгрузки мастер-файла из хранилища: записи за время задержки выгружаются одним сохранением"""
+
+    def __init__(self, export: Callable[[], object], delay: float):
+        """
+        Args:
+            export: Функция, выгружающая мастер-файл
+            delay: Задержка выгрузки после первой записи (секунды)
+        """
+        self.export = export
+        self.delay = delay
+        self.pending = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="excel-master-export", daemon=True)
+        self.thread.start()
+
+    def schedule(self):
+        """Отмечает, что хранилище изменилось и мастер-файл нужно выгрузить"""
+        self.pending.set()
+
+    def _run(self):
+        """Основной цикл: ждет записи, выжидает задержку и выгружает мастер-файл"""
+        while True:
+            self.pending.wait()
+            time.sleep(self.delay)
+            # Записи после сброса флага запланируют следующую выгрузку
+            self.pending.clear()
+            try:
+                self.export()
+            except Exception as e:
+                logger.error(f"❌ Ошибка выгрузки мастер-файла из хранилища: {e}")
+
+
+# Потоки записи и блокировки общие для всех экземпляров в процессе (по пути мастер-файла)
+_group_writers: Dict[str, _GroupCommitWriter] = {}
+_master_exports: Dict[str, _DeferredExport] = {}
+_master_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+def _get_master_lock(master_file_path: str) -> threading.Lock:
+    """Возвращает блокировку записи мастер-файла внутри процесса"""
+    key = os.path.abspath(master_file_path)
+    with _registry_lock:
+        if key not in _master_locks:
+            _master_locks[key] = threading.Lock()
+        return _master_locks[key]
+
+class _ColumnWidthTracker:
+    """Максимальная длина значений по колонкам листа, обновляемая инкрементально"""
+
+    MAX_WIDTH = 50
+    PADDING = 2
+
+    def __init__(self, lengths: List[int]):
+        self.lengths = lengths
+        self.changed = False
+
+    @classmethod
+    def from_worksheet(cls, ws, headers: List[str]) -> "_ColumnWidthTracker":
+        """
+        Восстанавливает максимумы из уже сохраненной ширины колонок (без сканирования ячеек)
+
+        Args:
+            ws: Лист мастер-файла
+            headers: Заголовки колонок (для колонок без заданной ширины)
+        """
+        widths = [ws.column_dimensions[get_column_letter(col_idx)].width for col_idx in range(1, len(headers) + 1)]
+        return cls.from_widths(widths, headers)
+
+    @classmethod
+    def from_widths(cls, widths: List[Optional[float]], headers: List[str]) -> "_ColumnWidthTracker":
+        """
+        Восстанавливает максимумы из сохраненной ширины колонок
+
+        Args:
+            widths: Ширина колонок (None - ширина не задана)
+            headers: Заголовки колонок (для колонок без заданной ширины)
+        """
+        lengths = []
+        for width, header in zip(widths, headers):
+            lengths.append(int(width) - cls.PADDING if width else len(header))
+        return cls(lengths)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable], headers: List[str]) -> "_ColumnWidthTracker":
+        """Полный пересчет по всем строкам (для выгрузки и обслуживания файла)"""
+        tracker = cls([len(header) for header in headers])
+        for row in rows:
+            tracker.update(row)
+        return tracker
+
+    def update(self, row: Iterable):
+        """Учитывает значения одной строки"""
+        for col_idx, value in enumerate(row):
+            if value is None or col_idx >= len(self.lengths):
+                continue
+            length = len(str(value))
+            if length > self.lengths[col_idx]:
+                self.lengths[col_idx] = length
+                self.changed = True
+
+    def widths(self) -> List[int]:
+        """Ширина колонок по накопленным максимумам"""
+        return [min(length + self.PADDING, self.MAX_WIDTH) for length in self.lengths]
+
+    def apply(self, ws, force: bool = False):
+        """Записывает ширину колонок в лист, если она изменилась"""
+        if not (self.changed or force):
+            return
+        for col_idx, width in enumerate(self.widths(), 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+
+def _stat_signature(path: str) -> Optional[FileSignature]:
+    """Версия файла (inode, mtime, размер) или None, если файла нет"""
+    try:
+        return file_signature(os.stat(path))
+    except FileNotFoundError:
+        return None
+
 class ExcelIntegration:
     """Класс для работы с Excel файлами заявок на рейсы"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", write_mode: str = DEFAULT_WRITE_MODE,
+                 compact_interval: float = 30.0, compact_threshold_bytes: int = 1024 * 1024,
+                 batch_window: float = 0.05, batch_max_rows: int = 200,
+                 store: Optional[ApplicationStore] = None,
+                 store_backend: Optional[str] = DEFAULT_APPLICATION_STORE,
+                 query_engine: str = DEFAULT_QUERY_ENGINE):
         """
         Инициализация Excel интеграции
         
         Args:
             data_dir: Директория для хранения Excel файлов
+            write_mode: Режим записи заявок (journal, group_commit или direct)
+            compact_interval: Период переноса журнала в мастер-файл (секунды)
+            compact_threshold_bytes: Размер журнала, при котором перенос запускается досрочно
+            batch_window: Окно сбора пакета в режиме group_commit (секунды)
+            batch_max_rows: Максимальный размер пакета в режиме group_commit
+            store: Хранилище заявок; если задано, мастер-файл становится выгрузкой из него
+            store_backend: Название бэкенда хранилища, если store не передан ('excel', 'sqlite' или 'partitioned')
+            query_engine: Движок выборок и группировок ('index' или 'pandas')
         """
         self.data_dir = data_dir
         self.ensure_data_dir()
@@ -45,48 +273,225 @@ class ExcelIntegration:
             "Табельный номер",
             "Должность",
             "Направление",
-            "Информация о рейсе"
+            "Информация о рейсе",
+            "ID заявки",
+            "Статус"
         ]
         
         logger.info(f"📊 Excel интеграция инициализирована. Директория: {self.data_dir}")
         
         self.master_file_path = os.path.join(self.data_dir, MASTER_EXCEL_FILENAME)
-        self.workbook = None # Будет инициализирован в _initialize_master_excel_file
-        self._initialize_master_excel_file()
+        self.journal_path = os.path.join(self.data_dir, JOURNAL_FILENAME)
+        self.snapshot_path = os.path.join(self.data_dir, SNAPSHOT_FILENAME)
+        self.id_sequence = get_id_sequence(os.path.join(self.data_dir, IDS_FILENAME))
+        self.archive = get_application_archive(os.path.join(self.data_dir, ARCHIVE_DIRNAME), ID_COLUMN)
+        self.changes = get_change_feed(os.path.join(self.data_dir, CHANGES_FILENAME))
+        self.journal = None
+        self.group_writer = None
+        self.master_export: Optional[_DeferredExport] = None
+        self.coordinator: Optional[WriteCoordinator] = None
+
+        self.store = store if store is not None else create_application_store(store_backend, self.data_dir)
+        if self.store is not None:
+            self._initialize_master_excel_file()
+            if not self.store.is_migrated():
+                self.store.migrate(self._iter_workbook_rows())
+            # Записи идут в хранилище, журнал и пакетная запись Excel не нужны
+            write_mode = WRITE_MODE_DIRECT
+            if OPENPYXL_AVAILABLE and MASTER_EXPORT_DELAY > 0:
+                # Мастер-файл остается выгрузкой из хранилища и обновляется после записей
+                key = os.path.abspath(self.master_file_path)
+                with _registry_lock:
+                    if key not in _master_exports:
+                        _master_exports[key] = _DeferredExport(self.export_master_file, MASTER_EXPORT_DELAY)
+                    self.master_export = _master_exports[key]
+        elif OPENPYXL_AVAILABLE:
+            # Мастер-файл пишет только один процесс, остальные пересылают ему записи
+            self.coordinator = get_write_coordinator(self.master_file_path)
+
+        if write_mode not in (WRITE_MODE_JOURNAL, WRITE_MODE_GROUP_COMMIT, WRITE_MODE_DIRECT):
+            logger.warning(f"⚠️ Неизвестный режим записи '{write_mode}', используется '{WRITE_MODE_JOURNAL}'")
+            write_mode = WRITE_MODE_JOURNAL
+        self.write_mode = write_mode
+
+        if write_mode == WRITE_MODE_GROUP_COMMIT and OPENPYXL_AVAILABLE and self.store is None:
+            key = os.path.abspath(self.master_file_path)
+            with _registry_lock:
+                if key not in _group_writers:
+                    _group_writers[key] = _GroupCommitWriter(self._append_rows, batch_window, batch_max_rows)
+                self.group_writer = _group_writers[key]
+
+        if write_mode == WRITE_MODE_JOURNAL and OPENPYXL_AVAILABLE and self.store is None:
+            self.journal = get_application_journal(self.journal_path)
+
+        self.dataset = self._get_shared_dataset()
+        self.counters = self.dataset.counters
+        self.search = ApplicationSearch(self.dataset, self.archive, self.headers, self.store, query_engine)
+
+        if self.coordinator is not None:
+            self.coordinator.register("append", self._commit_rows)
+            self.coordinator.register("replace", self._replace_master_file_local)
+            self.coordinator.register("rebuild_widths", self._rebuild_column_widths_local)
+            self.coordinator.register("statuses", self._update_statuses_local)
+            self.coordinator.register("archive", self._archive_periods_local)
+            self.coordinator.on_promoted("master_file", self._initialize_master_excel_file)
+            if self.journal is not None:
+                # Журнал пишут все процессы, а переносит в мастер-файл только писатель
+                self.coordinator.on_promoted(
+                    "journal_compactor",
+                    lambda: self._start_journal_compactor(compact_interval, compact_threshold_bytes)
+                )
+            self.coordinator.on_promoted("application_ids", self._assign_missing_ids)
+
+    def _start_journal_compactor(self, compact_interval: float, compact_threshold_bytes: int):
+        """Переносит записи, оставшиеся в журнале, и запускает фоновый компактор"""
+        if self.journal.is_compactor_running():
+            return
+        try:
+            self.compact_journal()
+        except Exception as e:
+            logger.error(f"❌ Ошибка переноса журнала при запуске: {e}")
+        self.journal.start_compactor(self.compact_journal, compact_interval, compact_threshold_bytes)
+
+    def _get_shared_dataset(self) -> ApplicationDataset:
+        """Кэш разобранных заявок, общий для процесса (по пути к источнику)"""
+        if self.store is not None:
+            key = (os.path.abspath(self.data_dir), type(self.store).__name__)
+        else:
+            key = (os.path.abspath(self.master_file_path), "excel")
+        return get_application_dataset(key, self._load_dataset, self._dataset_validator)
+
+    def _dataset_validator(self) -> DatasetValidator:
+        """Текущая версия источника заявок"""
+        if self.store is not None:
+            return {"store": self.store.fingerprint(), "revision": self.store.revision()}
+        return {
+            "workbook": _stat_signature(self.master_file_path),
+            "journal": _stat_signature(self.journal_path)
+        }
+
+    def _load_dataset(self) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+        """Читает все заявки источника для кэша"""
+        if self.store is None:
+            return self._read_excel_source()
+        sheetnames = list(ALL_OKES)
+        rows: Dict[str, List[List[str]]] = {}
+        for oke, row in self.store.iter_applications():
+            rows.setdefault(oke, []).append(row)
+            if oke not in sheetnames:
+                sheetnames.append(oke)
+        return sheetnames, rows
+
+    def _read_excel_source(self) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+        """Заявки мастер-файла вместе с еще не перенесенными записями журнала"""
+        snapshot = self._read_workbook()
+        if snapshot is None:
+            return [], {}
+        sheetnames, rows = snapshot.sheetnames, snapshot.rows
+        columns = len(self.headers)
+        for oke_rows in rows.values():
+            for row in oke_rows:
+                if len(row) < columns:
+                    # Строки, записанные до появления служебных колонок
+                    row.extend([""] * (columns - len(row)))
+
+        pending_rows, pending_statuses = self._read_pending_journal(snapshot.generation)
+        for oke, row in pending_rows:
+            rows.setdefault(oke, []).append(row)
+            if oke not in sheetnames:
+                sheetnames.append(oke)
+        if pending_statuses:
+            statuses = {app_id: status for _, app_id, status in pending_statuses}
+            for oke_rows in rows.values():
+                for row in oke_rows:
+                    status = statuses.get(parse_id(row[ID_COLUMN]))
+                    if status is not None:
+                        row[STATUS_COLUMN] = status
+        return sheetnames, rows
+
+    @property
+    def workbook(self):
+        """Мастер-файл, открытый только для чтения (для просмотра списка листов)"""
+        if not OPENPYXL_AVAILABLE or not os.path.exists(self.master_file_path):
+            return None
+        wb = load_workbook(self.master_file_path, read_only=True)
+        wb.close()
+        return wb
 
     def _initialize_master_excel_file(self):
-        """Инициализирует или загружает мастер-файл Excel и создает все листы ОКЭ"""
+        """Создает мастер-файл Excel со всеми листами ОКЭ, если его еще нет"""
         if not OPENPYXL_AVAILABLE:
             logger.warning("openpyxl не установлен. Мастер-файл Excel не будет инициализирован.")
             return
 
+        # Существующий файл не открываем: недостающие листы создаются при первой записи в них
         if os.path.exists(self.master_file_path):
-            self.workbook = load_workbook(self.master_file_path)
-            logger.info(f"Загружен существующий мастер-файл Excel: {self.master_file_path}")
-        else:
-            self.workbook = Workbook()
+            return
+
+        with _get_master_lock(self.master_file_path):
+            if os.path.exists(self.master_file_path):
+                return
+            wb = Workbook()
             # Удаляем лист по умолчанию, который создается автоматически, если он есть
-            if "Sheet" in self.workbook.sheetnames:
-                self.workbook.remove(self.workbook["Sheet"])
-            logger.info(f"Создан новый мастер-файл Excel: {self.master_file_path}")
-
-        for oke_name in ALL_OKES:
-            if oke_name not in self.workbook.sheetnames:
-                ws = self.workbook.create_sheet(title=oke_name)
-                # Добавляем заголовки
-                for col, header in enumerate(self.headers, 1):
-                    cell = ws.cell(row=1, column=col, value=header)
-                    cell.font = Font(bold=True, color="FFFFFF")
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    cell.alignment = Alignment(horizontal="center", vertical="center")
-
-                # Автоподбор ширины колонок (начальный)
-                for col_idx, header in enumerate(self.headers, 1):
-                    adjusted_width = min(len(header) + 2, 50)
-                    ws.column_dimensions[ws.cell(row=1, column=col_idx).column_letter].width = adjusted_width
-
-                logger.info(f"Создан лист '{oke_name}' в мастер-файле.")
-        self.workbook.save(self.master_file_path)
+            if "Sheet" in wb.sheetnames:
+                wb.remove(wb["Sheet"])
+            for oke_name in ALL_OKES:
+                self._create_oke_sheet(wb, oke_name)
+            self._save_workbook(wb)
+        logger.info(f"Создан новый мастер-файл Excel: {self.master_file_path}")
+
+    def _create_oke_sheet(self, wb, oke_name: str):
+        """Добавляет в рабочую книгу лист ОКЭ с оформленными заголовками"""
+        ws = wb.create_sheet(title=oke_name)
+        self._write_header_cells(ws)
+        logger.info(f"Создан лист '{oke_name}' в мастер-файле.")
+        return ws
+
+    def _write_header_cells(self, ws, first_col: int = 1):
+        """Записывает оформленные заголовки листа начиная с указанной колонки"""
+        for col in range(first_col, len(self.headers) + 1):
+            header = self.headers[col - 1]
+            cell = ws.cell(row=1, column=col, value=header)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+
+            # Автоподбор ширины колонок (начальный)
+            ws.column_dimensions[get_column_letter(col)].width = min(len(header) + 2, 50)
+
+    def _assign_missing_ids(self):
+        """
+        Присваивает идентификаторы заявкам, поданным до их появления
+
+        Выполняется процессом-писателем однократно: мастер-файл сохраняется
+        через openpyxl, только если в нем есть заявки без идентификатора.
+        """
+        if not os.path.exists(self.master_file_path):
+            return
+        if all(row[ID_COLUMN] for _, row in self.dataset.iter_rows()):
+            return
+
+        with _get_master_lock(self.master_file_path):
+            wb = load_workbook(self.master_file_path)
+            missing = []
+            for ws in wb.worksheets:
+                header_columns = sum(1 for cell in ws[1] if cell.value not in (None, ""))
+                if header_columns < len(self.headers):
+                    self._write_header_cells(ws, header_columns + 1)
+                for cells in ws.iter_rows(min_row=2, max_col=len(self.headers)):
+                    if cells[1].value not in (None, "") and str(cells[1].value).strip() \
+                            and parse_id(cells[ID_COLUMN].value) is None:
+                        missing.append(cells)
+            if not missing:
+                return
+            first_id = self.id_sequence.allocate(len(missing), self.dataset.max_id)
+            for offset, cells in enumerate(missing):
+                cells[ID_COLUMN].value = first_id + offset
+                if cells[STATUS_COLUMN].value in (None, ""):
+                    cells[STATUS_COLUMN].value = DEFAULT_APPLICATION_STATUS
+            self._save_workbook(wb)
+        self.dataset.invalidate()
+        logger.info(f"🆔 Присвоены идентификаторы {len(missing)} заявкам мастер-файла")
 
     def ensure_data_dir(self):
         """Создает директорию для данных, если она не существует"""
@@ -173,9 +578,9 @@ class ExcelIntegration:
         Returns:
             True если лист существует, False в противном случае
         """
-        if not OPENPYXL_AVAILABLE or self.workbook is None:
+        if self.store is None and (not OPENPYXL_AVAILABLE or not os.path.exists(self.master_file_path)):
             return False
-        return oke in self.workbook.sheetnames
+        return self.dataset.has_sheet(oke)
     
     def add_application(self, oke: str, fio: str, tab_num: str, position: str, 
                        direction: str, flight_info: str) -> bool:
@@ -193,43 +598,997 @@ class ExcelIntegration:
         Returns:
             True если заявка добавлена успешно, False в противном случае
         """
-        if not OPENPYXL_AVAILABLE:
+        if not OPENPYXL_AVAILABLE and self.store is None:
             logger.error("openpyxl не установлен. Невозможно добавить заявку в Excel.")
             return False
             
+        if oke not in ALL_OKES and not self.file_exists(oke):
+            logger.error(f"❌ Неизвестный ОКЭ '{oke}', заявка не добавлена")
+            return False
+
         try:
-            # Загружаем существующую рабочую книгу
-            wb = load_workbook(self.master_file_path)
-            ws = wb[oke]
-            
-            # Находим следующую свободную строку
-            next_row = ws.max_row + 1
-            
             # Подготавливаем данные для записи
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            data = [timestamp, fio, tab_num, position, direction, flight_info]
+            data = [timestamp, fio, tab_num, position, direction, flight_info, "", DEFAULT_APPLICATION_STATUS]
+
+            if self.store is not None:
+                with self.changes.recording() as changes:
+                    # Идентификатор выдает хранилище, он же его версия после записи
+                    app_id = self.store.add(oke, data)
+                    data[ID_COLUMN] = str(app_id)
+                    self.dataset.apply_local_write("store", app_id - 1, app_id, [(oke, data)])
+                    changes.extend(self._change_records(CHANGE_INSERT, [(oke, data)]))
+                self._schedule_master_export()
+            elif self.journal is not None:
+                # Подтверждаем заявку после fsync журнала, в Excel ее перенесет компактор
+                self._assign_ids([(oke, data)])
+                with self.changes.recording() as changes:
+                    before, after = self.journal.append(oke, data)
+                    self.dataset.apply_local_write("journal", before, after, [(oke, data)])
+                    changes.extend(self._change_records(CHANGE_INSERT, [(oke, data)]))
+            else:
+                # Ждем сохранения мастер-файла процессом-писателем (он же пишет изменение в ленту)
+                self._assign_ids([(oke, data)])
+                self.coordinator.submit("append", rows=[[oke, data]])
+
+            logger.info(f"✅ Заявка добавлена в {oke} (Excel): {fio} - {direction}")
+            return True
             
+        except Exception as e:
+            logger.error(f"❌ Ошибка добавления заявки в {oke} (Excel): {e}")
+            return False
+
+    def add_applications_bulk(self, records: Iterable, batch_size: int = 1000) -> dict:
+        """
+        Массово добавляет заявки пакетами, по одному сохранению на пакет
+
+        Записи проверяются по одной по мере чтения; ошибочные пропускаются
+        и попадают в отчет, не прерывая загрузку.
+
+        Args:
+            records: Словари с ключами oke, fio, tab_num, position, direction, flight_info
+                и необязательным submitted_at ('YYYY-MM-DD HH:MM:SS'); ValueError вместо
+                словаря означает запись, которую не удалось разобрать
+            batch_size: Количество заявок в одном пакете записи
+
+        Returns:
+            Словарь с количеством добавленных и отклоненных заявок и ошибками
+            (номер записи в потоке, начиная с 1, и описание)
+        """
+        result = {"added": 0, "failed": 0, "batches": 0, "errors": []}
+        if not OPENPYXL_AVAILABLE and self.store is None:
+            logger.error("openpyxl не установлен. Невозможно добавить заявки в Excel.")
+            result["errors"].append({"row": 0, "error": "openpyxl не установлен"})
+            return result
+
+        known_okes = set(ALL_OKES)
+        if self.store is None and os.path.exists(self.master_file_path):
+            self.dataset.ensure_fresh()
+            known_okes.update(self.dataset.sheetnames)
+
+        def fail(index: int, error: str):
+            result["failed"] += 1
+            if len(result["errors"]) < MAX_BULK_ERRORS:
+                result["errors"].append({"row": index, "error": error})
+
+        def commit(batch: List[Tuple[int, Tuple[str, List[str]]]]):
+            try:
+                self._commit_bulk_batch([row for _, row in batch])
+                result["added"] += len(batch)
+                result["batches"] += 1
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи пакета из {len(batch)} заявок: {e}")
+                for index, _ in batch:
+                    fail(index, f"Ошибка записи пакета: {e}")
+
+        batch: List[Tuple[int, Tuple[str, List[str]]]] = []
+        for index, record in enumerate(records, 1):
+            try:
+                batch.append((index, self._validate_bulk_record(record, known_okes)))
+            except ValueError as e:
+                fail(index, str(e))
+                continue
+            if len(batch) >= batch_size:
+                commit(batch)
+                batch = []
+        if batch:
+            commit(batch)
+
+        if len(result["errors"]) < result["failed"]:
+            result["errors_truncated"] = True
+        logger.info(f"📥 Массовая загрузка: добавлено {result['added']}, отклонено {result['failed']} "
+                    f"({result['batches']} пакетов)")
+        return result
+
+    def _validate_bulk_record(self, record, known_okes: set) -> Tuple[str, List[str]]:
+        """Проверяет запись массовой загрузки и возвращает (ОКЭ, значения колонок)"""
+        if isinstance(record, ValueError):
+            raise record
+        if not isinstance(record, dict):
+            raise ValueError("Запись должна быть словарем")
+
+        oke = str(record.get("oke") or "").strip()
+        if not oke:
+            raise ValueError("Не указан ОКЭ")
+        if oke not in known_okes:
+            raise ValueError(f"Неизвестный ОКЭ '{oke}'")
+        fio = str(record.get("fio") or "").strip()
+        if not fio:
+            raise ValueError("Не указано ФИО")
+
+        submitted_at = str(record.get("submitted_at") or "").strip()
+        if submitted_at:
+            try:
+                datetime.strptime(submitted_at, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                raise ValueError(f"Некорректное время подачи '{submitted_at}', ожидается YYYY-MM-DD HH:MM:SS")
+        else:
+            submitted_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        return oke, [
+            submitted_at,
+            fio,
+            str(record.get("tab_num") or "").strip(),
+            str(record.get("position") or "").strip(),
+            str(record.get("direction") or "").strip(),
+            str(record.get("flight_info") or "").strip(),
+            "",
+            DEFAULT_APPLICATION_STATUS
+        ]
+
+    def _commit_bulk_batch(self, rows: List[Tuple[str, List[str]]]):
+        """Записывает пакет массовой загрузки одной транзакцией или одним сохранением"""
+        if self.store is not None:
+            with self.changes.recording() as changes:
+                ids = self.store.add_many(rows)
+                for (_, data), app_id in zip(rows, ids):
+                    data[ID_COLUMN] = str(app_id)
+                if ids:
+                    self.dataset.apply_local_write("store", ids[0] - 1, ids[-1], rows)
+                    changes.extend(self._change_records(CHANGE_INSERT, rows))
+            if ids:
+                self._schedule_master_export()
+        else:
+            # Пакет уже достаточно велик: пишем его в мастер-файл напрямую, минуя журнал
+            rows = self._assign_ids(rows)
+            self.coordinator.submit("append", rows=[[oke, data] for oke, data in rows], batch=True)
+
+    def _assign_ids(self, rows: List[Tuple[str, List[str]]]) -> List[Tuple[str, List[str]]]:
+        """
+        Присваивает идентификаторы строкам мастер-файла, у которых их еще нет
+
+        Args:
+            rows: Пары (ОКЭ, значения колонок); строки дополняются до всех колонок
+
+        Returns:
+            Те же пары с заполненными идентификатором и статусом
+        """
+        columns = len(self.headers)
+        missing = []
+        for _, data in rows:
+            if len(data) < columns:
+                data.extend([""] * (columns - len(data)))
+            if not data[ID_COLUMN]:
+                missing.append(data)
+            if not data[STATUS_COLUMN]:
+                data[STATUS_COLUMN] = DEFAULT_APPLICATION_STATUS
+        if missing:
+            first_id = self.id_sequence.allocate(len(missing), self.dataset.max_id)
+            for offset, data in enumerate(missing):
+                data[ID_COLUMN] = str(first_id + offset)
+        return rows
+
+    def get_application(self, app_id: int) -> Optional[dict]:
+        """
+        Находит заявку по идентификатору через индекс, без перебора листов
+
+        Args:
+            app_id: Идентификатор заявки
+
+        Returns:
+            Словарь с данными заявки и ключом 'oke' или None, если заявки нет
+        """
+        found = self.dataset.locate(app_id)
+        if found is None:
+            return None
+        oke, row = found
+        application = dict(zip(self.headers, row))
+        application['oke'] = oke
+        return application
+
+    def update_application_statuses(self, updates: Dict[int, str]) -> dict:
+        """
+        Меняет статусы заявок одной записью
+
+        В режиме журнала смены статусов дописываются в журнал и переносятся
+        в мастер-файл компактором вместе с новыми заявками; в остальных режимах
+        процесс-писатель меняет ячейки статуса за одно сохранение файла.
+
+        Args:
+            updates: Идентификатор заявки -> новый статус (из APPLICATION_STATUSES)
+
+        Returns:
+            Словарь со списками измененных и не найденных идентификаторов
+            и записей с недопустимым статусом
+        """
+        result = {"updated": [], "not_found": [], "invalid": []}
+        if not OPENPYXL_AVAILABLE and self.store is None:
+            logger.error("openpyxl не установлен. Невозможно изменить статусы заявок.")
+            return result
+
+        entries: List[StatusEntry] = []
+        found_rows: Dict[int, List[str]] = {}
+        for app_id, status in updates.items():
+            if status not in APPLICATION_STATUSES:
+                result["invalid"].append({"id": app_id, "status": status})
+                continue
+            found = self.dataset.locate(app_id)
+            if found is None:
+                result["not_found"].append(app_id)
+            else:
+                entries.append((found[0], app_id, status))
+                found_rows[app_id] = found[1]
+        if not entries:
+            return result
+
+        if self.store is not None:
+            with self.changes.recording() as changes:
+                updated, version = self.store.update_statuses({app_id: status for _, app_id, status in entries})
+                updated_ids = set(updated)
+                entries = [entry for entry in entries if entry[1] in updated_ids]
+                if entries:
+                    self.dataset.apply_local_write("revision", version - 1, version, [], entries)
+                    changes.extend(self._status_changes(entries, found_rows))
+            if entries:
+                self._schedule_master_export()
+        elif self.journal is not None:
+            with self.changes.recording() as changes:
+                before, after = self.journal.append_statuses(entries)
+                self.dataset.apply_local_write("journal", before, after, [], entries)
+                changes.extend(self._status_changes(entries, found_rows))
+        else:
+            # Изменения в ленту пишет процесс-писатель вместе с сохранением файла
+            self.coordinator.submit("statuses", statuses=[list(entry) for entry in entries])
+
+        result["updated"] = [app_id for _, app_id, _ in entries]
+        logger.info(f"🏷️ Изменены статусы {len(entries)} заявок")
+        return result
+
+    def _update_statuses_local(self, statuses: List[List]) -> int:
+        """Меняет статусы в мастер-файле в процессе-писателе"""
+        entries = [(oke, int(app_id), status) for oke, app_id, status in statuses]
+        self._append_rows([], None, entries)
+        return len(entries)
+
+    # ==================== ЛЕНТА ИЗМЕНЕНИЙ ====================
+
+    @staticmethod
+    def _change_records(op: str, rows: List[Tuple[str, List[str]]]) -> List[Dict[str, Any]]:
+        """Записи ленты изменений для записанных заявок (добавляются внутри changes.recording())"""
+        return [
+            {"op": op, "id": parse_id(row[ID_COLUMN]), "oke": oke, "row": list(row)} if op != CHANGE_DELETE
+            else {"op": op, "id": parse_id(row[ID_COLUMN]), "oke": oke}
+            for oke, row in rows
+        ]
+
+    @classmethod
+    def _status_changes(cls, entries: List[StatusEntry],
+                        rows: Dict[int, List[str]]) -> List[Dict[str, Any]]:
+        """Записи ленты для смен статусов: строки заявок (до смены) с новым статусом"""
+        changed = []
+        for oke, app_id, status in entries:
+            if app_id in rows:
+                row = list(rows[app_id])
+                row[STATUS_COLUMN] = status
+                changed.append((oke, row))
+        return cls._change_records(CHANGE_UPDATE, changed)
+
+    def get_changes_seq(self) -> int:
+        """Номер последней записи ленты изменений (берется до чтения полного списка заявок)"""
+        return self.changes.last_seq()
+
+    def get_changes(self, since: int, limit: int = 1000, wait: float = 0) -> dict:
+        """
+        Изменения заявок после указанного номера ленты
+
+        Args:
+            since: Последний номер, известный потребителю
+            limit: Максимальное количество изменений в ответе
+            wait: Сколько ждать новых изменений, если их еще нет (секунды, long-poll)
+
+        Returns:
+            Словарь со списком изменений (seq, op, id, oke и, кроме delete, application),
+            номером для следующего запроса (last_seq) и признаком сброса (reset)
+        """
+        if wait > 0:
+            self.changes.wait(since, wait)
+        records, last_seq, reset = self.changes.changes_since(since, limit)
+        changes = []
+        for record in records:
+            change = {key: record[key] for key in ("seq", "at", "op", "id", "oke")}
+            if "row" in record:
+                change["application"] = dict(zip(self.headers, record["row"]))
+            changes.append(change)
+        return {"changes": changes, "last_seq": last_seq, "reset": reset}
+
+    def _commit_rows(self, rows: List[List], batch: bool = False) -> int:
+        """
+        Записывает строки в мастер-файл в процессе-писателе
+
+        Args:
+            rows: Список пар [ОКЭ, значения колонок]
+            batch: Записать строки одним сохранением, не дожидаясь пакетной записи
+
+        Returns:
+            Количество записанных строк
+        """
+        rows = [(oke, data) for oke, data in rows]
+        if self.group_writer is not None and not batch:
+            # Строки попадают в общий пакет вместе с заявками других процессов
+            futures = [self.group_writer.submit(oke, data) for oke, data in rows]
+            for future in futures:
+                future.result()
+        else:
+            self._append_rows(rows)
+        return len(rows)
+
+    def _append_rows(self, rows: List[Tuple[str, List[str]]], generation: Optional[str] = None,
+                     statuses: Optional[List[StatusEntry]] = None):
+        """
+        Дописывает строки и меняет статусы в мастер-файле за одно сохранение
+
+        Args:
+            rows: Список пар (ОКЭ, значения колонок)
+            generation: Поколение компактации журнала для записи в свойства файла
+            statuses: Смены статусов (ОКЭ, идентификатор заявки, статус), применяются после дозаписи
+        """
+        # Строки журнала, записанные до появления идентификаторов, получают их при переносе
+        rows = self._assign_ids(rows)
+        statuses = statuses or []
+        if generation is not None:
+            # Перенос журнала: изменения его записей уже в ленте
+            with _get_master_lock(self.master_file_path):
+                self._append_rows_locked(rows, generation, statuses)
+            return
+
+        # Запись процесса-писателя: изменения попадают в ленту под той же блокировкой
+        found_rows = {}
+        for _, app_id, _ in statuses:
+            found = self.dataset.locate(app_id)
+            if found is not None:
+                found_rows[app_id] = found[1]
+        with self.changes.recording() as changes, _get_master_lock(self.master_file_path):
+            self._append_rows_locked(rows, None, statuses)
+            changes.extend(self._change_records(CHANGE_INSERT, rows))
+            changes.extend(self._status_changes(statuses, found_rows))
+
+    def _append_rows_locked(self, rows: List[Tuple[str, List[str]]], generation: Optional[str],
+                            statuses: List[StatusEntry]):
+        """Дописывает строки в мастер-файл (вызывается под блокировкой записи)"""
+        before = _stat_signature(self.master_file_path)
+        appended = False
+        if FAST_APPEND_ENABLED:
+            try:
+                self._append_rows_xlsx(rows, generation, statuses)
+                appended = True
+            except XlsxAppendUnsupported as e:
+                logger.info(f"ℹ️ Быстрая дозапись недоступна ({e}), файл сохраняется через openpyxl")
+        if not appended:
+            self._append_rows_openpyxl(rows, generation, statuses)
+
+        if generation is None:
+            self.dataset.apply_local_write("workbook", before, _stat_signature(self.master_file_path),
+                                           rows, statuses)
+        else:
+            # Записи журнала переехали в мастер-файл, журнал будет обрезан: перечитаем при обращении
+            self.dataset.invalidate()
+
+    def _append_rows_xlsx(self, rows: List[Tuple[str, List[str]]], generation: Optional[str],
+                          statuses: List[StatusEntry]):
+        """Дописывает строки правкой XML листов в zip-архиве, без пересохранения остальных листов"""
+        properties = {JOURNAL_GENERATION_PROPERTY: generation} if generation is not None else None
+        updates = None
+        if statuses:
+            values: Dict[str, Dict[str, str]] = {}
+            for oke, app_id, status in statuses:
+                values.setdefault(oke, {})[str(app_id)] = status
+            updates = RowUpdates(ID_COLUMN, STATUS_COLUMN, values)
+        tmp_path = f"{self.master_file_path}.tmp"
+        try:
+            append_rows(self.master_file_path, tmp_path, rows, len(self.headers), properties,
+                        self._update_column_widths, updates)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self.master_file_path)
+
+    def _update_column_widths(self, widths: List[Optional[float]], rows: List[List[str]]) -> Optional[List[int]]:
+        """Ширина колонок листа с учетом новых строк или None, если она не изменилась"""
+        tracker = _ColumnWidthTracker.from_widths(widths, self.headers)
+        for row in rows:
+            tracker.update(row)
+        return tracker.widths() if tracker.changed else None
+
+    def _append_rows_openpyxl(self, rows: List[Tuple[str, List[str]]], generation: Optional[str],
+                              statuses: List[StatusEntry]):
+        """Дописывает строки загрузкой и сохранением всей рабочей книги"""
+        # Загружаем существующую рабочую книгу
+        wb = load_workbook(self.master_file_path)
+
+        next_rows: Dict[str, int] = {}
+        trackers: Dict[str, _ColumnWidthTracker] = {}
+        for oke, data in rows:
+            ws = wb[oke] if oke in wb.sheetnames else self._create_oke_sheet(wb, oke)
+            if oke not in next_rows:
+                # max_row пересчитывается по всем ячейкам, поэтому берем его один раз на лист
+                next_rows[oke] = ws.max_row + 1
+                trackers[oke] = _ColumnWidthTracker.from_worksheet(ws, self.headers)
+
+            # Находим следующую свободную строку
+            next_row = next_rows[oke]
+            next_rows[oke] += 1
+
             # Записываем данные
             for col, value in enumerate(data, 1):
                 cell = ws.cell(row=next_row, column=col, value=value)
                 cell.alignment = Alignment(horizontal="left", vertical="center")
-            
-            # Автоподбор ширины колонок для новых данных
-            for col_idx, value in enumerate(data, 1):
-                column_letter = ws.cell(row=next_row, column=col_idx).column_letter
-                max_length = max((len(str(cell.value)) for cell in ws[column_letter] if cell.value is not None), default=0)
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
 
-            # Сохраняем файл
-            wb.save(self.master_file_path)
-            logger.info(f"✅ Заявка добавлена в {oke} (Excel): {fio} - {direction}")
+            # Ширина колонок обновляется только по значениям новой строки
+            trackers[oke].update(data)
+
+        for oke, tracker in trackers.items():
+            tracker.apply(wb[oke])
+
+        statuses_by_sheet: Dict[str, Dict[int, str]] = {}
+        for oke, app_id, status in statuses:
+            statuses_by_sheet.setdefault(oke, {})[app_id] = status
+        for oke, sheet_statuses in statuses_by_sheet.items():
+            if oke not in wb.sheetnames:
+                continue
+            for cells in wb[oke].iter_rows(min_row=2, max_col=len(self.headers)):
+                status = sheet_statuses.get(parse_id(cells[ID_COLUMN].value))
+                if status is not None:
+                    cells[STATUS_COLUMN].value = status
+
+        if generation is not None:
+            if JOURNAL_GENERATION_PROPERTY in wb.custom_doc_props.names:
+                wb.custom_doc_props[JOURNAL_GENERATION_PROPERTY].value = generation
+            else:
+                wb.custom_doc_props.append(StringProperty(name=JOURNAL_GENERATION_PROPERTY, value=generation))
+
+        self._save_workbook(wb)
+
+    def rebuild_column_widths(self) -> bool:
+        """
+        Полностью пересчитывает ширину колонок мастер-файла
+
+        При добавлении заявок ширина обновляется только по новым строкам;
+        полный пересчет нужен для обслуживания файла (например, после ручного редактирования).
+
+        Returns:
+            True если пересчет выполнен успешно
+        """
+        if self.coordinator is None or not os.path.exists(self.master_file_path):
+            return False
+        try:
+            return self.coordinator.submit("rebuild_widths")
+        except Exception as e:
+            logger.error(f"❌ Ошибка пересчета ширины колонок: {e}")
+            return False
+
+    def _rebuild_column_widths_local(self) -> bool:
+        """
+        Пересчитывает ширину колонок в процессе-писателе
+
+        Вызывается после переноса журнала и удаления заявок, перенесенных в архив:
+        дозапись только расширяет колонки, а удаление может их сузить. Ширина
+        считается по строкам кэша заявок, без обхода ячеек файла; файл меняется,
+        только если ширина какого-либо листа изменилась.
+        """
+        try:
+            trackers = {oke: _ColumnWidthTracker.from_rows([], self.headers) for oke in ALL_OKES}
+            for oke, row in self.dataset.iter_rows():
+                if oke not in trackers:
+                    trackers[oke] = _ColumnWidthTracker.from_rows([], self.headers)
+                trackers[oke].update(row)
+            widths = {oke: tracker.widths() for oke, tracker in trackers.items()}
+
+            with _get_master_lock(self.master_file_path):
+                before = _stat_signature(self.master_file_path)
+                changed = None
+                if FAST_APPEND_ENABLED:
+                    try:
+                        changed = self._set_column_widths_xlsx(widths)
+                    except XlsxAppendUnsupported as e:
+                        logger.info(f"ℹ️ Быстрая правка ширины недоступна ({e}), файл сохраняется через openpyxl")
+                if changed is None:
+                    wb = load_workbook(self.master_file_path)
+                    for oke, tracker in trackers.items():
+                        if oke in wb.sheetnames:
+                            tracker.apply(wb[oke], force=True)
+                    self._save_workbook(wb)
+                    changed = True
+                if changed:
+                    # Строки не менялись: кэш заявок перечитывать не нужно
+                    self.dataset.apply_local_write("workbook", before, _stat_signature(self.master_file_path), [])
+            if changed:
+                logger.info("📏 Ширина колонок мастер-файла пересчитана")
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Ошибка добавления заявки в {oke} (Excel): {e}")
+            logger.error(f"❌ Ошибка пересчета ширины колонок: {e}")
             return False
-    
+
+    def _set_column_widths_xlsx(self, widths: Dict[str, List[int]]) -> bool:
+        """Записывает ширину колонок правкой XML листов; возвращает, изменился ли файл"""
+        tmp_path = f"{self.master_file_path}.tmp"
+        try:
+            changed = set_column_widths(self.master_file_path, tmp_path, widths)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if changed:
+            os.replace(tmp_path, self.master_file_path)
+        return bool(changed)
+
+    def replace_master_file(self, source_path: str) -> bool:
+        """
+        Заменяет мастер-файл подготовленным файлом (например, при исправлении данных)
+
+        Файл переносится процессом-писателем, поэтому замена не теряет
+        заявки, которые пишут другие процессы.
+
+        Args:
+            source_path: Путь к новому файлу в той же файловой системе, что и мастер-файл
+
+        Returns:
+            True если файл заменен успешно
+        """
+        if self.coordinator is None:
+            return False
+        try:
+            self.coordinator.submit("replace", path=os.path.abspath(source_path))
+            logger.info(f"🔁 Мастер-файл заменен: {source_path}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка замены мастер-файла: {e}")
+            return False
+
+    def _replace_master_file_local(self, path: str):
+        """Заменяет мастер-файл в процессе-писателе"""
+        with _get_master_lock(self.master_file_path):
+            os.replace(path, self.master_file_path)
+        self.dataset.invalidate()
+
+    # ==================== АРХИВ ЗАКРЫТЫХ ПЕРИОДОВ ====================
+
+    def archive_closed_periods(self, periods: Iterable, now: Optional[datetime] = None) -> dict:
+        """
+        Переносит заявки закрытых периодов приема в архивные сегменты
+
+        Заявки закрытых периодов больше не меняются, поэтому после переноса
+        они не загружаются в кэш и не просматриваются при каждом поиске;
+        запросы с периодом подачи читают нужные сегменты архива по требованию.
+
+        Args:
+            periods: Периоды приема (объекты с атрибутами id, name, start_date, end_date)
+            now: Текущее время; закрытым считается период, закончившийся раньше
+
+        Returns:
+            Словарь с количеством перенесенных заявок и идентификаторами созданных сегментов
+        """
+        now = now or datetime.now()
+        closed = [
+            {
+                "id": period.id,
+                "name": period.name,
+                "start": period.start_date.strftime("%Y-%m-%d %H:%M:%S"),
+                "end": period.end_date.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            for period in periods if period.end_date < now
+        ]
+        if not closed:
+            return {"archived": 0, "segments": []}
+        if self.store is not None:
+            return self._archive_periods_local(closed)
+        if self.coordinator is None or not os.path.exists(self.master_file_path):
+            return {"archived": 0, "segments": []}
+        # Заявки удаляются из мастер-файла, поэтому перенос выполняет процесс-писатель
+        return self.coordinator.submit("archive", periods=closed)
+
+    def _archive_periods_local(self, periods: List[Dict[str, str]]) -> dict:
+        """
+        Переносит заявки периодов в архив (в процессе-писателе или для хранилища)
+
+        Args:
+            periods: Закрытые периоды: id, name, start, end ('YYYY-MM-DD HH:MM:SS')
+        """
+        result = {"archived": 0, "segments": []}
+        with self.archive.write_lock():
+            self._finish_pending_archive()
+            if self.journal is not None:
+                # Удаляются строки мастер-файла, поэтому сначала переносим туда журнал
+                self.compact_journal()
+
+            selected: Dict[str, List[Tuple[str, List[str]]]] = {}
+            for oke, row in self.dataset.iter_rows():
+                submitted_at = row[0]
+                # Время подачи в другом формате не сравнимо с границами периода
+                if len(submitted_at) < 10 or submitted_at[4] != "-" or parse_id(row[ID_COLUMN]) is None:
+                    continue
+                for period in periods:
+                    if period["start"] <= submitted_at <= period["end"]:
+                        selected.setdefault(period["id"], []).append((oke, list(row)))
+                        break
+            if not selected:
+                return result
+
+            segments = [self.archive.write_segment(period, selected[period["id"]])
+                        for period in periods if period["id"] in selected]
+            ids = {parse_id(row[ID_COLUMN]) for rows in selected.values() for _, row in rows}
+            with self.changes.recording() as changes:
+                self._remove_archived_rows(ids)
+                changes.extend(self._change_records(CHANGE_DELETE,
+                                                    [row for rows in selected.values() for row in rows]))
+            for segment in segments:
+                self.archive.commit_segment(segment["id"])
+                result["segments"].append(segment["id"])
+            result["archived"] = len(ids)
+        logger.info(f"🧊 В архив перенесено {result['archived']} заявок закрытых периодов "
+                    f"({len(result['segments'])} сегментов)")
+        return result
+
+    def _finish_pending_archive(self):
+        """Завершает перенос, прерванный после записи сегментов (вызывается под блокировкой архива)"""
+        for segment in self.archive.segments(committed_only=False):
+            if segment["committed"]:
+                continue
+            rows = self.archive.read_segment(segment)
+            ids = {parse_id(row[ID_COLUMN]) for _, row in rows}
+            with self.changes.recording() as changes:
+                if self._remove_archived_rows(ids):
+                    changes.extend(self._change_records(CHANGE_DELETE, rows))
+            self.archive.commit_segment(segment["id"])
+            logger.info(f"🧊 Завершен прерванный перенос в архив: сегмент {segment['id']}")
+
+    def _remove_archived_rows(self, ids: set) -> int:
+        """
+        Удаляет перенесенные в архив заявки из рабочего источника
+
+        Args:
+            ids: Идентификаторы заявок
+
+        Returns:
+            Количество удаленных заявок
+        """
+        if self.store is not None:
+            removed, version = self.store.remove(ids)
+            if removed:
+                self.dataset.apply_local_remove("revision", version - 1, version, set(removed))
+                self._schedule_master_export()
+            return len(removed)
+
+        with _get_master_lock(self.master_file_path):
+            before = _stat_signature(self.master_file_path)
+            removed = None
+            if FAST_APPEND_ENABLED:
+                try:
+                    removed = self._remove_rows_xlsx(ids)
+                except XlsxAppendUnsupported as e:
+                    logger.info(f"ℹ️ Быстрое удаление строк недоступно ({e}), файл сохраняется через openpyxl")
+            if removed is None:
+                removed = self._remove_rows_openpyxl(ids)
+            if removed:
+                self.dataset.apply_local_remove("workbook", before, _stat_signature(self.master_file_path), ids)
+        if removed:
+            # Удаленные строки могли быть самыми длинными: колонки пересчитываются полностью
+            self._rebuild_column_widths_local()
+        return removed
+
+    def _remove_rows_xlsx(self, ids: set) -> int:
+        """Удаляет строки правкой XML листов в zip-архиве; возвращает количество удаленных строк"""
+        tmp_path = f"{self.master_file_path}.tmp"
+        try:
+            removed = remove_rows(self.master_file_path, tmp_path,
+                                  RowRemovals(ID_COLUMN, {str(app_id) for app_id in ids}))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if removed:
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.master_file_path)
+        return sum(removed.values())
+
+    def _remove_rows_openpyxl(self, ids: set) -> int:
+        """Удаляет строки, переписывая листы через openpyxl; возвращает количество удаленных строк"""
+        removed = 0
+        wb = load_workbook(self.master_file_path)
+        for ws in wb.worksheets:
+            kept = []
+            for values in ws.iter_rows(min_row=2, max_col=len(self.headers), values_only=True):
+                if parse_id(values[ID_COLUMN]) in ids:
+                    removed += 1
+                else:
+                    kept.append(values)
+            if len(kept) == ws.max_row - 1:
+                continue
+            # Лист переписывается целиком: построчное удаление сдвигает все ячейки ниже
+            ws.delete_rows(2, ws.max_row)
+            for row_idx, values in enumerate(kept, 2):
+                for col, value in enumerate(values, 1):
+                    cell = ws.cell(row=row_idx, column=col, value=value)
+                    cell.alignment = Alignment(horizontal="left", vertical="center")
+        if removed:
+            self._save_workbook(wb)
+        return removed
+
+    def get_archive_segments(self) -> List[dict]:
+        """
+        Завершенные сегменты архива со сводками
+
+        Returns:
+            Записи манифеста архива в порядке создания
+        """
+        return self.archive.segments()
+
+    def _save_workbook(self, wb):
+        """Атомарно сохраняет мастер-файл, чтобы читатели не видели частично записанный файл"""
+        tmp_path = f"{self.master_file_path}.tmp"
+        wb.save(tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.master_file_path)
+
+    def _get_journal_generation(self) -> Optional[str]:
+        """Возвращает поколение журнала, уже перенесенное в мастер-файл"""
+        if not os.path.exists(self.master_file_path):
+            return None
+        wb = load_workbook(self.master_file_path, read_only=True)
+        try:
+            if JOURNAL_GENERATION_PROPERTY in wb.custom_doc_props.names:
+                return wb.custom_doc_props[JOURNAL_GENERATION_PROPERTY].value
+            return None
+        finally:
+            wb.close()
+
+    def compact_journal(self) -> int:
+        """
+        Переносит заявки из журнала в мастер-файл за одно сохранение
+
+        Returns:
+            Количество перенесенных заявок
+        """
+        if self.journal is None or not self.coordinator.is_writer():
+            # Переносом журнала занимается процесс-писатель
+            return 0
+        compacted = self.journal.compact(
+            lambda entries, statuses, generation: self._append_rows(entries, generation, statuses),
+            self._get_journal_generation
+        )
+        if compacted:
+            # Перечитываем файл сразу (в потоке компактора): заодно обновляется бинарный снимок
+            self.dataset.ensure_fresh()
+            self._rebuild_column_widths_local()
+        return compacted
+
+    def _read_workbook(self) -> Optional[WorkbookSnapshot]:
+        """
+        Читает заявки мастер-файла из бинарного снимка, а если он устарел - из XLSX
+
+        После разбора XLSX снимок перезаписывается, чтобы следующий запуск обошелся без разбора.
+
+        Returns:
+            Содержимое мастер-файла или None, если файла нет
+        """
+        if not OPENPYXL_AVAILABLE:
+            return None
+        source = _stat_signature(self.master_file_path)
+        if source is None:
+            return None
+
+        snapshot = read_snapshot(self.snapshot_path, list(source))
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = self._parse_workbook(source)
+        # Снимок пишем, только если файл не менялся во время разбора
+        if _stat_signature(self.master_file_path) == source:
+            try:
+                write_snapshot(self.snapshot_path, snapshot, len(self.headers))
+                logger.info(f"💾 Снимок заявок обновлен: {self.snapshot_path}")
+            except OSError as e:
+                logger.error(f"❌ Ошибка записи снимка заявок: {e}")
+        return snapshot
+
+    def _parse_workbook(self, source: FileSignature) -> WorkbookSnapshot:
+        """Разбирает XLSX мастер-файла (потоковым читателем, при ошибке - через openpyxl)"""
+        try:
+            return self._parse_workbook_fast(source)
+        except Exception as e:
+            logger.warning(f"⚠️ Быстрое чтение мастер-файла не удалось, используется openpyxl: {e}")
+        return self._parse_workbook_openpyxl(source)
+
+    def _parse_workbook_fast(self, source: FileSignature) -> WorkbookSnapshot:
+        """Разбирает XLSX мастер-файла потоковым читателем на expat"""
+        with FastXlsxReader(self.master_file_path) as reader:
+            sheetnames = reader.sheetnames
+            generation = reader.custom_properties().get(JOURNAL_GENERATION_PROPERTY)
+            rows: Dict[str, List[List[str]]] = {}
+            for oke in ALL_OKES + [name for name in sheetnames if name not in ALL_OKES]:
+                if oke not in sheetnames:
+                    continue
+                # Добавляем только если есть хотя бы ФИО
+                rows[oke] = [row for row in reader.iter_rows(oke, len(self.headers), min_row=2) if row[1].strip()]
+            return WorkbookSnapshot(list(source), generation, sheetnames, rows)
+
+    def _parse_workbook_openpyxl(self, source: FileSignature) -> WorkbookSnapshot:
+        """Разбирает XLSX мастер-файла через openpyxl"""
+        # read_only + values_only: строки читаются из XML по одной, без объектов ячеек и стилей
+        wb = load_workbook(self.master_file_path, read_only=True)
+        try:
+            generation = None
+            if JOURNAL_GENERATION_PROPERTY in wb.custom_doc_props.names:
+                generation = wb.custom_doc_props[JOURNAL_GENERATION_PROPERTY].value
+            rows: Dict[str, List[List[str]]] = {}
+            for oke in ALL_OKES + [name for name in wb.sheetnames if name not in ALL_OKES]:
+                if oke not in wb.sheetnames:
+                    continue
+                oke_rows = rows[oke] = []
+                for values in wb[oke].iter_rows(min_row=2, max_col=len(self.headers), values_only=True):
+                    row = [str(value) if value is not None else "" for value in values]
+                    # Добавляем только если есть хотя бы ФИО
+                    if len(row) > 1 and row[1].strip():
+                        oke_rows.append(row)
+            return WorkbookSnapshot(list(source), generation, list(wb.sheetnames), rows)
+        finally:
+            wb.close()
+
+    def _read_pending_journal(self, generation: Optional[str]) -> Tuple[List[Tuple[str, List[str]]], List[StatusEntry]]:
+        """Заявки и смены статусов журнала, еще не перенесенные в мастер-файл"""
+        journal = self._journal_for_reads()
+        if journal is None:
+            return [], []
+        entries, statuses = journal.read_pending(generation)
+        columns = len(self.headers)
+        rows = []
+        for oke, row in entries:
+            if len(row) > 1 and row[1].strip():
+                rows.append((oke, row + [""] * (columns - len(row))))
+        return rows, statuses
+
+    def _iter_workbook_rows(self, okes: Optional[List[str]] = None) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Читает заявки мастер-файла и журнала
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все листы файла)
+
+        Returns:
+            Генератор пар (ОКЭ, значения колонок)
+        """
+        _, rows = self._read_excel_source()
+        for oke, oke_rows in rows.items():
+            if okes is None or oke in okes:
+                for row in oke_rows:
+                    yield oke, row
+
+    def _journal_for_reads(self):
+        """Журнал, заявки из которого нужно учитывать при чтении"""
+        if self.journal is not None:
+            return self.journal
+        if os.path.exists(self.journal_path):
+            # Журнал мог остаться от процесса, работающего в режиме journal
+            return get_application_journal(self.journal_path)
+        return None
+
+    def group_applications(self, field: str, okes: Optional[List[str]] = None,
+                           date_from: Optional[str] = None, date_to: Optional[str] = None,
+                           query: Optional[str] = None, filters: Optional[Dict[str, str]] = None,
+                           include_archive: Optional[bool] = None) -> Dict[str, int]:
+        """Количество заявок по значениям поля с произвольными фильтрами (см. ApplicationSearch.group)"""
+        return self.search.group(field, okes, date_from, date_to, query, filters, include_archive)
+
+    def iter_applications(self, oke: str) -> Iterator[dict]:
+        """
+        Лениво читает заявки указанного ОКЭ
+
+        Args:
+            oke: Название ОКЭ
+
+        Returns:
+            Генератор словарей с данными заявок
+        """
+        for _, row in self.search.iter_rows([oke]):
+            yield dict(zip(self.headers, row))
+
+    def iter_all_applications(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                              date_to: Optional[str] = None, include_archive: Optional[bool] = None,
+                              query: Optional[str] = None, newest_first: bool = False,
+                              filters: Optional[Dict[str, str]] = None) -> Iterator[dict]:
+        """
+        Лениво читает заявки всех (или указанных) ОКЭ за один проход по файлу
+
+        Args:
+            okes: Список ОКЭ (по умолчанию все)
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            include_archive: Читать ли архив закрытых периодов (по умолчанию - при заданном периоде подачи)
+            query: Подстрока полей поиска (без учета регистра и различия 'е'/'ё'), ищется по индексу
+            newest_first: Упорядочить по времени подачи от новых к старым (по индексу времени,
+                без сортировки рабочих заявок)
+            filters: Подстроки значений полей 'position', 'direction', 'status' (без учета регистра),
+                отбираются по битовым индексам
+
+        Returns:
+            Генератор словарей с данными заявок и ключом 'oke'
+        """
+        for oke, row in self.search.iter_rows(okes, date_from, date_to, include_archive, query,
+                                                 newest_first, filters):
+            application = dict(zip(self.headers, row))
+            application['oke'] = oke
+            yield application
+
+    def search_page(self, okes: Optional[List[str]] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, query: Optional[str] = None,
+                    filters: Optional[Dict[str, str]] = None, include_archive: Optional[bool] = None,
+                    cursor: Optional[str] = None, per_page: int = 20, page: int = 1,
+                    fuzzy: bool = False) -> Dict[str, Any]:
+        """Страница результатов поиска с курсором продолжения (см. ApplicationSearch.page)"""
+        return self.search.page(okes, date_from, date_to, query, filters, include_archive,
+                                cursor, per_page, page, fuzzy)
+
+    def _schedule_master_export(self):
+        """Планирует выгрузку мастер-файла после записи в хранилище"""
+        if self.master_export is not None:
+            self.master_export.schedule()
+
+    def export_master_file(self) -> Optional[str]:
+        """
+        Формирует мастер-файл Excel из хранилища заявок
+
+        Вызывается потоком отложенной выгрузки после записей в хранилище
+        (см. MASTER_EXPORT_DELAY) и может быть вызван напрямую.
+
+        Returns:
+            Путь к мастер-файлу или None, если выгрузка невозможна
+        """
+        if self.store is None or not OPENPYXL_AVAILABLE:
+            return None
+
+        wb = Workbook()
+        wb.remove(wb.active)
+        sheets = {}
+        trackers = {}
+        for oke in ALL_OKES:
+            ws = wb.create_sheet(title=oke)
+            for col, header in enumerate(self.headers, 1):
+                cell = ws.cell(row=1, column=col, value=header)
+                cell.font = Font(bold=True, color="FFFFFF")
+                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+            sheets[oke] = ws
+            trackers[oke] = _ColumnWidthTracker.from_rows([], self.headers)
+
+        for oke, row in self.store.iter_applications():
+            if oke not in sheets:
+                sheets[oke] = wb.create_sheet(title=oke)
+                sheets[oke].append(self.headers)
+                trackers[oke] = _ColumnWidthTracker.from_rows([], self.headers)
+            sheets[oke].append(row)
+            trackers[oke].update(row)
+
+        # При выгрузке ширина колонок пересчитывается полностью
+        for oke, ws in sheets.items():
+            trackers[oke].apply(ws, force=True)
+
+        with _get_master_lock(self.master_file_path):
+            self._save_workbook(wb)
+        logger.info(f"📤 Мастер-файл сформирован из хранилища: {self.master_file_path}")
+        return self.master_file_path
+
     def get_applications_count(self, oke: str) -> int:
         """
         Получает количество заявок в Excel файле для указанного ОКЭ
@@ -240,26 +1599,84 @@ class ExcelIntegration:
         Returns:
             Количество заявок (без учета заголовка)
         """
-        if not OPENPYXL_AVAILABLE or self.workbook is None:
+        if self.store is None and not OPENPYXL_AVAILABLE:
             logger.error("openpyxl не установлен. Невозможно получить количество заявок.")
             return 0
-            
-        try:
-            # Перезагружаем рабочую книгу перед подсчетом, чтобы учесть последние изменения
-            self.workbook = load_workbook(self.master_file_path)
 
-            if oke not in self.workbook.sheetnames:
-                return 0
-                
-            ws = self.workbook[oke]
-            
-            # Количество строк минус заголовок
-            return max(0, ws.max_row - 1)
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка подсчета заявок для {oke} (Excel): {e}")
-            return 0
+        # Счетчики в памяти синхронизируются при записи, файл перечитывается только после чужих изменений
+        return self._counters_with_archive()["by_oke"].get(oke, 0)
+
+    def get_counts_by_day(self) -> Dict[str, int]:
+        """Количество заявок по дням подачи ('YYYY-MM-DD')"""
+        return self._counters_with_archive()["by_day"]
+
+    def get_counts_by_month(self) -> Dict[str, int]:
+        """Количество заявок по месяцам подачи ('YYYY-MM')"""
+        return self._counters_with_archive()["by_month"]
+
+    def _counters_with_archive(self) -> dict:
+        """Счетчики рабочих заявок вместе со сводками архивных сегментов (архив не распаковывается)"""
+        self.dataset.ensure_fresh()
+        counters = self.counters.snapshot()
+        archived = self.archive.totals()
+        counters["archived"] = archived["total"]
+        counters["total"] += archived["total"]
+        for key in ("by_oke", "by_day", "by_month"):
+            for name, count in archived[key].items():
+                counters[key][name] = counters[key].get(name, 0) + count
+        return counters
     
+    def get_rollup_statistics(self, today=None, top_directions: int = 5) -> dict:
+        """
+        Сводка заявок за сегодня, неделю и месяц и популярные направления по сверткам
+
+        Свертки обновляются при каждой записи и пересобираются при перечитывании
+        источника; архивные периоды учитываются по сводкам сегментов.
+
+        Args:
+            today: Текущий день (datetime.date, по умолчанию сегодня)
+            top_directions: Количество популярных направлений
+
+        Returns:
+            Словарь applications (total, today, this_week, this_month) и popular_directions
+        """
+        self.dataset.ensure_fresh()
+        return ApplicationRollups.summarize([self.dataset.rollups, self.archive.rollups()], today, top_directions)
+
+    def get_rollup_groups(self, field: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          oke: Optional[str] = None) -> Dict[str, int]:
+        """
+        Количество заявок по дням, ОКЭ, направлениям или должностям без просмотра заявок
+
+        Args:
+            field: 'day', 'oke', 'direction' или 'position'
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            oke: Фильтр по ОКЭ
+
+        Returns:
+            Значение поля -> количество заявок (вместе с архивом)
+        """
+        self.dataset.ensure_fresh()
+        result: Dict[str, int] = {}
+        for rollups in (self.dataset.rollups, self.archive.rollups()):
+            for value, count in rollups.group(field, date_from, date_to, oke).items():
+                result[value] = result.get(value, 0) + count
+        return result
+
+    def get_filter_options(self) -> Dict[str, Dict[str, int]]:
+        """
+        Варианты фильтров поиска с количеством рабочих заявок
+
+        Фасеты обновляются при записи, смене статуса и переносе заявок в архив,
+        поэтому стоимость не зависит от числа заявок.
+
+        Returns:
+            Поле ('oke', 'position', 'direction', 'month', 'status') -> {значение: количество}
+        """
+        self.dataset.ensure_fresh()
+        return self.dataset.facets.snapshot()
+
     def get_all_files(self) -> List[str]:
         """
         Получает список всех Excel файлов с заявками
@@ -268,7 +1685,7 @@ class ExcelIntegration:
             Список путей к Excel файлам
         """
         # Этот метод возвращает путь к мастер-файлу, если openpyxl доступен
-        if not OPENPYXL_AVAILABLE or self.workbook is None or not os.path.exists(self.master_file_path):
+        if not OPENPYXL_AVAILABLE or not os.path.exists(self.master_file_path):
             return []
         return [self.master_file_path]
     
@@ -283,26 +1700,7 @@ class ExcelIntegration:
             Список словарей с данными заявок
         """
         try:
-            if not OPENPYXL_AVAILABLE or self.workbook is None or not os.path.exists(self.master_file_path):
-                return []
-            
-            if oke not in self.workbook.sheetnames:
-                return []
-            
-            ws = self.workbook[oke]
-            applications = []
-            
-            # Читаем данные начиная со второй строки (первая - заголовки)
-            for row in range(2, ws.max_row + 1):
-                app_data = {}
-                for col, header in enumerate(self.headers, 1):
-                    cell_value = ws.cell(row=row, column=col).value
-                    app_data[header] = str(cell_value) if cell_value is not None else ""
-                
-                # Добавляем только если есть хотя бы ФИО
-                if app_data.get('ФИО', '').strip():
-                    applications.append(app_data)
-            
+            applications = list(self.iter_applications(oke))
             logger.info(f"📖 Прочитано {len(applications)} заявок из {oke}")
             return applications
             
@@ -323,17 +1721,21 @@ class ExcelIntegration:
                 "total_applications": 0,
                 "by_oke": {}
             }
-            
-            if not OPENPYXL_AVAILABLE or self.workbook is None or not os.path.exists(self.master_file_path):
+
+            if self.store is None and (not OPENPYXL_AVAILABLE or not os.path.exists(self.master_file_path)):
                 return stats
 
-            stats["total_files"] = 1  # Один мастер-файл
-            
+            stats["total_files"] = 1 if os.path.exists(self.master_file_path) else 0  # Один мастер-файл
+
+            counters = self._counters_with_archive()
             for oke_name in ALL_OKES:
-                if oke_name in self.workbook.sheetnames:
-                    count = self.get_applications_count(oke_name)
-                    stats["by_oke"][oke_name] = count
-                    stats["total_applications"] += count
+                stats["by_oke"][oke_name] = counters["by_oke"].get(oke_name, 0)
+            for oke_name, count in counters["by_oke"].items():
+                stats["by_oke"].setdefault(oke_name, count)
+            stats["total_applications"] = counters["total"]
+            stats["archived_applications"] = counters["archived"]
+            stats["by_day"] = counters["by_day"]
+            stats["by_month"] = counters["by_month"]
             
             return stats
             
@@ -345,16 +1747,15 @@ class ExcelIntegration:
 def test_excel_integration():
     """Тестовая функция для проверки работы Excel интеграции (новый формат)"""
     print("🧪 Тестирование Excel интеграции (новый формат)...")
-    
-    excel = ExcelIntegration()
-    
-    # Удаляем старый мастер-файл для чистого теста
-    if os.path.exists(excel.master_file_path):
-        os.remove(excel.master_file_path)
-        print(f"🗑️ Удален старый мастер-файл: {excel.master_file_path}")
-    
-    excel = ExcelIntegration() # Переинициализируем после удаления
 
+    # Чистый тест во временной директории: журнал, архив, хранилище и идентификаторы
+    # рабочей директории data не затрагиваются
+    with tempfile.TemporaryDirectory() as data_dir:
+        _run_excel_integration_test(ExcelIntegration(data_dir=data_dir))
+
+
+def _run_excel_integration_test(excel: "ExcelIntegration"):
+    """Добавляет тестовые заявки и проверяет статистику"""
     # Тест добавления заявки в ОКЭ 1
     print("📋 Добавление тестовой заявки в ОКЭ 1...")
     if excel.add_application(
@@ -0,0 +1,738 @@
+#!/usr/bin/env python3
+"""
+Индексы поиска заявок в памяти
+Строки заявок нумеруются подряд (номер строки в кэше), индексы хранят номера строк
+"""
+
+import re
+import json
+import base64
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Collection, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Разделитель полей в нормализованном тексте строки (не встречается в запросах)
+FIELD_SEPARATOR = "\x00"
+
+# Начало отсчета меток времени подачи (время заявок хранится без часового пояса)
+_EPOCH = datetime(1970, 1, 1)
+
+# Слова ФИО; части двойной фамилии ("Петров-Водкин") ищутся как отдельные слова
+_WORD_RE = re.compile(r"\w+")
+
+def normalize_text(text: str) -> str:
+    """Текст для поиска без учета регистра; 'ё' и 'е' не различаются"""
+    return text.casefold().replace("ё", "е")
+
+def parse_timestamp(text: str) -> Optional[int]:
+    """
+    Переводит время подачи 'YYYY-MM-DD HH:MM:SS' в секунды от начала отсчета
+
+    Returns:
+        Количество секунд или None, если значение в другом формате
+    """
+    if len(text) != 19 or text[10] != " ":
+        return None
+    try:
+        return (datetime.fromisoformat(text) - _EPOCH) // timedelta(seconds=1)
+    except ValueError:
+        return None
+
+def parse_day(text: str, end: bool = False) -> Optional[int]:
+    """
+    Граница дня 'YYYY-MM-DD' в секундах от начала отсчета
+
+    Args:
+        text: Дата
+        end: Вернуть последнюю секунду дня вместо первой
+
+    Returns:
+        Количество секунд или None, если дата некорректна
+    """
+    try:
+        day = datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        return None
+    return (day - _EPOCH) // timedelta(seconds=1) + (86399 if end else 0)
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмм по текстовым полям заявок
+
+    Для каждой триграммы хранится возрастающий список номеров строк,
+    в полях которых она встречается. Запрос длиной от трех символов
+    сужается пересечением списков его триграмм, короткий запрос -
+    объединением списков триграмм словаря, содержащих его. Кандидаты
+    проверяются по нормализованному тексту строки, поэтому результат
+    точный, а просматриваются только строки-кандидаты.
+    """
+
+    def __init__(self, columns: Iterable[int]):
+        """
+        Args:
+            columns: Номера колонок строки заявки, по которым ведется поиск
+        """
+        self.columns = list(columns)
+        self.postings: Dict[str, array] = {}
+        # Нормализованный текст строки (поля через FIELD_SEPARATOR) по номеру строки
+        self.texts: List[str] = []
+
+    def add(self, row_id: int, row: List[str]):
+        """
+        Индексирует строку; номера строк добавляются по возрастанию
+
+        Args:
+            row_id: Номер строки (равен количеству уже проиндексированных строк)
+            row: Значения колонок заявки
+        """
+        text = FIELD_SEPARATOR.join(normalize_text(str(row[column])) if column < len(row) else ""
+                                    for column in self.columns)
+        self.texts.append(text)
+        postings = self.postings
+        for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            if FIELD_SEPARATOR in trigram:
+                continue
+            posting = postings.get(trigram)
+            if posting is None:
+                posting = postings[trigram] = array("I")
+            posting.append(row_id)
+
+    def candidates(self, query: str) -> Set[int]:
+        """
+        Номера строк, которые могут содержать запрос (надмножество совпадений)
+
+        Args:
+            query: Нормализованный запрос
+        """
+        if len(query) >= 3:
+            trigrams = sorted({query[i:i + 3] for i in range(len(query) - 2)},
+                              key=lambda trigram: len(self.postings.get(trigram, ())))
+            result: Optional[Set[int]] = None
+            for trigram in trigrams:
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    return set()
+                # Начинаем с самого короткого списка, дальше множество только сужается
+                result = set(posting) if result is None else result.intersection(posting)
+                if not result:
+                    break
+            return result or set()
+
+        # Короткий запрос: объединяем списки триграмм словаря, в которые он входит
+        result = set()
+        for trigram, posting in self.postings.items():
+            if query in trigram:
+                result.update(posting)
+        return result
+
+    def search(self, query: str, prefix: bool = False) -> List[int]:
+        """
+        Номера строк, в одном из полей которых встречается запрос
+
+        Args:
+            query: Строка запроса (регистр и 'ё' не учитываются)
+            prefix: Искать только с начала слова
+
+        Returns:
+            Номера строк по возрастанию
+        """
+        query = normalize_text(query.strip())
+        if not query:
+            return list(range(len(self.texts)))
+        texts = self.texts
+        found = (row_id for row_id in sorted(self.candidates(query)) if query in texts[row_id])
+        if not prefix:
+            return list(found)
+        return [row_id for row_id in found if self._starts_word(texts[row_id], query)]
+
+    @staticmethod
+    def _starts_word(text: str, query: str) -> bool:
+        """Проверяет, что запрос встречается в тексте с начала слова"""
+        start = text.find(query)
+        while start != -1:
+            if start == 0 or not text[start - 1].isalnum():
+                return True
+            start = text.find(query, start + 1)
+        return False
+
+
+def name_words(text: str) -> List[str]:
+    """Нормализованные слова ФИО"""
+    return _WORD_RE.findall(normalize_text(text))
+
+def max_edits(length: int) -> int:
+    """Допустимое число опечаток в слове запроса: короткие слова ищутся точно"""
+    if length <= 3:
+        return 0
+    return 1 if length <= 6 else 2
+
+def edit_distances(query: str, word: str, limit: int) -> Tuple[int, int]:
+    """
+    Расстояние Левенштейна от слова запроса до слова и до ближайшего начала слова
+
+    Расчет прекращается, как только расстояние заведомо превысит limit.
+
+    Args:
+        query: Слово запроса
+        word: Слово из данных
+        limit: Наибольшее интересующее расстояние
+
+    Returns:
+        (до всего слова, до лучшего префикса слова); значения больше limit
+        заменяются на limit + 1
+    """
+    over = limit + 1
+    size = len(word)
+    previous = list(range(size + 1))
+    for i, char in enumerate(query, 1):
+        # Вне полосы |i - j| <= limit расстояние заведомо больше limit
+        current = [over] * (size + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(size, i + limit) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != word[j - 1]))
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over, over
+        previous = current
+    return min(previous[size], over), min(min(previous), over)
+
+
+class FuzzyNameIndex:
+    """
+    Индекс нечеткого поиска по ФИО
+
+    Индексируются различные слова ФИО (их намного меньше, чем строк): для слова
+    хранятся номера строк, для триграммы слова с границами (" иванов ") - номера
+    слов. Слово запроса отбирает слова-кандидаты по числу общих триграмм (одна
+    правка меняет не больше трех триграмм), кандидаты проверяются ограниченным
+    расстоянием Левенштейна. Совпадение с целым словом ранжируется выше
+    совпадения с началом слова ("Сокол" находит "Соколянский").
+    """
+
+    def __init__(self, column: int):
+        """
+        Args:
+            column: Номер колонки ФИО в строке заявки
+        """
+        self.column = column
+        self.words: List[str] = []
+        self.word_ids: Dict[str, int] = {}
+        # Номера строк по номеру слова
+        self.word_rows: List[array] = []
+        # Номера слов ФИО по номеру строки
+        self.row_words: List[Tuple[int, ...]] = []
+        # Номера слов по триграмме
+        self.postings: Dict[str, array] = {}
+
+    def add(self, row_id: int, row: List[str]):
+        """
+        Индексирует ФИО строки; номера строк добавляются по возрастанию
+
+        Args:
+            row_id: Номер строки (равен количеству уже проиндексированных строк)
+            row: Значения колонок заявки
+        """
+        text = str(row[self.column]) if self.column < len(row) else ""
+        word_ids = []
+        for word in dict.fromkeys(name_words(text)):
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                word_id = self.word_ids[word] = len(self.words)
+                self.words.append(word)
+                self.word_rows.append(array("I"))
+                padded = f" {word} "
+                for trigram in {padded[i:i + 3] for i in range(len(padded) - 2)}:
+                    posting = self.postings.get(trigram)
+                    if posting is None:
+                        posting = self.postings[trigram] = array("I")
+                    posting.append(word_id)
+            self.word_rows[word_id].append(row_id)
+            word_ids.append(word_id)
+        self.row_words.append(tuple(word_ids))
+
+    @staticmethod
+    def word_score(query: str, word: str) -> Optional[int]:
+        """
+        Оценка совпадения слова запроса со словом (меньше - ближе)
+
+        Returns:
+            2 * число правок для целого слова, 2 * число правок + 1 для начала слова,
+            None, если правок больше допустимого
+        """
+        limit = max_edits(len(query))
+        full, prefix = edit_distances(query, word, limit)
+        score = min(2 * full, 2 * prefix + 1)
+        return score if score <= 2 * limit + 1 else None
+
+    def _match_word(self, query: str) -> Dict[int, int]:
+        """Номера слов, похожих на слово запроса, и их оценки"""
+        # Без завершающей границы триграммы запроса есть и у слов, начинающихся с него
+        padded = f" {query}"
+        trigrams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        if not trigrams:
+            # Запрос из одной буквы: слова, начинающиеся с нее
+            candidates = [word_id for word_id, word in enumerate(self.words) if word.startswith(query)]
+        else:
+            counts: Dict[int, int] = {}
+            for trigram in trigrams:
+                for word_id in self.postings.get(trigram, ()):
+                    counts[word_id] = counts.get(word_id, 0) + 1
+            needed = max(len(trigrams) - 3 * max_edits(len(query)), 1)
+            candidates = [word_id for word_id, count in counts.items() if count >= needed]
+        matched = {}
+        for word_id in candidates:
+            score = self.word_score(query, self.words[word_id])
+            if score is not None:
+                matched[word_id] = score
+        return matched
+
+    def search(self, query: str) -> Dict[int, int]:
+        """
+        Строки, ФИО которых похоже на запрос: каждое слово запроса должно
+        совпасть (точно, с опечатками или началом) с каким-нибудь словом ФИО
+
+        Args:
+            query: Строка запроса (регистр и 'ё' не учитываются)
+
+        Returns:
+            Номер строки -> оценка (сумма оценок слов запроса, меньше - ближе)
+        """
+        matches = [self._match_word(query_word) for query_word in dict.fromkeys(name_words(query))]
+        if not matches:
+            return {}
+        # Строки отбираются по самому редкому слову запроса, остальные слова проверяются по словам строк
+        matches.sort(key=lambda matched: sum(len(self.word_rows[word_id]) for word_id in matched))
+        scores: Dict[int, int] = {}
+        for word_id, score in matches[0].items():
+            for row_id in self.word_rows[word_id]:
+                if score < scores.get(row_id, score + 1):
+                    scores[row_id] = score
+        for matched in matches[1:]:
+            narrowed = {}
+            for row_id, total in scores.items():
+                best = None
+                for word_id in self.row_words[row_id]:
+                    score = matched.get(word_id)
+                    if score is not None and (best is None or score < best):
+                        best = score
+                if best is not None:
+                    narrowed[row_id] = total + best
+            scores = narrowed
+            if not scores:
+                break
+        return scores
+
+    @classmethod
+    def matcher(cls, query: str) -> Callable[[str], Optional[int]]:
+        """
+        Оценщик ФИО без индекса (для неиндексированных строк, например архивных)
+
+        Оценки слов запоминаются, поэтому повторяющиеся фамилии и имена
+        проверяются расстоянием Левенштейна один раз.
+
+        Args:
+            query: Строка запроса
+
+        Returns:
+            Функция: ФИО -> оценка, как в search, или None, если ФИО не подходит
+        """
+        query_words = list(dict.fromkeys(name_words(query)))
+        memo: Dict[Tuple[str, str], Optional[int]] = {}
+
+        def score(text: str) -> Optional[int]:
+            if not query_words:
+                return None
+            words = name_words(text)
+            total = 0
+            for query_word in query_words:
+                best = None
+                for word in words:
+                    key = (query_word, word)
+                    if key not in memo:
+                        memo[key] = cls.word_score(query_word, word)
+                    word_score = memo[key]
+                    if word_score is not None and (best is None or word_score < best):
+                        best = word_score
+                if best is None:
+                    return None
+                total += best
+            return total
+
+        return score
+
+
+class TimestampIndex:
+    """
+    Упорядоченный индекс времени подачи заявок
+
+    Метки времени разбираются один раз при добавлении строки и хранятся
+    отсортированными по (время, идентификатор заявки) вместе с номерами
+    строк, поэтому отбор периода - это два двоичных поиска и срез, порядок
+    "новые сначала" - обратный обход, а продолжение с курсора - еще один
+    двоичный поиск. Строки без корректного времени подачи в период
+    не попадают и идут в конце полного списка.
+    """
+
+    def __init__(self):
+        self.stamps = array("q")
+        # Идентификаторы заявок: упорядочивают строки с одинаковым временем
+        self.ties = array("q")
+        self.row_ids = array("I")
+        # Строки, время подачи которых не разобрано: номера и идентификаторы заявок
+        self.undated = array("I")
+        self.undated_ties = array("q")
+
+    def rebuild(self, items: Iterable[Tuple[str, int]]):
+        """
+        Строит индекс заново одной сортировкой (при загрузке всех заявок)
+
+        Args:
+            items: Пары (время подачи, идентификатор заявки) по порядку номеров строк
+        """
+        dated = []
+        undated = []
+        for row_id, (submitted_at, tie) in enumerate(items):
+            stamp = parse_timestamp(submitted_at)
+            if stamp is None:
+                undated.append((tie, row_id))
+            else:
+                dated.append((stamp, tie, row_id))
+        dated.sort()
+        undated.sort()
+        self.stamps = array("q", [item[0] for item in dated])
+        self.ties = array("q", [item[1] for item in dated])
+        self.row_ids = array("I", [item[2] for item in dated])
+        self.undated = array("I", [row_id for _, row_id in undated])
+        self.undated_ties = array("q", [tie for tie, _ in undated])
+
+    def add(self, row_id: int, submitted_at: str, tie: int = 0):
+        """
+        Добавляет строку
+
+        Args:
+            row_id: Номер строки
+            submitted_at: Время подачи заявки
+            tie: Идентификатор заявки
+        """
+        stamp = parse_timestamp(submitted_at)
+        if stamp is None:
+            position = bisect_right(self.undated_ties, tie)
+            self.undated.insert(position, row_id)
+            self.undated_ties.insert(position, tie)
+            return
+        position = self._position(stamp, tie)
+        if position == len(self.stamps):
+            # Обычный случай: новые заявки позже уже проиндексированных
+            self.stamps.append(stamp)
+            self.ties.append(tie)
+            self.row_ids.append(row_id)
+            return
+        self.stamps.insert(position, stamp)
+        self.ties.insert(position, tie)
+        self.row_ids.insert(position, row_id)
+
+    def _position(self, stamp: int, tie: int) -> int:
+        """Позиция первой строки, которая больше ключа (время, идентификатор)"""
+        low = bisect_left(self.stamps, stamp)
+        high = bisect_right(self.stamps, stamp, low)
+        # Внутри одного времени строки упорядочены по идентификатору: второй двоичный поиск
+        return bisect_right(self.ties, tie, low, high)
+
+    def _bounds(self, date_from: Optional[str], date_to: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Границы среза строк периода или None, если граница периода некорректна"""
+        low, high = 0, len(self.stamps)
+        if date_from:
+            bound = parse_day(date_from)
+            if bound is None:
+                return None
+            low = bisect_left(self.stamps, bound)
+        if date_to:
+            bound = parse_day(date_to, end=True)
+            if bound is None:
+                return None
+            high = bisect_right(self.stamps, bound)
+        return low, max(low, high)
+
+    def select(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+               newest_first: bool = False) -> Optional[List[int]]:
+        """
+        Номера строк, поданных в указанный период
+
+        Args:
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            newest_first: Упорядочить от новых к старым
+
+        Returns:
+            Номера строк в порядке времени подачи или None, если граница периода некорректна
+        """
+        bounds = self._bounds(date_from, date_to)
+        if bounds is None:
+            return None
+        selected = self.row_ids[bounds[0]:bounds[1]].tolist()
+        undated = [] if date_from or date_to else self.undated.tolist()
+        if newest_first:
+            return selected[::-1] + undated[::-1]
+        return selected + undated
+
+    def iter_newest(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    after: Optional[Tuple[str, int]] = None) -> Iterator[int]:
+        """
+        Перебирает строки периода от новых к старым, начиная после курсора
+
+        Args:
+            date_from: Начало периода подачи (YYYY-MM-DD, включительно)
+            date_to: Конец периода подачи (YYYY-MM-DD, включительно)
+            after: Ключ (время подачи, идентификатор заявки) последней выданной строки
+
+        Returns:
+            Генератор номеров строк (пустой, если граница периода некорректна)
+        """
+        bounds = self._bounds(date_from, date_to)
+        if bounds is None:
+            return
+        low, high = bounds
+        include_undated = not date_from and not date_to
+        undated_end = len(self.undated)
+        if after is not None:
+            stamp = parse_timestamp(after[0])
+            if stamp is None:
+                # Курсор среди строк без времени подачи: датированные строки уже выданы
+                high = low
+                undated_end = bisect_left(self.undated_ties, after[1])
+            else:
+                high = min(high, bisect_left(self.stamps, stamp, low, high))
+                same_stamp_end = bisect_right(self.stamps, stamp, high, bounds[1])
+                high = bisect_left(self.ties, after[1], high, same_stamp_end)
+        row_ids = self.row_ids
+        for position in range(high - 1, low - 1, -1):
+            yield row_ids[position]
+        if include_undated:
+            for position in range(undated_end - 1, -1, -1):
+                yield self.undated[position]
+
+    def count(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        """Количество строк периода (без учета остальных фильтров)"""
+        bounds = self._bounds(date_from, date_to)
+        if bounds is None:
+            return 0
+        return bounds[1] - bounds[0] + (0 if date_from or date_to else len(self.undated))
+
+
+def encode_cursor(submitted_at: str, app_id: int, score: Optional[int] = None) -> str:
+    """
+    Непрозрачный курсор страницы по ключу последней выданной заявки
+
+    Args:
+        submitted_at: Время подачи заявки
+        app_id: Идентификатор заявки
+        score: Оценка близости заявки к запросу (для выдачи нечеткого поиска)
+
+    Returns:
+        Строка base64url
+    """
+    key = [submitted_at, app_id] if score is None else [submitted_at, app_id, score]
+    payload = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int, Optional[int]]]:
+    """
+    Разбирает курсор страницы
+
+    Returns:
+        Ключ (время подачи, идентификатор заявки, оценка близости или None)
+        или None, если курсор поврежден
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(payload.decode("utf-8"))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(key, list) or len(key) not in (2, 3):
+        return None
+    submitted_at, app_id = key[0], key[1]
+    score = key[2] if len(key) == 3 else None
+    if not isinstance(submitted_at, str) or not isinstance(app_id, int):
+        return None
+    if score is not None and not isinstance(score, int):
+        return None
+    return submitted_at, app_id, score
+
+
+# Номера установленных битов для каждого значения байта
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """
+    Номера установленных битов по возрастанию
+
+    Args:
+        bitmap: Битовая карта (бит N - строка с номером N)
+
+    Returns:
+        Генератор номеров строк
+    """
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index * 8
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+def bitmap_of(row_ids: Iterable[int]) -> int:
+    """Битовая карта набора номеров строк (строится через буфер байтов, без сдвигов длинных чисел)"""
+    buffer = bytearray()
+    for row_id in row_ids:
+        index = row_id >> 3
+        if index >= len(buffer):
+            buffer.extend(bytes(index - len(buffer) + 1))
+        buffer[index] |= 1 << (row_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class BitmapIndex:
+    """
+    Битовые индексы по полям с небольшим числом значений
+
+    Для каждого значения поля хранится битовая карта строк (целое число Python,
+    бит N - строка N). Отбор по нескольким полям - это пересечение карт,
+    несколько значений одного поля - их объединение; количество совпадений
+    считается без просмотра строк.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        """
+        Args:
+            fields: Названия индексируемых полей
+        """
+        self.fields = list(fields)
+        self.bitmaps: Dict[str, Dict[str, int]] = {field: {} for field in self.fields}
+
+    def rebuild(self, rows: Iterable[Tuple[str, ...]]):
+        """
+        Строит карты заново за один проход
+
+        Args:
+            rows: Значения полей строк (в порядке fields) по порядку номеров строк
+        """
+        positions: Dict[str, Dict[str, List[int]]] = {field: {} for field in self.fields}
+        for row_id, values in enumerate(rows):
+            for field, value in zip(self.fields, values):
+                positions[field].setdefault(value, []).append(row_id)
+        self.bitmaps = {field: {value: bitmap_of(row_ids) for value, row_ids in values.items()}
+                        for field, values in positions.items()}
+
+    def add(self, row_id: int, values: Tuple[str, ...]):
+        """
+        Добавляет строку
+
+        Args:
+            row_id: Номер строки
+            values: Значения полей в порядке fields
+        """
+        bit = 1 << row_id
+        for field, value in zip(self.fields, values):
+            bitmaps = self.bitmaps[field]
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def change(self, field: str, row_id: int, old_value: str, new_value: str):
+        """Переносит строку между значениями поля (например, при смене статуса)"""
+        bit = 1 << row_id
+        bitmaps = self.bitmaps[field]
+        if old_value in bitmaps:
+            bitmaps[old_value] &= ~bit
+            if not bitmaps[old_value]:
+                del bitmaps[old_value]
+        bitmaps[new_value] = bitmaps.get(new_value, 0) | bit
+
+    def match(self, field: str, values: Optional[Iterable[str]] = None,
+              substring: Optional[str] = None) -> int:
+        """
+        Карта строк, у которых поле равно одному из значений или содержит подстроку
+
+        Args:
+            field: Название поля
+            values: Точные значения
+            substring: Подстрока значения (без учета регистра)
+
+        Returns:
+            Битовая карта строк
+        """
+        bitmaps = self.bitmaps[field]
+        result = 0
+        if values is not None:
+            for value in values:
+                result |= bitmaps.get(value, 0)
+        if substring is not None:
+            needle = normalize_text(substring)
+            # Значений у поля немного, поэтому подстрока проверяется по словарю значений
+            for value, bitmap in bitmaps.items():
+                if needle in normalize_text(value):
+                    result |= bitmap
+        return result
+
+
+class QueryResultCache:
+    """
+    Кэш результатов отбора: нормализованные условия запроса -> подходящие заявки
+
+    Каждая запись помнит версию данных, для которой посчитана (поколение кэша заявок
+    или набор архивных сегментов). Любая запись заявок меняет версию, поэтому устаревший
+    результат не отдается. Страницы одного запроса продолжаются по сохраненному результату.
+    """
+
+    def __init__(self, capacity: int = 32):
+        """
+        Args:
+            capacity: Сколько последних запросов хранить
+        """
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Collection]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Collection]:
+        """
+        Результат запроса, посчитанный для текущей версии данных
+
+        Args:
+            key: Нормализованные условия запроса
+            version: Текущая версия данных
+
+        Returns:
+            Результат (заявки или номера строк) или None, если результата нет или он устарел
+        """
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, items: Collection):
+        """Сохраняет результат запроса, вытесняя самый давний"""
+        with self.lock:
+            self._entries[key] = (version, items)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Удаляет все результаты"""
+        with self.lock:
+            self._entries.clear()
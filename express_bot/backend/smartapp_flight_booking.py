@@ -4,6 +4,7 @@ Express SmartApp - Flight Booking Bot
 Веб-приложение для заказа рейсов в Express SmartApp
 """
 
+import io
 import os
 import time
 import logging
@@ -11,11 +12,12 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Optional, Any
-from threading import Lock
+from threading import Lock, Thread
 
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
 from flask_cors import CORS
 from excel_integration import ExcelIntegration
+from bulk_import import BULK_FORMAT_CSV, BULK_FORMAT_JSONL, iter_bulk_records
 from user_management import user_manager, UserRole, UserStatus
 from notification_system import notification_manager, NotificationType, NotificationStatus
 from express_integration import init_express_integration, get_express_bot, get_notification_service
@@ -99,6 +101,30 @@ data_lock = Lock()
 # Инициализация простого логгера (Удаляем)
 excel_integration = ExcelIntegration(data_dir="data")
 
+# Период переноса заявок закрытых периодов приема в архив (секунды, 0 - не переносить)
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', '3600'))
+
+def _archive_worker_loop():
+    """Периодически переносит заявки закрытых периодов приема в архив"""
+    while True:
+        try:
+            excel_integration.archive_closed_periods(notification_manager.get_application_periods())
+        except Exception as e:
+            logger.error(f"❌ Ошибка переноса заявок в архив: {e}")
+        time.sleep(ARCHIVE_INTERVAL)
+
+def start_archive_job():
+    """
+    Запускает перенос в архив при старте сервера
+
+    Периоды приема известны только этому процессу, а удаление строк из мастер-файла
+    archive_closed_periods пересылает процессу-писателю, поэтому перенос выполняется,
+    какой бы процесс (admin_server.py, скрипты обслуживания) ни удерживал запись.
+    """
+    if ARCHIVE_INTERVAL <= 0:
+        return
+    Thread(target=_archive_worker_loop, name="application-archive", daemon=True).start()
+
 # Инициализация Express интеграции
 EXPRESS_BOT_TOKEN = os.getenv('EXPRESS_BOT_TOKEN', 'your_bot_token_here')
 EXPRESS_WEBHOOK_SECRET = os.getenv('EXPRESS_WEBHOOK_SECRET', 'your_webhook_secret_here')
@@ -543,6 +569,36 @@ def api_statistics():
         logger.error(f"Ошибка получения статистики: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/statistics/groups', methods=['POST'])
+def api_statistics_groups():
+    """API для группировки заявок по полю с фильтрами поиска"""
+    try:
+        data = request.get_json() or {}
+        group_by = data.get('group_by', 'oke')
+        oke_filter = data.get('oke', '')
+        filters = {'position': data.get('position', ''), 'direction': data.get('direction', ''),
+                   'status': data.get('status', '')}
+        
+        # С APPLICATION_QUERY_ENGINE=pandas группировка выполняется векторно по колонкам
+        try:
+            groups = excel_integration.group_applications(
+                group_by, [oke_filter] if oke_filter else None, data.get('date_from', ''),
+                data.get('date_to', ''), query=data.get('query', ''), filters=filters,
+                include_archive=data.get('include_archive'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'group_by': group_by,
+            'groups': [{'name': name, 'count': count}
+                       for name, count in sorted(groups.items(), key=lambda item: item[1], reverse=True)],
+            'total': sum(groups.values())
+        })
+    except Exception as e:
+        logger.error(f"Ошибка группировки заявок: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 
 
 @app.route('/api/applications/<oke>', methods=['GET'])
@@ -568,90 +624,56 @@ def api_search_applications():
         
         # Параметры поиска
         search_query = data.get('query', '').strip()
+        # Нечеткий поиск: запрос ищется в ФИО с опечатками, выдача - по близости к запросу
+        fuzzy = bool(data.get('fuzzy'))
         oke_filter = data.get('oke', '')
         date_from = data.get('date_from', '')
         date_to = data.get('date_to', '')
         position_filter = data.get('position', '')
+        direction_filter = data.get('direction', '')
+        status_filter = data.get('status', '')
+        # Архив закрытых периодов читается при заданном периоде подачи или по явному запросу
+        include_archive = data.get('include_archive')
         page = int(data.get('page', 1))
         per_page = int(data.get('per_page', 20))
+        cursor = data.get('cursor') or None
         
-        # Получаем все заявки из всех ОКЭ
-        all_applications = []
-        for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']:
-            try:
-                applications = excel_integration.read_applications(oke)
-                for app in applications:
-                    app['oke'] = oke  # Добавляем информацию об ОКЭ
-                    all_applications.append(app)
-            except Exception as e:
-                logger.warning(f"Ошибка чтения заявок из {oke}: {e}")
-                continue
-        
-        # Применяем фильтры
-        filtered_applications = []
-        for app in all_applications:
-            # Фильтр по поисковому запросу
-            if search_query:
-                search_fields = [
-                    app.get('ФИО', ''),
-                    app.get('Табельный номер', ''),
-                    app.get('Должность', ''),
-                    app.get('Направление', ''),
-                    app.get('Информация о рейсе', '')
-                ]
-                if not any(search_query.lower() in str(field).lower() for field in search_fields):
-                    continue
-            
-            # Фильтр по ОКЭ
-            if oke_filter and app.get('oke', '') != oke_filter:
-                continue
-            
-            # Фильтр по должности
-            if position_filter and position_filter.lower() not in app.get('Должность', '').lower():
-                continue
-            
-            # Фильтр по дате
-            if date_from or date_to:
-                app_date_str = app.get('Время подачи заявки', '')
-                try:
-                    app_date = datetime.strptime(app_date_str.split()[0], '%Y-%m-%d')
-                    if date_from:
-                        from_date = datetime.strptime(date_from, '%Y-%m-%d')
-                        if app_date < from_date:
-                            continue
-                    if date_to:
-                        to_date = datetime.strptime(date_to, '%Y-%m-%d')
-                        if app_date > to_date:
-                            continue
-                except (ValueError, IndexError):
-                    continue
-            
-            filtered_applications.append(app)
-        
-        # Сортировка по дате (новые сначала)
-        filtered_applications.sort(key=lambda x: x.get('Время подачи заявки', ''), reverse=True)
+        # Страница отбирается обходом индекса времени от курсора (время подачи, ID)
+        # до per_page подходящих заявок, без построения полного списка результатов.
+        # ОКЭ, должность, направление и статус отбираются пересечением битовых индексов
+        okes = [oke_filter] if oke_filter else None
+        filters = {'position': position_filter, 'direction': direction_filter, 'status': status_filter}
+        try:
+            result = excel_integration.search_page(okes, date_from, date_to, query=search_query,
+                                                   filters=filters, include_archive=include_archive,
+                                                   cursor=cursor, per_page=per_page, page=page,
+                                                   fuzzy=fuzzy)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Пагинация
-        total_count = len(filtered_applications)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_applications = filtered_applications[start_idx:end_idx]
+        total_count = result['total']
         
         return jsonify({
             'success': True,
-            'applications': paginated_applications,
+            'applications': result['applications'],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
                 'total_count': total_count,
-                'total_pages': (total_count + per_page - 1) // per_page
+                'total_pages': (total_count + per_page - 1) // per_page,
+                'total_is_estimate': result['total_is_estimate'],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['next_cursor'] is not None
             },
             'filters': {
                 'query': search_query,
+                'fuzzy': fuzzy,
                 'oke': oke_filter,
                 'date_from': date_from,
                 'date_to': date_to,
-                'position': position_filter
+                'position': position_filter,
+                'direction': direction_filter,
+                'status': status_filter
             }
         })
         
@@ -663,28 +685,18 @@ def api_search_applications():
 def api_get_filter_options():
     """API для получения опций фильтров"""
     try:
-        # Получаем уникальные должности
-        positions = set()
-        oke_counts = {}
-        
-        for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']:
-            try:
-                applications = excel_integration.read_applications(oke)
-                oke_counts[oke] = len(applications)
-                
-                for app in applications:
-                    position = app.get('Должность', '').strip()
-                    if position:
-                        positions.add(position)
-            except Exception as e:
-                logger.warning(f"Ошибка чтения заявок из {oke}: {e}")
-                oke_counts[oke] = 0
+        # Готовый снимок фасетов: обновляется при записи, заявки не перечитываются
+        facets = excel_integration.get_filter_options()
+        oke_counts = facets['oke']
         
         return jsonify({
             'success': True,
             'options': {
                 'okes': [{'name': oke, 'count': oke_counts.get(oke, 0)} for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']],
-                'positions': sorted(list(positions)),
+                'positions': sorted(facets['position']),
+                'directions': [{'name': name, 'count': count} for name, count in sorted(facets['direction'].items())],
+                'months': [{'name': name, 'count': count} for name, count in sorted(facets['month'].items(), reverse=True)],
+                'statuses': [{'name': name, 'count': count} for name, count in sorted(facets['status'].items())],
                 'total_applications': sum(oke_counts.values())
             }
         })
@@ -703,68 +715,43 @@ def api_export_applications():
         oke_filter = data.get('oke', '')
         date_from = data.get('date_from', '')
         date_to = data.get('date_to', '')
+        search_query = data.get('query', '').strip()
+        filters = {'position': data.get('position', ''), 'direction': data.get('direction', ''),
+                   'status': data.get('status', '')}
         format_type = data.get('format', 'excel')  # excel, csv
-        
-        # Получаем заявки с фильтрами (используем логику из поиска)
-        all_applications = []
-        for oke in ['ОКЭ 1', 'ОКЭ 2', 'ОКЭ 3', 'ОЛСиТ', 'ОКЭ 4', 'ОКЭ 5', 'ОКЭ Красноярск', 'ОКЭ Сочи']:
-            if oke_filter and oke != oke_filter:
-                continue
-                
-            try:
-                applications = excel_integration.read_applications(oke)
-                for app in applications:
-                    app['oke'] = oke
-                    all_applications.append(app)
-            except Exception as e:
-                logger.warning(f"Ошибка чтения заявок из {oke}: {e}")
-                continue
-        
-        # Применяем фильтры по дате
-        if date_from or date_to:
-            filtered_applications = []
-            for app in all_applications:
-                app_date_str = app.get('Время подачи заявки', '')
-                try:
-                    app_date = datetime.strptime(app_date_str.split()[0], '%Y-%m-%d')
-                    if date_from:
-                        from_date = datetime.strptime(date_from, '%Y-%m-%d')
-                        if app_date < from_date:
-                            continue
-                    if date_to:
-                        to_date = datetime.strptime(date_to, '%Y-%m-%d')
-                        if app_date > to_date:
-                            continue
-                    filtered_applications.append(app)
-                except (ValueError, IndexError):
-                    continue
-            all_applications = filtered_applications
+        include_archive = data.get('include_archive')
         
         # Создаем файл экспорта
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"export_{timestamp}.xlsx"
         filepath = os.path.join(excel_integration.data_dir, filename)
         
-        # Создаем Excel файл
+        # Создаем Excel файл в потоковом режиме: строки пишутся по мере чтения заявок
         from openpyxl import Workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Экспорт заявок"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Экспорт заявок")
         
         # Заголовки
         headers = ["ОКЭ", "Время подачи заявки", "ФИО", "Табельный номер", "Должность", "Направление", "Информация о рейсе"]
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Данные
-        for row, app in enumerate(all_applications, 2):
-            ws.cell(row=row, column=1, value=app.get('oke', ''))
-            ws.cell(row=row, column=2, value=app.get('Время подачи заявки', ''))
-            ws.cell(row=row, column=3, value=app.get('ФИО', ''))
-            ws.cell(row=row, column=4, value=app.get('Табельный номер', ''))
-            ws.cell(row=row, column=5, value=app.get('Должность', ''))
-            ws.cell(row=row, column=6, value=app.get('Направление', ''))
-            ws.cell(row=row, column=7, value=app.get('Информация о рейсе', ''))
+        ws.append(headers)
+        
+        exported_count = 0
+        okes = [oke_filter] if oke_filter else None
+        # Те же индексы, что и в поиске: период - по индексу времени, поля - по битовым индексам,
+        # поэтому выгрузка совпадает с результатами поиска с теми же фильтрами
+        for app in excel_integration.iter_all_applications(okes, date_from, date_to, include_archive,
+                                                           query=search_query, filters=filters):
+            # Данные
+            ws.append([
+                app.get('oke', ''),
+                app.get('Время подачи заявки', ''),
+                app.get('ФИО', ''),
+                app.get('Табельный номер', ''),
+                app.get('Должность', ''),
+                app.get('Направление', ''),
+                app.get('Информация о рейсе', '')
+            ])
+            exported_count += 1
         
         wb.save(filepath)
         
@@ -772,7 +759,7 @@ def api_export_applications():
             'success': True,
             'filename': filename,
             'filepath': filepath,
-            'count': len(all_applications),
+            'count': exported_count,
             'download_url': f'/api/download/{filename}'
         })
         
@@ -1059,6 +1046,65 @@ def api_delete_user(user_id):
         logger.error(f"Ошибка удаления пользователя: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# ==================== МАССОВАЯ ЗАГРУЗКА ЗАЯВОК ====================
+
+@app.route('/api/applications/bulk', methods=['POST'])
+@require_auth
+@require_permission('applications.create')
+def api_bulk_applications():
+    """API для массовой загрузки заявок из потока JSONL или CSV"""
+    try:
+        fmt = request.args.get('format', '').lower()
+        if not fmt:
+            content_type = (request.content_type or '').lower()
+            fmt = BULK_FORMAT_CSV if 'csv' in content_type else BULK_FORMAT_JSONL
+        if fmt not in (BULK_FORMAT_JSONL, BULK_FORMAT_CSV):
+            return jsonify({'success': False, 'error': f'Неподдерживаемый формат: {fmt}'}), 400
+        batch_size = min(max(int(request.args.get('batch_size', 1000)), 1), 10000)
+
+        # Тело запроса читается построчно, без загрузки целиком в память
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        result = excel_integration.add_applications_bulk(iter_bulk_records(lines, fmt), batch_size)
+
+        logger.info(f"Массовая загрузка от {request.current_user.username}: "
+                    f"добавлено {result['added']}, отклонено {result['failed']}")
+        return jsonify({'success': True, **result})
+
+    except Exception as e:
+        logger.error(f"Ошибка массовой загрузки заявок: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ==================== АРХИВ ЗАЯВОК ====================
+
+@app.route('/api/archive/segments', methods=['GET'])
+@require_auth
+@require_permission('applications.read')
+def api_archive_segments():
+    """API для просмотра сегментов архива закрытых периодов"""
+    try:
+        segments = excel_integration.get_archive_segments()
+        return jsonify({
+            'success': True,
+            'segments': segments,
+            'total_applications': sum(segment['rows'] for segment in segments)
+        })
+    except Exception as e:
+        logger.error(f"Ошибка получения сегментов архива: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/archive/run', methods=['POST'])
+@require_auth
+@require_permission('settings.update')
+def api_archive_run():
+    """API для немедленного переноса заявок закрытых периодов в архив"""
+    try:
+        result = excel_integration.archive_closed_periods(notification_manager.get_application_periods())
+        logger.info(f"Перенос в архив от {request.current_user.username}: {result['archived']} заявок")
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        logger.error(f"Ошибка переноса заявок в архив: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ==================== API УВЕДОМЛЕНИЙ ====================
 
 @app.route('/api/notifications', methods=['GET'])
@@ -1611,4 +1657,5 @@ def api_express_broadcast():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
+    start_archive_job()
     app.run(host='0.0.0.0', port=5002, debug=config.debug)
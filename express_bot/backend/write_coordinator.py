@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Координация записи мастер-файла между процессами
+Один процесс (владелец lock-файла) пишет мастер-файл, остальные пересылают ему записи через Unix socket
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+import hashlib
+import logging
+import tempfile
+import threading
+import socketserver
+from typing import Any, Callable, Dict, Optional
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Максимальная длина пути Unix socket (sun_path) с запасом
+MAX_SOCKET_PATH = 100
+
+class WriteForwardError(RuntimeError):
+    """Ошибка выполнения записи процессом-писателем"""
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Обработчик пересланных записей: одна строка JSON - запрос, одна строка - ответ"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            result, sequence = self.server.coordinator._execute(request["op"], request.get("args") or {})
+            response = {"ok": True, "result": result, "seq": sequence}
+        except Exception as e:
+            logger.error(f"❌ Ошибка выполнения пересланной записи: {e}")
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class _WriterServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Сервер процесса-писателя; каждый запрос в своем потоке, чтобы записи собирались в пакеты"""
+
+    daemon_threads = True
+
+
+class WriteCoordinator:
+    """
+    Выбор единственного процесса-писателя и пересылка ему записей
+
+    Протокол:
+    - писатель держит flock на lock-файле все время работы; при его завершении
+      блокировку получает следующий ожидающий процесс;
+    - писатель слушает Unix socket и выполняет пересланные операции;
+    - после каждой выполненной операции писатель увеличивает номер в файле
+      последовательности записей и возвращает его отправителю.
+    """
+
+    def __init__(self, base_path: str, connect_timeout: float = 10.0, request_timeout: float = 60.0):
+        """
+        Args:
+            base_path: Путь к мастер-файлу, рядом с которым создаются служебные файлы
+            connect_timeout: Время ожидания доступного писателя (секунды)
+            request_timeout: Время ожидания выполнения операции писателем (секунды)
+        """
+        self.base_path = os.path.abspath(base_path)
+        self.lock_path = f"{self.base_path}.writer.lock"
+        self.sequence_path = f"{self.base_path}.writer.seq"
+        self.socket_path = self._make_socket_path(self.base_path)
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+
+        self.lock = threading.Lock()
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._promotion_callbacks: Dict[str, Callable[[], None]] = {}
+        self._promoted = threading.Event()
+        self._sequence = 0
+        self._server: Optional[_WriterServer] = None
+
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Писатель уже есть: ждем его завершения в фоне, чтобы занять его место
+            threading.Thread(target=self._wait_for_promotion, name="writer-election", daemon=True).start()
+            logger.info(f"📨 Записи мастер-файла пересылаются процессу-писателю: {self.socket_path}")
+        else:
+            self._promote()
+
+    @staticmethod
+    def _make_socket_path(base_path: str) -> str:
+        """Путь к Unix socket писателя (короткий путь во временной директории, если рядом с файлом не помещается)"""
+        socket_path = f"{base_path}.writer.sock"
+        if len(socket_path.encode("utf-8")) <= MAX_SOCKET_PATH:
+            return socket_path
+        digest = hashlib.sha1(base_path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), f"express_bot_writer_{digest}.sock")
+
+    # ==================== ВЫБОР ПИСАТЕЛЯ ====================
+
+    def is_writer(self) -> bool:
+        """Проверяет, является ли текущий процесс писателем"""
+        return self._promoted.is_set()
+
+    def _wait_for_promotion(self):
+        """Блокируется на lock-файле до завершения текущего писателя"""
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        except OSError as e:
+            logger.error(f"❌ Ошибка ожидания блокировки писателя: {e}")
+            return
+        self._promote()
+
+    def _promote(self):
+        """Делает текущий процесс писателем"""
+        # Под блокировкой другого писателя нет, оставшийся socket - след завершившегося процесса
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._server = _WriterServer(self.socket_path, _RequestHandler)
+        self._server.coordinator = self
+        threading.Thread(target=self._server.serve_forever, name="writer-server", daemon=True).start()
+
+        os.ftruncate(self._lock_fd, 0)
+        os.pwrite(self._lock_fd, json.dumps({"pid": os.getpid(), "socket": self.socket_path}).encode("utf-8"), 0)
+        with self.lock:
+            self._sequence = self._read_sequence()
+            self._promoted.set()
+            callbacks = list(self._promotion_callbacks.values())
+        logger.info(f"✍️ Процесс {os.getpid()} назначен писателем мастер-файла {self.base_path}")
+
+        for callback in callbacks:
+            self._run_promotion_callback(callback)
+
+    @staticmethod
+    def _run_promotion_callback(callback: Callable[[], None]):
+        """Выполняет действие при назначении писателем"""
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ Ошибка запуска задач писателя: {e}")
+
+    def on_promoted(self, name: str, callback: Callable[[], None]):
+        """
+        Регистрирует действие, выполняемое процессом после назначения писателем
+
+        Если процесс уже писатель, действие выполняется сразу. Повторная
+        регистрация под тем же именем игнорируется.
+
+        Args:
+            name: Название действия
+            callback: Функция без аргументов
+        """
+        with self.lock:
+            if name in self._promotion_callbacks:
+                return
+            self._promotion_callbacks[name] = callback
+            run_now = self.is_writer()
+        if run_now:
+            self._run_promotion_callback(callback)
+
+    # ==================== ОПЕРАЦИИ ЗАПИСИ ====================
+
+    def register(self, op: str, handler: Callable[..., Any]):
+        """
+        Регистрирует операцию записи (повторная регистрация игнорируется)
+
+        Args:
+            op: Название операции
+            handler: Функция, принимающая JSON-совместимые именованные аргументы
+        """
+        with self.lock:
+            self._handlers.setdefault(op, handler)
+
+    def submit(self, op: str, **args) -> Any:
+        """
+        Выполняет операцию записи в процессе-писателе
+
+        Args:
+            op: Название операции
+            **args: JSON-совместимые аргументы операции
+
+        Returns:
+            Результат операции
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            if self.is_writer():
+                result, _ = self._execute(op, args)
+                return result
+            try:
+                return self._forward(op, args)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Писатель завершился или еще не открыл socket: ждем выбора нового
+                if time.monotonic() >= deadline:
+                    raise WriteForwardError(f"Процесс-писатель недоступен: {self.socket_path}")
+                self._promoted.wait(timeout=0.05)
+
+    def _execute(self, op: str, args: Dict[str, Any]):
+        """Выполняет операцию в текущем процессе и увеличивает номер последовательности"""
+        with self.lock:
+            handler = self._handlers.get(op)
+        if handler is None:
+            raise WriteForwardError(f"Неизвестная операция записи '{op}'")
+        result = handler(**args)
+        with self.lock:
+            self._sequence += 1
+            sequence = self._sequence
+            self._write_sequence(sequence)
+        return result, sequence
+
+    def _forward(self, op: str, args: Dict[str, Any]) -> Any:
+        """Пересылает операцию процессу-писателю"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.request_timeout)
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps({"op": op, "args": args}, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        if not line:
+            raise WriteForwardError("Процесс-писатель закрыл соединение без ответа")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise WriteForwardError(response.get("error", "неизвестная ошибка"))
+        return response.get("result")
+
+    # ==================== ПОСЛЕДОВАТЕЛЬНОСТЬ ЗАПИСЕЙ ====================
+
+    def _read_sequence(self) -> int:
+        """Читает номер последней выполненной записи"""
+        try:
+            with open(self.sequence_path, "r", encoding="utf-8") as f:
+                return int(json.load(f).get("seq", 0))
+        except FileNotFoundError:
+            return 0
+        except (ValueError, AttributeError):
+            logger.error("❌ Поврежденный файл последовательности записей, нумерация начата заново")
+            return 0
+
+    def _write_sequence(self, sequence: int):
+        """Записывает номер последней выполненной записи (вызывается под блокировкой)"""
+        tmp_path = f"{self.sequence_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": sequence, "pid": os.getpid()}, f)
+        os.replace(tmp_path, self.sequence_path)
+
+    def last_sequence(self) -> int:
+        """Номер последней записи, выполненной писателем (в любом процессе)"""
+        if self.is_writer():
+            with self.lock:
+                return self._sequence
+        return self._read_sequence()
+
+    def close(self):
+        """Останавливает сервер писателя и освобождает lock-файл"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self._promoted.clear()
+        os.close(self._lock_fd)
+
+
+# Координаторы общие для всех экземпляров ExcelIntegration в процессе
+_coordinators: Dict[str, WriteCoordinator] = {}
+_coordinators_lock = threading.Lock()
+
+def get_write_coordinator(base_path: str) -> WriteCoordinator:
+    """
+    Возвращает общий для процесса координатор записи мастер-файла
+
+    Args:
+        base_path: Путь к мастер-файлу
+
+    Returns:
+        Экземпляр WriteCoordinator
+    """
+    key = os.path.abspath(base_path)
+    with _coordinators_lock:
+        if key not in _coordinators:
+            _coordinators[key] = WriteCoordinator(key)
+        return _coordinators[key]
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Дозапись строк в XLSX на уровне zip-контейнера
+Меняет только XML затронутых листов, остальные элементы архива копируются байт в байт
+"""
+
+import os
+import re
+import zlib
+import struct
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from xlsx_reader import FastXlsxReader
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW_NUMBER = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_CELL = re.compile(rb'<c\b([^>]*)>')
+_DIMENSION = re.compile(rb'<dimension\b[^>]*?/>')
+_COLS = re.compile(rb'<cols>.*?</cols>', re.S)
+_COL = re.compile(rb'<col\b[^>]*/>')
+_ATTRIBUTE = re.compile(rb'(\w+)="([^"]*)"')
+_ROW = re.compile(rb'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+_ROW_CELL = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_CELL_TEXT = re.compile(rb'<(?:\w+:)?(?:v|t)(?:\s[^>]*)?>([^<]*)<', re.S)
+_ROW_REFERENCE = re.compile(rb'(<row\b[^>]*?\sr=")\d+(")')
+_CELL_REFERENCE = re.compile(rb'(<c\b[^>]*?\sr="[A-Z]+)\d+(")')
+# Элементы листа со ссылками на строки: при сдвиге строк их пришлось бы пересчитывать
+_ROW_DEPENDENT = re.compile(rb'<(?:mergeCells|hyperlinks|conditionalFormatting|dataValidations|f)\b')
+# Символы, недопустимые в XML 1.0
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Функция пересчета ширины колонок: (текущая ширина по колонкам, новые строки) -> новая ширина или None
+WidthUpdater = Callable[[List[Optional[float]], List[List[str]]], Optional[List[float]]]
+
+class XlsxAppendUnsupported(Exception):
+    """Файл имеет структуру, которую быстрая дозапись не поддерживает"""
+
+
+class RowRemovals(NamedTuple):
+    """Удаление строк, найденных по значению ключевой колонки, на всех листах"""
+    key_column: int                      # Ключевая колонка (с нуля)
+    keys: Set[str]                       # Значения ключа удаляемых строк
+
+
+class RowUpdates(NamedTuple):
+    """Замена значения одной колонки в строках, найденных по значению ключевой колонки"""
+    key_column: int                      # Ключевая колонка (с нуля)
+    value_column: int                    # Изменяемая колонка (с нуля)
+    values: Dict[str, Dict[str, str]]    # Лист -> значение ключа -> новое значение
+
+
+def _column_index(letters: str) -> int:
+    """Номер колонки по буквам (A -> 1)"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+def _column_letter(index: int) -> str:
+    """Буква колонки по номеру (1 -> A)"""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+def _escape(value: str) -> str:
+    """Экранирует значение ячейки для XML"""
+    value = _ILLEGAL_XML_CHARS.sub("", value)
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def _sheet_paths(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Пути XML листов в архиве по названию листа"""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{PACKAGE_REL_NS}}}Relationship")}
+
+    paths = {}
+    for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+        target = targets.get(sheet.get(f"{{{REL_NS}}}id"))
+        if target is None:
+            continue
+        # Путь может быть абсолютным внутри пакета или относительным к xl/
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        paths[sheet.get("name")] = path
+    return paths
+
+def _read_column_widths(sheet_xml: bytes, columns: int) -> List[Optional[float]]:
+    """Ширина колонок из элемента <cols>"""
+    widths: List[Optional[float]] = [None] * columns
+    cols = _COLS.search(sheet_xml)
+    if not cols:
+        return widths
+    for col in _COL.finditer(cols.group(0)):
+        attrs = dict(_ATTRIBUTE.findall(col.group(0)))
+        if b"width" not in attrs:
+            continue
+        for index in range(int(attrs.get(b"min", 0)), int(attrs.get(b"max", 0)) + 1):
+            if 1 <= index <= columns:
+                widths[index - 1] = float(attrs[b"width"])
+    return widths
+
+def _format_width(width: float) -> str:
+    """Ширина колонки без лишних нулей"""
+    return str(int(width)) if float(width).is_integer() else str(width)
+
+def _append_to_sheet(sheet_xml: bytes, rows: List[List[str]], columns: int,
+                     update_widths: Optional[WidthUpdater]) -> Tuple[bytes, int]:
+    """Дописывает строки в XML листа и возвращает новый XML и номер последней строки"""
+    data_end = sheet_xml.rfind(b"</sheetData>")
+    empty_data = sheet_xml.find(b"<sheetData/>") if data_end < 0 else -1
+    if data_end < 0 and empty_data < 0:
+        raise XlsxAppendUnsupported("лист без sheetData")
+
+    last_row = 0
+    style_ids: List[Optional[bytes]] = [None] * columns
+    if data_end >= 0:
+        last_row_start = sheet_xml.rfind(b"<row ", 0, data_end)
+        if last_row_start >= 0:
+            match = _ROW_NUMBER.match(sheet_xml, last_row_start)
+            if not match:
+                raise XlsxAppendUnsupported("строка без номера")
+            last_row = int(match.group(1))
+            if last_row > 1:
+                # Новые ячейки оформляются так же, как последняя строка данных
+                for cell in _CELL.finditer(sheet_xml, last_row_start, data_end):
+                    attrs = dict(_ATTRIBUTE.findall(cell.group(1)))
+                    reference = attrs.get(b"r", b"").decode("ascii")
+                    index = _column_index(reference.rstrip("0123456789")) - 1
+                    if 0 <= index < columns:
+                        style_ids[index] = attrs.get(b"s")
+
+    parts = []
+    for offset, row in enumerate(rows, 1):
+        number = last_row + offset
+        cells = []
+        for index in range(columns):
+            value = row[index] if index < len(row) else ""
+            if value is None or value == "":
+                continue
+            value = str(value)
+            style = f' s="{style_ids[index].decode()}"' if style_ids[index] else ""
+            space = ' xml:space="preserve"' if value != value.strip() else ""
+            cells.append(f'<c r="{_column_letter(index + 1)}{number}"{style} t="inlineStr">'
+                         f'<is><t{space}>{_escape(value)}</t></is></c>')
+        parts.append(f'<row r="{number}">{"".join(cells)}</row>')
+    new_rows = "".join(parts).encode("utf-8")
+
+    if data_end >= 0:
+        sheet_xml = sheet_xml[:data_end] + new_rows + sheet_xml[data_end:]
+    else:
+        sheet_xml = sheet_xml.replace(b"<sheetData/>", b"<sheetData>" + new_rows + b"</sheetData>", 1)
+
+    dimension = f'<dimension ref="A1:{_column_letter(columns)}{last_row + len(rows)}"/>'.encode("ascii")
+    if _DIMENSION.search(sheet_xml):
+        sheet_xml = _DIMENSION.sub(dimension, sheet_xml, count=1)
+
+    if update_widths is not None:
+        widths = update_widths(_read_column_widths(sheet_xml, columns), rows)
+        if widths is not None:
+            sheet_xml = _set_sheet_widths(sheet_xml, widths)
+    return sheet_xml, last_row + len(rows)
+
+def _set_sheet_widths(sheet_xml: bytes, widths: List[float]) -> bytes:
+    """Записывает ширину колонок в элемент <cols> листа"""
+    cols = "".join(
+        f'<col min="{index}" max="{index}" width="{_format_width(width)}" customWidth="1"/>'
+        for index, width in enumerate(widths, 1)
+    ).encode("ascii")
+    if _COLS.search(sheet_xml):
+        return _COLS.sub(b"<cols>" + cols + b"</cols>", sheet_xml, count=1)
+    position = sheet_xml.find(b"<sheetData")
+    if position < 0:
+        raise XlsxAppendUnsupported("лист без sheetData")
+    return sheet_xml[:position] + b"<cols>" + cols + b"</cols>" + sheet_xml[position:]
+
+def _unescape(value: bytes) -> str:
+    """Текст ячейки из XML"""
+    text = value.decode("utf-8")
+    if "&" in text:
+        text = (text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+                .replace("&apos;", "'").replace("&amp;", "&"))
+    return text
+
+def _cell_key(attrs: Dict[bytes, bytes], body: Optional[bytes], shared: Callable[[], List[str]]) -> str:
+    """Значение ячейки в виде строки (так же, как его читает xlsx_reader)"""
+    if not body:
+        return ""
+    text = "".join(_unescape(part) for part in _CELL_TEXT.findall(body))
+    cell_type = attrs.get(b"t", b"n")
+    if cell_type == b"s":
+        return shared()[int(text)]
+    if cell_type == b"n" and text:
+        # Числовой ключ (например, идентификатор, записанный openpyxl как int)
+        number = float(text)
+        return str(int(number)) if number.is_integer() else str(number)
+    return text
+
+def _update_sheet_rows(sheet_xml: bytes, updates: RowUpdates, values: Dict[str, str],
+                       shared: Callable[[], List[str]]) -> Tuple[bytes, int]:
+    """Меняет значение колонки в строках листа с указанными ключами; возвращает XML и число измененных строк"""
+    start = sheet_xml.find(b"<sheetData>")
+    end = sheet_xml.rfind(b"</sheetData>")
+    if start < 0 or end < 0:
+        return sheet_xml, 0
+
+    key_letters = _column_letter(updates.key_column + 1).encode("ascii")
+    value_index = updates.value_column + 1
+    parts = [sheet_xml[:start]]
+    position = start
+    updated = 0
+    for row in _ROW.finditer(sheet_xml, start, end):
+        row_xml = row.group(0)
+        number = _ROW_NUMBER.match(row_xml)
+        if not number:
+            raise XlsxAppendUnsupported("строка без номера")
+
+        cells = []
+        key = None
+        for cell in _ROW_CELL.finditer(row_xml):
+            attrs = dict(_ATTRIBUTE.findall(cell.group(1)))
+            letters = attrs.get(b"r", b"").rstrip(b"0123456789")
+            if not letters:
+                raise XlsxAppendUnsupported("ячейка без адреса")
+            cells.append((_column_index(letters.decode("ascii")), attrs, cell))
+            if letters == key_letters:
+                key = _cell_key(attrs, cell.group(2), shared)
+        if key is None or key not in values:
+            continue
+
+        reference = f"{_column_letter(value_index)}{number.group(1).decode('ascii')}"
+        existing = next((item for item in cells if item[0] == value_index), None)
+        style = existing[1].get(b"s") if existing else None
+        value = values[key]
+        new_cell = (f'<c r="{reference}"' + (f' s="{style.decode()}"' if style else "") +
+                    f' t="inlineStr"><is><t>{_escape(value)}</t></is></c>').encode("utf-8")
+        if existing:
+            cell_start, cell_end = existing[2].span()
+        else:
+            # Ячейки строки идут по возрастанию колонок: вставляем перед первой ячейкой правее
+            following = next((item for item in cells if item[0] > value_index), None)
+            if following:
+                cell_start = cell_end = following[2].start()
+            elif row_xml.endswith(b"/>"):
+                row_xml = row_xml[:-2] + b"></row>"
+                cell_start = cell_end = len(row_xml) - len(b"</row>")
+            else:
+                cell_start = cell_end = len(row_xml) - len(b"</row>")
+        row_xml = row_xml[:cell_start] + new_cell + row_xml[cell_end:]
+
+        parts.append(sheet_xml[position:row.start()])
+        parts.append(row_xml)
+        position = row.end()
+        updated += 1
+
+    parts.append(sheet_xml[position:])
+    return b"".join(parts), updated
+
+def _remove_sheet_rows(sheet_xml: bytes, removals: RowRemovals,
+                       shared: Callable[[], List[str]]) -> Tuple[bytes, int]:
+    """Удаляет строки листа с указанными ключами и сдвигает следующие; возвращает XML и число удаленных строк"""
+    start = sheet_xml.find(b"<sheetData>")
+    end = sheet_xml.rfind(b"</sheetData>")
+    if start < 0 or end < 0:
+        return sheet_xml, 0
+
+    key_letters = _column_letter(removals.key_column + 1).encode("ascii")
+    parts = [sheet_xml[:start]]
+    position = start
+    removed = 0
+    last_row = 0
+    for row in _ROW.finditer(sheet_xml, start, end):
+        row_xml = row.group(0)
+        number = _ROW_NUMBER.match(row_xml)
+        if not number:
+            raise XlsxAppendUnsupported("строка без номера")
+        key = None
+        for cell in _ROW_CELL.finditer(row_xml):
+            attrs = dict(_ATTRIBUTE.findall(cell.group(1)))
+            if attrs.get(b"r", b"").rstrip(b"0123456789") == key_letters:
+                key = _cell_key(attrs, cell.group(2), shared)
+                break
+
+        parts.append(sheet_xml[position:row.start()])
+        position = row.end()
+        if key is not None and key in removals.keys:
+            removed += 1
+            continue
+        last_row = int(number.group(1)) - removed
+        if removed:
+            # Строки ниже удаленных поднимаются: меняются номера строки и адреса ее ячеек
+            new_number = str(last_row).encode("ascii")
+            row_xml = _ROW_REFERENCE.sub(lambda m: m.group(1) + new_number + m.group(2), row_xml, count=1)
+            row_xml = _CELL_REFERENCE.sub(lambda m: m.group(1) + new_number + m.group(2), row_xml)
+        parts.append(row_xml)
+
+    if not removed:
+        return sheet_xml, 0
+    if _ROW_DEPENDENT.search(sheet_xml):
+        raise XlsxAppendUnsupported("лист со ссылками на строки (объединения, формулы, гиперссылки)")
+    parts.append(sheet_xml[position:])
+    sheet_xml = b"".join(parts)
+    dimension = _DIMENSION.search(sheet_xml)
+    if dimension:
+        ref = dict(_ATTRIBUTE.findall(dimension.group(0))).get(b"ref", b"A1").decode("ascii")
+        first = ref.split(":")[0]
+        last_column = ref.split(":")[-1].rstrip("0123456789") or "A"
+        new_dimension = f'<dimension ref="{first}:{last_column}{max(last_row, 1)}"/>'.encode("ascii")
+        sheet_xml = sheet_xml[:dimension.start()] + new_dimension + sheet_xml[dimension.end():]
+    return sheet_xml, removed
+
+def _set_custom_properties(custom_xml: bytes, properties: Dict[str, str]) -> bytes:
+    """Меняет значения существующих строковых свойств документа"""
+    for name, value in properties.items():
+        pattern = re.compile(
+            rb'(<property\b[^>]*\bname="' + re.escape(name.encode("utf-8")) + rb'"[^>]*>\s*<vt:lpwstr>)(.*?)(</vt:lpwstr>)',
+            re.S
+        )
+        escaped = _escape(value).encode("utf-8")
+        custom_xml, replaced = pattern.subn(lambda m: m.group(1) + escaped + m.group(3), custom_xml, count=1)
+        if not replaced:
+            raise XlsxAppendUnsupported(f"нет свойства документа '{name}'")
+    return custom_xml
+
+# ==================== ZIP ====================
+
+def _dos_datetime(date_time: Tuple[int, int, int, int, int, int]) -> Tuple[int, int]:
+    """Время и дата в формате MS-DOS для заголовков zip"""
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+def _raw_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """Сжатые данные элемента архива без распаковки"""
+    archive.fp.seek(info.header_offset)
+    header = archive.fp.read(30)
+    if header[:4] != b"PK\x03\x04":
+        raise XlsxAppendUnsupported(f"поврежденный заголовок элемента {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    archive.fp.seek(info.header_offset + 30 + name_length + extra_length)
+    return archive.fp.read(info.compress_size)
+
+def _write_archive(path: str, members: List[Tuple[zipfile.ZipInfo, int, int, int, bytes]]):
+    """
+    Записывает zip архив
+
+    Args:
+        path: Путь к архиву
+        members: (исходный ZipInfo, метод сжатия, CRC32, исходный размер, сжатые данные)
+    """
+    central = []
+    with open(path, "wb") as f:
+        for info, method, crc, size, data in members:
+            name = info.filename.encode("utf-8")
+            # Бит 3 (дескриптор после данных) не нужен: размеры известны заранее; бит 11 - имя в UTF-8
+            flags = (info.flag_bits & ~0x08) | 0x800
+            dos_time, dos_date = _dos_datetime(info.date_time)
+            offset = f.tell()
+            if offset > 0xFFFFFFFF or len(data) > 0xFFFFFFFF or size > 0xFFFFFFFF:
+                raise XlsxAppendUnsupported("архив требует zip64")
+            f.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, flags, method, dos_time, dos_date,
+                                crc, len(data), size, len(name), 0))
+            f.write(name)
+            f.write(data)
+            central.append(
+                struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (info.create_system << 8) | 20, 20, flags,
+                            method, dos_time, dos_date, crc, len(data), size, len(name), 0, 0, 0,
+                            info.internal_attr, info.external_attr, offset) + name
+            )
+        directory_offset = f.tell()
+        directory = b"".join(central)
+        f.write(directory)
+        f.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central),
+                            len(directory), directory_offset, 0))
+        f.flush()
+        os.fsync(f.fileno())
+
+def append_rows(src_path: str, dst_path: str, rows: List[Tuple[str, List[str]]], columns: int,
+                properties: Optional[Dict[str, str]] = None,
+                update_widths: Optional[WidthUpdater] = None,
+                updates: Optional[RowUpdates] = None) -> Dict[str, int]:
+    """
+    Дописывает строки в листы XLSX и сохраняет результат в новый файл
+
+    Значения записываются как встроенные строки (inlineStr), поэтому
+    sharedStrings.xml и стили не меняются. Все незатронутые элементы
+    архива копируются в сжатом виде без распаковки.
+
+    Args:
+        src_path: Исходный файл
+        dst_path: Файл результата (исходный файл не меняется)
+        rows: Пары (название листа, значения колонок)
+        columns: Количество колонок в строке
+        properties: Новые значения существующих строковых свойств документа
+        update_widths: Функция пересчета ширины колонок листа
+        updates: Замена значений в существующих строках (применяется после дозаписи,
+            поэтому может затрагивать и только что дописанные строки)
+
+    Returns:
+        Номер последней строки по каждому листу, в который дописаны строки
+
+    Raises:
+        XlsxAppendUnsupported: Листа нет или структура файла не поддерживается
+    """
+    rows_by_sheet: Dict[str, List[List[str]]] = {}
+    for sheet, row in rows:
+        rows_by_sheet.setdefault(sheet, []).append(row)
+
+    with zipfile.ZipFile(src_path) as archive:
+        paths = _sheet_paths(archive)
+        changed: Dict[str, bytes] = {}
+        last_rows: Dict[str, int] = {}
+        for sheet, sheet_rows in rows_by_sheet.items():
+            if sheet not in paths:
+                raise XlsxAppendUnsupported(f"нет листа '{sheet}'")
+            changed[paths[sheet]], last_rows[sheet] = _append_to_sheet(
+                archive.read(paths[sheet]), sheet_rows, columns, update_widths
+            )
+        if updates is not None:
+            shared = _shared_strings(src_path)
+            for sheet, values in updates.values.items():
+                if sheet not in paths:
+                    continue
+                sheet_xml = changed.get(paths[sheet])
+                if sheet_xml is None:
+                    sheet_xml = archive.read(paths[sheet])
+                sheet_xml, updated = _update_sheet_rows(sheet_xml, updates, values, shared)
+                if updated:
+                    changed[paths[sheet]] = sheet_xml
+        if properties:
+            try:
+                custom_xml = archive.read("docProps/custom.xml")
+            except KeyError:
+                raise XlsxAppendUnsupported("нет docProps/custom.xml")
+            changed["docProps/custom.xml"] = _set_custom_properties(custom_xml, properties)
+
+        _save_changed(archive, dst_path, changed)
+    return last_rows
+
+def remove_rows(src_path: str, dst_path: str, removals: RowRemovals) -> Dict[str, int]:
+    """
+    Удаляет строки листов XLSX по значению ключевой колонки
+
+    Строки ниже удаленных сдвигаются вверх правкой XML листа; остальные листы
+    и элементы архива копируются в сжатом виде без распаковки.
+
+    Args:
+        src_path: Исходный файл
+        dst_path: Файл результата (создается, только если строки удалены)
+        removals: Ключевая колонка и значения ключа удаляемых строк
+
+    Returns:
+        Количество удаленных строк по листам (пустой словарь - файл результата не создан)
+
+    Raises:
+        XlsxAppendUnsupported: Структура файла не поддерживается
+    """
+    with zipfile.ZipFile(src_path) as archive:
+        shared = _shared_strings(src_path)
+        changed: Dict[str, bytes] = {}
+        removed: Dict[str, int] = {}
+        for sheet, path in _sheet_paths(archive).items():
+            sheet_xml, count = _remove_sheet_rows(archive.read(path), removals, shared)
+            if count:
+                changed[path] = sheet_xml
+                removed[sheet] = count
+        if changed:
+            _save_changed(archive, dst_path, changed)
+    return removed
+
+def _shared_strings(src_path: str) -> Callable[[], List[str]]:
+    """Ленивое чтение общих строк: они нужны, только если ключ записан не встроенной строкой"""
+    strings: List[List[str]] = []
+
+    def shared() -> List[str]:
+        if not strings:
+            with FastXlsxReader(src_path) as reader:
+                strings.append(reader.shared_strings())
+        return strings[0]
+
+    return shared
+
+def set_column_widths(src_path: str, dst_path: str, widths: Dict[str, List[float]]) -> List[str]:
+    """
+    Записывает ширину колонок листов XLSX; листы, где ширина не изменилась, не трогаются
+
+    Args:
+        src_path: Исходный файл
+        dst_path: Файл результата (создается, только если ширина изменилась)
+        widths: Лист -> ширина колонок по порядку
+
+    Returns:
+        Листы, в которых изменилась ширина (пустой список - файл результата не создан)
+
+    Raises:
+        XlsxAppendUnsupported: Структура файла не поддерживается
+    """
+    with zipfile.ZipFile(src_path) as archive:
+        paths = _sheet_paths(archive)
+        changed: Dict[str, bytes] = {}
+        sheets = []
+        for sheet, sheet_widths in widths.items():
+            if sheet not in paths:
+                continue
+            sheet_xml = archive.read(paths[sheet])
+            if _read_column_widths(sheet_xml, len(sheet_widths)) == [float(width) for width in sheet_widths]:
+                continue
+            changed[paths[sheet]] = _set_sheet_widths(sheet_xml, sheet_widths)
+            sheets.append(sheet)
+        if changed:
+            _save_changed(archive, dst_path, changed)
+    return sheets
+
+def _save_changed(archive: zipfile.ZipFile, dst_path: str, changed: Dict[str, bytes]):
+    """Записывает архив с замененными элементами, остальные копируются в сжатом виде"""
+    members = []
+    for info in archive.infolist():
+        if info.filename in changed:
+            content = changed[info.filename]
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            data = compressor.compress(content) + compressor.flush()
+            members.append((info, zipfile.ZIP_DEFLATED, zlib.crc32(content), len(content), data))
+        else:
+            members.append((info, info.compress_type, info.CRC, info.file_size, _raw_member(archive, info)))
+    _write_archive(dst_path, members)
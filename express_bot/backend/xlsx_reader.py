@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Быстрое потоковое чтение листов заявок из XLSX
+Разбирает XML листов через expat и возвращает значения ячеек строками, без объектов ячеек и стилей
+"""
+
+import zipfile
+import posixpath
+import xml.parsers.expat
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Set
+
+try:
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+    from openpyxl.utils.datetime import from_excel
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CUSTOM_PROPERTIES_NS = "http://schemas.openxmlformats.org/officeDocument/2006/custom-properties"
+
+# Размер порции распакованного XML, передаваемой парсеру
+CHUNK_SIZE = 256 * 1024
+
+_DIGITS = "0123456789"
+
+# Номера колонок по буквам ссылки; в листах заявок различных букв единицы
+_column_indexes: Dict[str, int] = {}
+
+def _local(name: str) -> str:
+    """Имя элемента без префикса пространства имен"""
+    return name.rpartition(":")[2] if ":" in name else name
+
+def _column_index(reference: str) -> int:
+    """Номер колонки (с нуля) по ссылке на ячейку ('C12' -> 2)"""
+    letters = reference.rstrip(_DIGITS)
+    index = _column_indexes.get(letters)
+    if index is None:
+        index = 0
+        for letter in letters:
+            index = index * 26 + ord(letter) - ord("A") + 1
+        index = _column_indexes[letters] = index - 1
+    return index
+
+def _number(text: str) -> str:
+    """Число в том виде, в каком его возвращает openpyxl после str()"""
+    if "." in text or "E" in text or "e" in text:
+        return str(float(text))
+    return str(int(text))
+
+
+class FastXlsxReader:
+    """Минимальный читатель XLSX для листов с фиксированным набором колонок"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Путь к XLSX файлу
+        """
+        self.archive = zipfile.ZipFile(path)
+        self._sheet_paths = self._read_sheet_paths()
+        self._shared_strings: Optional[List[str]] = None
+        self._date_styles: Optional[Set[int]] = None
+
+    def __enter__(self) -> "FastXlsxReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Закрывает архив"""
+        self.archive.close()
+
+    @property
+    def sheetnames(self) -> List[str]:
+        """Названия листов в порядке книги"""
+        return list(self._sheet_paths)
+
+    def _read_sheet_paths(self) -> Dict[str, str]:
+        """Пути XML листов в архиве по названию листа"""
+        workbook = ET.fromstring(self.archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(self.archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{PACKAGE_REL_NS}}}Relationship")}
+
+        paths = {}
+        for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+            target = targets.get(sheet.get(f"{{{REL_NS}}}id"))
+            if target is None:
+                continue
+            # Путь может быть абсолютным внутри пакета или относительным к xl/
+            paths[sheet.get("name")] = (target.lstrip("/") if target.startswith("/")
+                                        else posixpath.normpath(posixpath.join("xl", target)))
+        return paths
+
+    def custom_properties(self) -> Dict[str, str]:
+        """Строковые пользовательские свойства документа (docProps/custom.xml)"""
+        try:
+            root = ET.fromstring(self.archive.read("docProps/custom.xml"))
+        except KeyError:
+            return {}
+        properties = {}
+        for prop in root.iter(f"{{{CUSTOM_PROPERTIES_NS}}}property"):
+            values = [child.text or "" for child in prop]
+            if values:
+                properties[prop.get("name")] = values[0]
+        return properties
+
+    # ==================== ОБЩИЕ СТРОКИ И СТИЛИ ====================
+
+    def _parse(self, member: str, parser):
+        """Передает XML элемента архива парсеру порциями, не распаковывая его целиком"""
+        with self.archive.open(member) as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.Parse(chunk, False)
+                yield
+        parser.Parse(b"", True)
+        yield
+
+    def shared_strings(self) -> List[str]:
+        """Таблица общих строк (xl/sharedStrings.xml)"""
+        if self._shared_strings is not None:
+            return self._shared_strings
+
+        strings: List[str] = []
+        if "xl/sharedStrings.xml" in self.archive.NameToInfo:
+            parser = xml.parsers.expat.ParserCreate()
+            parser.buffer_text = True
+            state = {"parts": None, "text": False, "phonetic": False}
+
+            def start(name, attrs):
+                name = _local(name)
+                if name == "si":
+                    state["parts"] = []
+                elif name == "t" and not state["phonetic"]:
+                    state["text"] = True
+                elif name == "rPh":
+                    # Фонетические подсказки не входят в значение ячейки
+                    state["phonetic"] = True
+
+            def end(name):
+                name = _local(name)
+                if name == "si":
+                    strings.append("".join(state["parts"]))
+                    state["parts"] = None
+                elif name == "t":
+                    state["text"] = False
+                elif name == "rPh":
+                    state["phonetic"] = False
+
+            def data(text):
+                if state["text"] and state["parts"] is not None:
+                    state["parts"].append(text)
+
+            parser.StartElementHandler = start
+            parser.EndElementHandler = end
+            parser.CharacterDataHandler = data
+            for _ in self._parse("xl/sharedStrings.xml", parser):
+                pass
+
+        self._shared_strings = strings
+        return strings
+
+    def date_styles(self) -> Set[int]:
+        """Индексы стилей ячеек (cellXfs) с форматом даты"""
+        if self._date_styles is not None:
+            return self._date_styles
+
+        styles: Set[int] = set()
+        if OPENPYXL_AVAILABLE and "xl/styles.xml" in self.archive.NameToInfo:
+            root = ET.fromstring(self.archive.read("xl/styles.xml"))
+            custom_formats = {
+                int(fmt.get("numFmtId")): fmt.get("formatCode", "")
+                for fmt in root.iter(f"{{{MAIN_NS}}}numFmt")
+            }
+            cell_xfs = root.find(f"{{{MAIN_NS}}}cellXfs")
+            for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+                format_id = int(xf.get("numFmtId", 0))
+                code = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id, "General"))
+                if is_date_format(code):
+                    styles.add(index)
+        self._date_styles = styles
+        return styles
+
+    # ==================== СТРОКИ ЛИСТА ====================
+
+    def iter_rows(self, sheet: str, columns: int, min_row: int = 1) -> Iterator[List[str]]:
+        """
+        Потоково читает строки листа
+
+        Args:
+            sheet: Название листа
+            columns: Количество колонок (лишние колонки отбрасываются, недостающие - пустые строки)
+            min_row: Номер первой читаемой строки (1 - заголовок)
+
+        Returns:
+            Генератор списков значений колонок
+        """
+        if sheet not in self._sheet_paths:
+            raise KeyError(f"Worksheet {sheet} does not exist.")
+        shared = self.shared_strings()
+        date_styles = self.date_styles()
+
+        parser = xml.parsers.expat.ParserCreate()
+        parser.buffer_text = True
+        ready: List[List[str]] = []
+        state = {
+            "row": None, "row_number": 0, "column": 0,
+            "type": "n", "style": 0, "text": None, "collect": False
+        }
+
+        def start(name, attrs):
+            if ":" in name:
+                name = _local(name)
+            if name == "c":
+                reference = attrs.get("r")
+                state["column"] = _column_index(reference) if reference else state["column"] + 1
+                state["type"] = attrs.get("t", "n")
+                state["style"] = int(attrs.get("s", 0))
+                state["text"] = []
+            elif name == "row":
+                number = attrs.get("r")
+                state["row_number"] = int(number) if number else state["row_number"] + 1
+                state["row"] = [""] * columns
+                state["column"] = -1
+            elif name in ("v", "t") and state["text"] is not None:
+                state["collect"] = True
+
+        def end(name):
+            if ":" in name:
+                name = _local(name)
+            if name in ("v", "t"):
+                state["collect"] = False
+            elif name == "c":
+                column = state["column"]
+                text = "".join(state["text"])
+                state["text"] = None
+                if not text or not 0 <= column < columns:
+                    return
+                cell_type = state["type"]
+                if cell_type == "s":
+                    value = shared[int(text)]
+                elif cell_type in ("inlineStr", "str", "e"):
+                    value = text
+                elif cell_type == "b":
+                    value = "True" if text == "1" else "False"
+                elif state["style"] in date_styles:
+                    value = str(from_excel(float(text)))
+                else:
+                    value = _number(text)
+                state["row"][column] = value
+            elif name == "row":
+                if state["row_number"] >= min_row:
+                    ready.append(state["row"])
+                state["row"] = None
+
+        def data(text):
+            if state["collect"]:
+                state["text"].append(text)
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = data
+
+        for _ in self._parse(self._sheet_paths[sheet], parser):
+            if ready:
+                yield from ready
+                ready.clear()
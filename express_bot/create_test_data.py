@@ -95,8 +95,13 @@ def create_test_data():
             adjusted_width = min(max_length + 2, 50)
             ws.column_dimensions[column_letter].width = adjusted_width
         
-        # Сохраняем файл
-        wb.save(excel_file)
+        # Сохраняем во временный файл, мастер-файл заменяет процесс-писатель
+        from excel_integration import ExcelIntegration
+        tmp_file = f"{excel_file}.test_data.tmp"
+        wb.save(tmp_file)
+        if not ExcelIntegration(data_dir="data").replace_master_file(tmp_file):
+            print(f"❌ Не удалось заменить файл: {excel_file}")
+            return False
         print(f"✅ Тестовые данные сохранены в {excel_file}")
         print(f"   Лист: {oke_name}")
         print(f"   Заявок: {len(test_data)}")
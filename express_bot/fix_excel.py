@@ -61,16 +61,20 @@ def fix_excel():
             for col, value in enumerate(data, 1):
                 ws.cell(row=row, column=col, value=value)
         
-        # Сохраняем
-        wb.save(excel_file)
+        # Сохраняем во временный файл, мастер-файл заменяет процесс-писатель
+        from excel_integration import ExcelIntegration
+        excel = ExcelIntegration(data_dir="data")
+        tmp_file = f"{excel_file}.fix.tmp"
+        wb.save(tmp_file)
+        if not excel.replace_master_file(tmp_file):
+            print(f"❌ Не удалось заменить файл: {excel_file}")
+            return False
         print(f"✅ Файл сохранен: {excel_file}")
         print(f"📊 Лист: ОКЭ 1")
         print(f"📋 Заявок: {len(test_data)}")
         
         # Проверяем через ExcelIntegration
         print("\n🔍 Проверка через ExcelIntegration...")
-        from excel_integration import ExcelIntegration
-        excel = ExcelIntegration(data_dir="data")
         
         apps = excel.read_applications('ОКЭ 1')
         print(f"📖 Прочитано заявок: {len(apps)}")
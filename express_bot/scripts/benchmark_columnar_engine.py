@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Сравнение выборок по спискам словарей и колоночного представления на pandas/NumPy
+
+Для каждого размера генерируются заявки, одни и те же операции (фильтр по ОКЭ, должности
+и периоду, группировка по направлению и месяцу, сортировка "новые сначала") выполняются
+построчно по словарям, как в обработчиках API, и векторно по колонкам; результаты сверяются.
+Отдельно измеряется запись заявки со сменой статуса и следующий за ней запрос: колоночное
+представление дополняется записью, а не пересобирается.
+
+Запуск: python scripts/benchmark_columnar_engine.py [--sizes 10000 100000] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from columnar_engine import PANDAS_AVAILABLE, ColumnarApplications  # noqa: E402
+from excel_integration import ALL_OKES, ID_COLUMN, STATUS_COLUMN  # noqa: E402
+
+DIRECTIONS = ["Москва", "Сочи", "Красноярск", "Владивосток", "Самара", "Хургада"]
+HEADERS = ["Время подачи заявки", "ФИО", "Табельный номер", "Должность", "Направление",
+           "Информация о рейсе", "ID заявки", "Статус"]
+POSITIONS = ["Бортпроводник", "Старший бортпроводник", "Инструктор", "КВС", "Второй пилот"]
+STATUSES = ["pending", "approved", "rejected"]
+
+OKES = ["ОКЭ 1", "ОКЭ Сочи"]
+POSITION = "бортпроводник"
+DATE_FROM = "2025-03-01"
+DATE_TO = "2025-08-31"
+
+def build_entry(i: int):
+    """Случайная заявка с номером i в формате кэша"""
+    submitted = datetime(2025, 1, 1) + timedelta(seconds=random.randrange(365 * 24 * 3600))
+    return (random.choice(ALL_OKES), [
+        submitted.strftime("%Y-%m-%d %H:%M:%S"),
+        f"Сотрудник {i} Тестович",
+        str(100000 + i),
+        random.choice(POSITIONS),
+        random.choice(DIRECTIONS),
+        f"{submitted.strftime('%Y-%m-%d')} SU{random.randint(1000, 9999)}",
+        str(i + 1),
+        random.choice(STATUSES)
+    ])
+
+def build_entries(rows: int):
+    """Заявки в формате кэша: пары (ОКЭ, значения колонок)"""
+    random.seed(rows)
+    return [build_entry(i) for i in range(rows)]
+
+def dict_query(applications):
+    """Построчный путь: цепочка проверок по словарям, группировка и сортировка в Python"""
+    date_from = datetime.strptime(DATE_FROM, "%Y-%m-%d")
+    date_to = datetime.strptime(DATE_TO, "%Y-%m-%d")
+    matched = []
+    for app in applications:
+        if app["oke"] not in OKES:
+            continue
+        if POSITION not in app["Должность"].lower():
+            continue
+        app_date = datetime.strptime(app["Время подачи заявки"].split()[0], "%Y-%m-%d")
+        if app_date < date_from or app_date > date_to:
+            continue
+        matched.append(app)
+    by_direction = {}
+    by_month = {}
+    for app in matched:
+        by_direction[app["Направление"]] = by_direction.get(app["Направление"], 0) + 1
+        month = app["Время подачи заявки"][:7]
+        by_month[month] = by_month.get(month, 0) + 1
+    matched.sort(key=lambda app: (app["Время подачи заявки"], int(app["ID заявки"])), reverse=True)
+    return [int(app["ID заявки"]) for app in matched], by_direction, by_month
+
+def columnar_query(columnar: ColumnarApplications, entries):
+    """Векторный путь: маска по кодам категорий и datetime64, группировка по кодам"""
+    mask = columnar.mask(OKES, DATE_FROM, DATE_TO, {"position": POSITION})
+    row_ids = columnar.select(mask, newest_first=True)
+    by_direction = columnar.group_counts("direction", mask)
+    by_month = columnar.group_counts("month", mask)
+    return [int(entries[row_id][1][ID_COLUMN]) for row_id in row_ids.tolist()], by_direction, by_month
+
+def write_then_query(columnar: ColumnarApplications, entries, applications):
+    """Запись заявки и смена статуса другой заявки, затем запрос обоими путями"""
+    entry = build_entry(len(entries))
+    entries.append(entry)
+    applications.append({**dict(zip(HEADERS, entry[1])), "oke": entry[0]})
+    columnar.append([entry])
+
+    row_id = random.randrange(len(entries))
+    status = random.choice(STATUSES)
+    entries[row_id][1][STATUS_COLUMN] = status
+    applications[row_id]["Статус"] = status
+    columnar.set_status(row_id, status)
+
+def measure(func, repeat: int) -> float:
+    """Лучшее время выполнения из нескольких запусков (секунды)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not PANDAS_AVAILABLE:
+        raise SystemExit("❌ pandas не установлен")
+
+    print(f"{'Строк':>8} | {'Построение, с':>13} | {'Словари, с':>10} | {'Колонки, с':>10} | {'Ускорение':>9} | "
+          f"{'Запись+запрос: словари, с':>25} | {'колонки, с':>10}")
+    print("-" * 104)
+    for size in args.sizes:
+        entries = build_entries(size)
+        applications = [{**dict(zip(HEADERS, row)), "oke": oke} for oke, row in entries]
+
+        build = measure(lambda: ColumnarApplications(entries, ID_COLUMN, STATUS_COLUMN), args.repeat)
+        columnar = ColumnarApplications(entries, ID_COLUMN, STATUS_COLUMN)
+        if dict_query(applications) != columnar_query(columnar, entries):
+            raise SystemExit(f"❌ Результаты выборок различаются для {size} строк")
+
+        slow = measure(lambda: dict_query(applications), args.repeat)
+        fast = measure(lambda: columnar_query(columnar, entries), args.repeat)
+
+        # Запись перед каждым запросом: колонки дополняются, а не строятся заново
+        slow_write = measure(lambda: (write_then_query(columnar, entries, applications),
+                                      dict_query(applications)), args.repeat)
+        fast_write = measure(lambda: (write_then_query(columnar, entries, applications),
+                                      columnar_query(columnar, entries)), args.repeat)
+        if dict_query(applications) != columnar_query(columnar, entries):
+            raise SystemExit(f"❌ Результаты выборок после записи различаются для {size} строк")
+        print(f"{size:>8} | {build:>13.3f} | {slow:>10.3f} | {fast:>10.3f} | {slow / fast:>8.1f}x | "
+              f"{slow_write:>25.3f} | {fast_write:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Сравнение скорости чтения мастер-файла: openpyxl (read_only) и потоковый читатель на expat
+
+Для каждого размера создается временный мастер-файл, заявки читаются обоими способами,
+результаты сверяются. Бинарный снимок при замерах не используется.
+
+Запуск: python scripts/benchmark_excel_reader.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from openpyxl import Workbook  # noqa: E402
+
+from excel_integration import ALL_OKES, ExcelIntegration, _stat_signature  # noqa: E402
+
+DIRECTIONS = ["Москва - Сочи", "Сочи - Москва", "Москва - Красноярск", "Красноярск - Москва"]
+POSITIONS = ["Бортпроводник", "Старший бортпроводник", "Инструктор"]
+
+def build_master_file(path: str, rows: int, headers):
+    """Создает мастер-файл с заявками, равномерно распределенными по листам ОКЭ"""
+    random.seed(rows)
+    wb = Workbook(write_only=True)
+    sheets = {oke: wb.create_sheet(oke) for oke in ALL_OKES}
+    for sheet in sheets.values():
+        sheet.append(headers)
+    start = datetime(2025, 1, 1)
+    for i in range(rows):
+        oke = ALL_OKES[i % len(ALL_OKES)]
+        submitted = start + timedelta(minutes=17 * i)
+        sheets[oke].append([
+            submitted.strftime("%d.%m.%Y %H:%M"),
+            f"Сотрудник {i} Тестович",
+            str(100000 + i),
+            random.choice(POSITIONS),
+            random.choice(DIRECTIONS),
+            f"Рейс SU{random.randint(1000, 9999)} {submitted.strftime('%d.%m.%Y')}"
+        ])
+    wb.save(path)
+
+def measure(func, repeat: int) -> float:
+    """Лучшее время выполнения из нескольких запусков (секунды)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Строк':>8} | {'openpyxl, с':>12} | {'expat, с':>10} | {'Ускорение':>9}")
+    print("-" * 49)
+    with tempfile.TemporaryDirectory() as data_dir:
+        excel = ExcelIntegration(data_dir=data_dir)
+        for size in args.sizes:
+            build_master_file(excel.master_file_path, size, excel.headers)
+            source = _stat_signature(excel.master_file_path)
+
+            expected = excel._parse_workbook_openpyxl(source)
+            actual = excel._parse_workbook_fast(source)
+            if expected != actual:
+                raise SystemExit(f"❌ Результаты чтения различаются для {size} строк")
+
+            slow = measure(lambda: excel._parse_workbook_openpyxl(source), args.repeat)
+            fast = measure(lambda: excel._parse_workbook_fast(source), args.repeat)
+            print(f"{size:>8} | {slow:>12.3f} | {fast:>10.3f} | {slow / fast:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
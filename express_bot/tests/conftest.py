@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Общие настройки тестов
+Модули backend импортируются по имени, как в приложении; все файлы данных создаются во временных директориях
+"""
+
+import os
+import sys
+
+# Отложенная выгрузка мастер-файла из хранилища не нужна тестам и оставляет фоновые таймеры
+os.environ.setdefault("MASTER_EXPORT_DELAY", "0")
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
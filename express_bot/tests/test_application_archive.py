@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Тесты переноса заявок закрытых периодов в архив: пересылка писателю и двухфазная фиксация
+"""
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import excel_integration as excel_module
+from excel_integration import ExcelIntegration
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(excel_module.__file__))
+
+# Другой процесс (например, admin_server.py) становится писателем мастер-файла и ждет закрытия stdin
+WRITER_SCRIPT = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+from excel_integration import ExcelIntegration
+excel = ExcelIntegration(data_dir=sys.argv[2], write_mode="direct")
+while not excel.coordinator.is_writer():
+    time.sleep(0.01)
+print("ready", flush=True)
+sys.stdin.read()
+excel.coordinator.close()
+"""
+
+PERIOD_2025 = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                              end_date=datetime(2025, 12, 31, 23, 59, 59))
+
+
+def _records():
+    return [
+        {"oke": "ОКЭ 1", "fio": "Старый 1", "submitted_at": "2025-03-01 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Старый 2", "submitted_at": "2025-11-01 10:00:00"},
+        {"oke": "ОКЭ 1", "fio": "Новый", "submitted_at": "2026-03-01 10:00:00"},
+    ]
+
+
+def _names(excel: ExcelIntegration, include_archive: bool = False):
+    return sorted(application["ФИО"] for application in excel.iter_all_applications(include_archive=include_archive))
+
+
+def test_archive_runs_when_another_process_is_writer(tmp_path):
+    data_dir = str(tmp_path)
+    writer = subprocess.Popen([sys.executable, "-c", WRITER_SCRIPT, BACKEND_DIR, data_dir],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                              env={**os.environ, "MASTER_EXPORT_DELAY": "0"})
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+
+        excel = ExcelIntegration(data_dir=data_dir, write_mode="direct")
+        assert not excel.coordinator.is_writer()
+        assert excel.add_applications_bulk(_records())["added"] == 3
+
+        result = excel.archive_closed_periods([PERIOD_2025])
+
+        assert not excel.coordinator.is_writer()
+        assert result["archived"] == 2
+        assert [segment["id"] for segment in excel.get_archive_segments()] == result["segments"]
+        assert _names(excel) == ["Новый"]
+        assert _names(excel, include_archive=True) == ["Новый", "Старый 1", "Старый 2"]
+    finally:
+        if writer.poll() is None:
+            writer.stdin.close()
+            try:
+                writer.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                writer.kill()
+                writer.wait()
+
+
+@pytest.mark.parametrize("store_backend", ["excel", "sqlite"])
+def test_interrupted_archive_is_finished_on_next_run(tmp_path, monkeypatch, store_backend):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend=store_backend)
+    excel.add_applications_bulk(_records())
+
+    # Сбой после записи сегмента, до удаления строк из рабочего источника
+    original = ExcelIntegration._remove_archived_rows
+    monkeypatch.setattr(ExcelIntegration, "_remove_archived_rows",
+                        lambda self, ids: (_ for _ in ()).throw(OSError("сбой")))
+    with pytest.raises(OSError):
+        excel.archive_closed_periods([PERIOD_2025])
+
+    # Незавершенный сегмент не виден: заявки остаются в рабочем источнике и не дублируются
+    assert excel.get_archive_segments() == []
+    assert _names(excel, include_archive=True) == ["Новый", "Старый 1", "Старый 2"]
+
+    monkeypatch.setattr(ExcelIntegration, "_remove_archived_rows", original)
+    result = excel.archive_closed_periods([PERIOD_2025])
+
+    # Сегмент прерванного переноса зафиксирован, повторно заявки не переносятся
+    assert result == {"archived": 0, "segments": []}
+    assert len(excel.get_archive_segments()) == 1
+    assert _names(excel) == ["Новый"]
+    assert _names(excel, include_archive=True) == ["Новый", "Старый 1", "Старый 2"]
+
+
+def test_open_periods_are_not_archived(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="sqlite")
+    excel.add_applications_bulk(_records())
+
+    result = excel.archive_closed_periods([PERIOD_2025], now=datetime(2025, 6, 1))
+
+    assert result == {"archived": 0, "segments": []}
+    assert _names(excel) == ["Новый", "Старый 1", "Старый 2"]
+
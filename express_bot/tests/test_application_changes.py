@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Тесты ленты изменений заявок: номера без пропусков, хвост ленты и запись вместе с данными
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from application_changes import ApplicationChangeFeed
+from excel_integration import ExcelIntegration
+
+
+def _change(app_id: int):
+    return {"op": "insert", "id": app_id, "oke": "ОКЭ 1", "row": [str(app_id)]}
+
+
+def test_sequence_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "changes.jsonl")
+    first, second = ApplicationChangeFeed(path), ApplicationChangeFeed(path)
+
+    assert first.append([_change(1), _change(2)]) == 2
+    # Второй экземпляр (другой процесс) продолжает нумерацию по файлу
+    assert second.append([_change(3)]) == 3
+
+    records, last_seq, reset = first.changes_since(1)
+    assert [record["id"] for record in records] == [2, 3]
+    assert (last_seq, reset) == (3, False)
+    assert ApplicationChangeFeed(path).changes_since(0, limit=2)[0][-1]["seq"] == 2
+
+
+def test_tail_is_trimmed_and_old_consumers_are_reset(tmp_path):
+    path = str(tmp_path / "changes.jsonl")
+    feed = ApplicationChangeFeed(path, retain=3)
+    for app_id in range(1, 11):
+        feed.append([_change(app_id)])
+
+    records, last_seq, reset = feed.changes_since(8)
+    assert [record["seq"] for record in records] == [9, 10]
+    assert not reset
+    assert feed.changes_since(0) == ([], 10, True)
+    assert feed.changes_since(11) == ([], 10, True)
+    assert feed.changes_since(10) == ([], 10, False)
+
+    reopened = ApplicationChangeFeed(path, retain=3)
+    assert reopened.last_seq() == 10
+    with open(path, "rb") as f:
+        assert len(f.read().splitlines()) <= 6
+
+
+def test_failed_write_records_nothing(tmp_path):
+    feed = ApplicationChangeFeed(str(tmp_path / "changes.jsonl"))
+    with pytest.raises(OSError):
+        with feed.recording() as changes:
+            changes.append(_change(1))
+            raise OSError("сбой записи данных")
+
+    with feed.recording() as changes:
+        changes.append(_change(2))
+
+    records, _, _ = feed.changes_since(0)
+    assert [(record["seq"], record["id"]) for record in records] == [(1, 2)]
+
+
+@pytest.mark.parametrize("store_backend,write_mode", [
+    ("excel", "direct"), ("excel", "journal"), ("excel", "group_commit"), ("sqlite", "direct"),
+])
+def test_writes_produce_contiguous_changes(tmp_path, store_backend, write_mode):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode=write_mode, store_backend=store_backend,
+                             batch_window=0.01)
+    since = excel.get_changes_seq()
+    assert excel.add_application("ОКЭ 1", "Иванов", "1", "КВС", "Сочи", "")
+    excel.add_applications_bulk([{"oke": "ОКЭ 2", "fio": "Петров", "submitted_at": "2025-05-01 10:00:00"}])
+    assert excel.update_application_statuses({1: "approved"})["updated"] == [1]
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+
+    result = excel.get_changes(since)
+
+    assert [(change["op"], change["id"]) for change in result["changes"]] == [
+        ("insert", 1), ("insert", 2), ("update", 1), ("delete", 2)]
+    assert [change["seq"] for change in result["changes"]] == list(range(since + 1, since + 5))
+    assert result["changes"][2]["application"]["Статус"] == "approved"
+    assert result["changes"][2]["application"]["ФИО"] == "Иванов"
+    assert result["last_seq"] == excel.get_changes_seq()
+
+
+def test_failed_store_write_keeps_feed_contiguous(tmp_path, monkeypatch):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    assert excel.add_application("ОКЭ 1", "Иванов", "1", "КВС", "Сочи", "")
+
+    original = type(excel.store).add
+    monkeypatch.setattr(type(excel.store), "add", lambda self, oke, row: (_ for _ in ()).throw(OSError("сбой")))
+    assert not excel.add_application("ОКЭ 1", "Петров", "2", "КВС", "Сочи", "")
+    monkeypatch.setattr(type(excel.store), "add", original)
+    assert excel.add_application("ОКЭ 1", "Сидоров", "3", "КВС", "Сочи", "")
+
+    changes = excel.get_changes(0)["changes"]
+    assert [(change["seq"], change["application"]["ФИО"]) for change in changes] == [(1, "Иванов"), (2, "Сидоров")]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Тесты стабильных идентификаторов заявок: перенос из Excel и смена статусов на месте
+"""
+
+import pytest
+from openpyxl import load_workbook
+
+from excel_integration import ExcelIntegration
+from xlsx_appender import RowUpdates, append_rows
+
+ID_INDEX = 6
+STATUS_INDEX = 7
+
+
+def _row(number: int, app_id, status: str = "pending"):
+    return [f"2026-03-{number:02d} 10:00:00", f"Заявитель {number}", str(number), "КВС", "Сочи", "",
+            app_id, status]
+
+
+def _ids(excel: ExcelIntegration):
+    return {application["ФИО"]: (application["ID заявки"], application["Статус"])
+            for application in excel.iter_all_applications()}
+
+
+@pytest.mark.parametrize("store_backend", ["sqlite", "partitioned"])
+def test_migration_keeps_workbook_ids(tmp_path, store_backend):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    wb = load_workbook(excel.master_file_path)
+    wb["ОКЭ 2"].append(_row(1, 9, "approved"))
+    wb["ОКЭ 1"].append(_row(2, 5))
+    wb["ОКЭ 1"].append(_row(3, 2, "rejected"))
+    # Повтор идентификатора и строка без него получают новые id
+    wb["ОКЭ 3"].append(_row(4, 5))
+    wb["ОКЭ 3"].append(_row(5, None))
+    wb.save(excel.master_file_path)
+
+    migrated = ExcelIntegration(data_dir=str(tmp_path), store_backend=store_backend)
+
+    assert _ids(migrated) == {
+        "Заявитель 1": ("9", "approved"), "Заявитель 2": ("5", "pending"), "Заявитель 3": ("2", "rejected"),
+        "Заявитель 4": ("10", "pending"), "Заявитель 5": ("11", "pending"),
+    }
+    assert migrated.add_application("ОКЭ 1", "Новый", "6", "БП", "Москва", "")
+    assert _ids(migrated)["Новый"] == ("12", "pending")
+    assert migrated.update_application_statuses({9: "completed", 5: "approved"})["updated"] == [9, 5]
+    assert _ids(migrated)["Заявитель 1"] == ("9", "completed")
+    assert _ids(migrated)["Заявитель 4"] == ("10", "pending")
+
+
+def test_row_updates_change_status_cells(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    wb = load_workbook(excel.master_file_path)
+    wb["ОКЭ 1"].append(_row(1, 1))
+    wb["ОКЭ 1"].append(_row(2, 2))
+    wb.save(excel.master_file_path)
+    dst = str(tmp_path / "updated.xlsx")
+    updates = RowUpdates(ID_INDEX, STATUS_INDEX, {"ОКЭ 1": {"2": "approved", "3": "rejected"}})
+
+    append_rows(excel.master_file_path, dst, [("ОКЭ 1", _row(3, "3"))], len(excel.headers), updates=updates)
+
+    wb = load_workbook(dst)
+    rows = {str(row[ID_INDEX]): row[STATUS_INDEX] for row in wb["ОКЭ 1"].iter_rows(min_row=2, values_only=True)}
+    wb.close()
+    assert rows == {"1": "pending", "2": "approved", "3": "rejected"}
+
+
+@pytest.mark.parametrize("write_mode", ["journal", "direct"])
+def test_status_updates_keep_ids_and_survive_restart(tmp_path, write_mode):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode=write_mode, store_backend="excel")
+    for number in range(3):
+        assert excel.add_application("ОКЭ 1", f"Заявитель {number}", str(number), "КВС", "Сочи", "")
+
+    result = excel.update_application_statuses({2: "approved", 99: "approved", 3: "unknown"})
+
+    assert result["updated"] == [2]
+    assert result["not_found"] == [99]
+    assert result["invalid"] == [{"id": 3, "status": "unknown"}]
+    if write_mode == "journal":
+        excel.compact_journal()
+
+    wb = load_workbook(excel.master_file_path)
+    rows = [list(row) for row in wb["ОКЭ 1"].iter_rows(min_row=2, values_only=True)]
+    wb.close()
+    assert [(str(row[ID_INDEX]), row[STATUS_INDEX]) for row in rows] == [
+        ("1", "pending"), ("2", "approved"), ("3", "pending")]
+    assert _ids(excel)["Заявитель 1"] == ("2", "approved")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Тесты индексов заявок в памяти: счетчики и свертки обновляются при записи без перечитывания мастер-файла
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from openpyxl import load_workbook
+
+from application_index import FACET_FIELDS, ApplicationCounters, ApplicationFacets, ApplicationRollups
+from excel_integration import ExcelIntegration
+
+
+def _row(submitted_at: str, position: str = "КВС", direction: str = "Сочи"):
+    return [submitted_at, "Заявитель", "1", position, direction, "", "1", "pending"]
+
+
+def test_counters_add_remove_and_rebuild():
+    counters = ApplicationCounters()
+    counters.add("ОКЭ 1", "2026-03-01 10:00:00")
+    counters.add("ОКЭ 1", "2026-03-02 10:00:00")
+    counters.add("ОКЭ 2", "не дата")
+
+    assert counters.count() == 3
+    assert counters.count("ОКЭ 1") == 2
+    snapshot = counters.snapshot()
+    assert snapshot["by_day"] == {"2026-03-01": 1, "2026-03-02": 1}
+    assert snapshot["by_month"] == {"2026-03": 2}
+
+    counters.remove("ОКЭ 1", "2026-03-01 10:00:00")
+    assert counters.snapshot()["by_day"] == {"2026-03-02": 1}
+
+    counters.rebuild([("ОКЭ 3", _row("2026-04-01 10:00:00"))])
+    assert counters.snapshot() == {"total": 1, "by_oke": {"ОКЭ 3": 1},
+                                   "by_day": {"2026-04-01": 1}, "by_month": {"2026-04": 1}}
+
+
+def test_counts_follow_local_writes_without_rereading(tmp_path, monkeypatch):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    assert excel.get_applications_count("ОКЭ 1") == 0
+
+    parses = []
+    original = ExcelIntegration._parse_workbook
+    monkeypatch.setattr(ExcelIntegration, "_parse_workbook",
+                        lambda self, source: parses.append(source) or original(self, source))
+
+    for number in range(3):
+        assert excel.add_application("ОКЭ 1", f"Заявитель {number}", str(number), "КВС", "Сочи", "")
+    assert excel.get_applications_count("ОКЭ 1") == 3
+    assert excel.get_statistics()["total_applications"] == 3
+    assert parses == []
+
+
+def test_counts_refresh_after_external_change(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    assert excel.add_application("ОКЭ 1", "Заявитель", "1", "КВС", "Сочи", "")
+    assert excel.get_applications_count("ОКЭ 2") == 0
+
+    # Файл изменен в обход ExcelIntegration (например, другим процессом)
+    wb = load_workbook(excel.master_file_path)
+    wb["ОКЭ 2"].append(["2026-03-01 10:00:00", "Внешний", "2", "БП", "Москва", "", "100", "pending"])
+    wb.save(excel.master_file_path)
+
+    assert excel.get_applications_count("ОКЭ 2") == 1
+    assert excel.get_counts_by_month()["2026-03"] == 1
+
+
+def test_rollups_group_and_summarize():
+    rollups = ApplicationRollups()
+    rollups.add("ОКЭ 1", _row("2026-03-02 10:00:00"))
+    rollups.add("ОКЭ 1", _row("2026-03-04 10:00:00", direction="Москва"))
+    rollups.add("ОКЭ 2", _row("2026-03-04 12:00:00", position="БП"))
+    rollups.add("ОКЭ 2", _row("2026-02-27 12:00:00", direction="Москва"))
+    rollups.add("ОКЭ 2", _row("не дата", direction=""))
+    rollups.remove("ОКЭ 2", _row("2026-02-27 12:00:00", direction="Москва"))
+
+    assert rollups.group("day") == {"2026-03-02": 1, "2026-03-04": 2, "": 1}
+    assert rollups.group("direction", "2026-03-03", "2026-03-31") == {"Москва": 1, "Сочи": 1}
+    assert rollups.group("position", oke="ОКЭ 2") == {"БП": 1, "КВС": 1}
+
+    archived = ApplicationRollups()
+    archived.add_cells([(("2026-03-03", "ОКЭ 3", "Москва", "КВС"), 2)])
+    # Среда 4 марта: неделя с понедельника 2 марта, месяц с 1 марта
+    summary = ApplicationRollups.summarize([rollups, archived], today=date(2026, 3, 4), top_directions=1)
+    assert summary["applications"] == {"total": 6, "today": 2, "this_week": 5, "this_month": 5}
+    assert summary["popular_directions"] == [{"name": "Москва", "count": 3}]
+
+
+@pytest.mark.parametrize("store_backend", ["excel", "sqlite"])
+def test_rollups_follow_writes_and_archive(tmp_path, store_backend):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend=store_backend)
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Иванов", "position": "КВС", "direction": "Сочи",
+         "submitted_at": "2025-06-01 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Петров", "position": "БП", "direction": "Москва",
+         "submitted_at": "2026-03-04 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Сидоров", "position": "БП", "direction": "Сочи",
+         "submitted_at": "2026-03-02 10:00:00"},
+    ])
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+
+    # Архивные заявки учитываются по сводке сегмента
+    expected: dict = {}
+    for application in excel.iter_all_applications(include_archive=True):
+        expected[application["Направление"]] = expected.get(application["Направление"], 0) + 1
+    assert excel.get_rollup_groups("direction") == expected == {"Сочи": 2, "Москва": 1}
+    assert excel.get_rollup_groups("oke", date_from="2026-01-01") == {"ОКЭ 2": 2}
+
+    summary = excel.get_rollup_statistics(today=date(2026, 3, 4))
+    assert summary["applications"] == {"total": 3, "today": 1, "this_week": 2, "this_month": 2}
+    assert summary["popular_directions"][0] == {"name": "Сочи", "count": 2}
+
+
+def _facets_by_scan(excel: ExcelIntegration):
+    expected = {field: {} for field in FACET_FIELDS}
+    for application in excel.iter_all_applications():
+        row = [application[header] for header in excel.headers]
+        for field, value in zip(FACET_FIELDS, ApplicationFacets.key_of(application["oke"], row)):
+            if value:
+                expected[field][value] = expected[field].get(value, 0) + 1
+    return expected
+
+
+def test_facets_change_status_and_drop_empty_values():
+    facets = ApplicationFacets()
+    facets.add("ОКЭ 1", _row("2026-03-01 10:00:00"))
+    facets.add("ОКЭ 2", _row("не дата", position="", direction="Москва"))
+
+    facets.change_status("pending", "approved")
+    facets.remove("ОКЭ 2", _row("не дата", position="", direction="Москва"))
+
+    assert facets.snapshot() == {"oke": {"ОКЭ 1": 1}, "position": {"КВС": 1}, "direction": {"Сочи": 1},
+                                 "month": {"2026-03": 1}, "status": {"approved": 1}}
+
+
+@pytest.mark.parametrize("store_backend", ["excel", "sqlite"])
+def test_filter_options_follow_writes(tmp_path, store_backend):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="journal", store_backend=store_backend)
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Иванов", "position": "КВС", "direction": "Сочи",
+         "submitted_at": "2025-06-01 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Петров", "position": "БП", "direction": "Москва",
+         "submitted_at": "2026-03-04 10:00:00"},
+    ])
+    assert excel.get_filter_options() == _facets_by_scan(excel)
+
+    assert excel.add_application("ОКЭ 2", "Сидоров", "3", "БП", "Сочи", "")
+    assert excel.update_application_statuses({2: "approved"})["updated"] == [2]
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+
+    options = excel.get_filter_options()
+    assert options["status"] == {"approved": 1, "pending": 1}
+    assert options["oke"] == {"ОКЭ 2": 2}
+    assert "2025-06" not in options["month"]
+    assert options == _facets_by_scan(excel)
+
+
+def test_filter_options_are_updated_without_rebuild(tmp_path, monkeypatch):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    assert excel.add_application("ОКЭ 1", "Иванов", "1", "КВС", "Сочи", "")
+    assert excel.get_filter_options()["oke"] == {"ОКЭ 1": 1}
+
+    rebuilds = []
+    monkeypatch.setattr(ApplicationFacets, "rebuild", lambda self, rows: rebuilds.append(self))
+    assert excel.add_application("ОКЭ 2", "Петров", "2", "БП", "Москва", "")
+    assert excel.update_application_statuses({1: "rejected"})["updated"] == [1]
+
+    options = excel.get_filter_options()
+    assert options["oke"] == {"ОКЭ 1": 1, "ОКЭ 2": 1}
+    assert options["status"] == {"pending": 1, "rejected": 1}
+    assert rebuilds == []
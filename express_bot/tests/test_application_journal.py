@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Тесты журнала заявок: восстановление после сбоя и компактация во время записи
+"""
+
+import threading
+import time
+
+from openpyxl import load_workbook
+
+from application_journal import ApplicationJournal
+from excel_integration import ID_COLUMN, ExcelIntegration
+
+
+class _Crash(BaseException):
+    """Аварийное завершение процесса: не перехватывается обработчиками Exception"""
+
+
+class _Master:
+    """Мастер-файл в памяти: строки и поколение последней компактации"""
+
+    def __init__(self):
+        self.rows = []
+        self.generation = None
+
+    def fold(self, entries, statuses, generation):
+        self.rows.extend(row for _, row in entries)
+        self.generation = generation
+
+    def get_generation(self):
+        return self.generation
+
+
+def _row(number: int):
+    return [f"2026-01-01 10:00:{number:02d}", f"Заявитель {number}", str(number), "КВС", "Сочи", "",
+            str(number), "pending"]
+
+
+def _open_journal(tmp_path) -> ApplicationJournal:
+    # Новый экземпляр - как журнал, открытый перезапущенным процессом
+    return ApplicationJournal(str(tmp_path / "applications_journal.jsonl"))
+
+
+def test_crash_before_master_saved_replays_all_entries(tmp_path):
+    journal = _open_journal(tmp_path)
+    journal.append("ОКЭ 1", _row(1))
+    journal.append("ОКЭ 2", _row(2))
+    master = _Master()
+
+    def crash(entries, statuses, generation):
+        raise _Crash()
+
+    try:
+        journal.compact(crash, master.get_generation)
+    except _Crash:
+        pass
+
+    restarted = _open_journal(tmp_path)
+    entries, _ = restarted.read_pending(master.generation)
+    assert [row for _, row in entries] == [_row(1), _row(2)]
+
+    assert restarted.compact(master.fold, master.get_generation) == 2
+    assert master.rows == [_row(1), _row(2)]
+    assert restarted.read_pending(master.generation) == ([], [])
+
+
+def test_crash_after_master_saved_does_not_duplicate(tmp_path):
+    journal = _open_journal(tmp_path)
+    journal.append("ОКЭ 1", _row(1))
+    journal.append_statuses([("ОКЭ 1", 1, "approved")])
+    master = _Master()
+
+    def fold_then_crash(entries, statuses, generation):
+        master.fold(entries, statuses, generation)
+        raise _Crash()
+
+    try:
+        journal.compact(fold_then_crash, master.get_generation)
+    except _Crash:
+        pass
+
+    restarted = _open_journal(tmp_path)
+    # Мастер-файл уже содержит компактацию, журнал еще не обрезан
+    assert restarted.read_pending(master.generation) == ([], [])
+
+    restarted.append("ОКЭ 1", _row(2))
+    assert restarted.compact(master.fold, master.get_generation) == 1
+    assert master.rows == [_row(1), _row(2)]
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    journal = _open_journal(tmp_path)
+    journal.append("ОКЭ 1", _row(1))
+    with open(journal.journal_path, "ab") as f:
+        f.write('{"oke": "ОКЭ 1", "row": ["2026'.encode("utf-8"))
+
+    restarted = _open_journal(tmp_path)
+    entries, _ = restarted.read_pending()
+    assert [row for _, row in entries] == [_row(1)]
+
+    restarted.append("ОКЭ 1", _row(2))
+    entries, _ = restarted.read_pending()
+    assert [row for _, row in entries] == [_row(1), _row(2)]
+
+
+def test_compaction_racing_with_appends_loses_nothing(tmp_path):
+    master = _Master()
+    writers, per_writer = 4, 100
+    done = threading.Event()
+
+    def write(writer: int):
+        # Отдельный экземпляр журнала на поток - как запись из разных процессов
+        journal = _open_journal(tmp_path)
+        for number in range(per_writer):
+            journal.append(f"ОКЭ {writer}", _row(number))
+
+    def compact():
+        journal = _open_journal(tmp_path)
+        while not done.is_set():
+            journal.compact(master.fold, master.get_generation)
+            time.sleep(0.001)
+
+    compactor = threading.Thread(target=compact)
+    compactor.start()
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    compactor.join()
+    _open_journal(tmp_path).compact(master.fold, master.get_generation)
+
+    assert len(master.rows) == writers * per_writer
+    assert _open_journal(tmp_path).read_pending(master.generation) == ([], [])
+
+
+def test_master_file_compaction_racing_with_applications(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="journal", store_backend="excel",
+                             compact_interval=0.05)
+    deadline = time.monotonic() + 10
+    while not excel.coordinator.is_writer() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert excel.coordinator.is_writer()
+
+    writers, per_writer = 3, 40
+
+    def write(writer: int):
+        for number in range(per_writer):
+            assert excel.add_application(f"ОКЭ {writer + 1}", f"Заявитель {writer}-{number}", str(number),
+                                         "КВС", "Сочи", "")
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(5):
+            excel.compact_journal()
+        for thread in threads:
+            thread.join()
+        excel.compact_journal()
+    finally:
+        excel.journal.stop_compactor()
+
+    wb = load_workbook(excel.master_file_path, read_only=True)
+    try:
+        ids = [row[ID_COLUMN] for ws in wb.worksheets for row in ws.iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+    assert len(ids) == writers * per_writer
+    assert len(set(ids)) == len(ids)
+    assert excel.get_statistics()["total_applications"] == writers * per_writer
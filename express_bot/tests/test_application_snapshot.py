@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Тесты бинарного снимка заявок: формат файла и загрузка без разбора XLSX
+"""
+
+import application_dataset
+from application_snapshot import WorkbookSnapshot, read_snapshot, write_snapshot
+from excel_integration import ExcelIntegration
+
+
+def _snapshot(source=(1, 2, 3)):
+    return WorkbookSnapshot(
+        source=list(source),
+        generation="gen-1",
+        sheetnames=["ОКЭ 1", "ОКЭ 2"],
+        rows={
+            "ОКЭ 1": [["2026-03-01 10:00:00", "Иванов", "1", "КВС", "Сочи", "", "1", "pending"],
+                      ["2026-03-02 10:00:00", "Петров", "2", "БП", "", "рейс", "2", "approved"]],
+            "ОКЭ 2": [],
+        },
+    )
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, _snapshot(), 8)
+
+    loaded = read_snapshot(path, [1, 2, 3])
+
+    assert loaded == _snapshot()
+    assert read_snapshot(path) == _snapshot()
+
+
+def test_stale_missing_and_corrupt_snapshots_are_skipped(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    assert read_snapshot(path) is None
+
+    write_snapshot(path, _snapshot(), 8)
+    assert read_snapshot(path, [1, 2, 4]) is None
+
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-5])
+    assert read_snapshot(path) is None
+
+    with open(path, "wb") as f:
+        f.write(data + b"x")
+    assert read_snapshot(path) is None
+
+    with open(path, "wb") as f:
+        f.write(b"NOTASNAP" + data[8:])
+    assert read_snapshot(path) is None
+
+
+def test_cold_start_loads_snapshot_without_parsing(tmp_path, monkeypatch):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    assert excel.add_application("ОКЭ 1", "Иванов", "1", "КВС", "Сочи", "")
+    assert excel.add_application("ОКЭ 2", "Петров", "2", "БП", "Москва", "")
+    expected = [(app["oke"], app["ФИО"], app["ID заявки"]) for app in excel.iter_all_applications()]
+    assert len(expected) == 2
+
+    # Первый запуск после записи разбирает XLSX и обновляет снимок
+    monkeypatch.setattr(application_dataset, "_datasets", {})
+    first = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    assert first.get_applications_count("ОКЭ 1") == 1
+
+    # Следующий запуск: мастер-файл не менялся с момента снимка
+    monkeypatch.setattr(application_dataset, "_datasets", {})
+    parses = []
+    monkeypatch.setattr(ExcelIntegration, "_parse_workbook",
+                        lambda self, source: parses.append(source))
+
+    restarted = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    loaded = [(app["oke"], app["ФИО"], app["ID заявки"]) for app in restarted.iter_all_applications()]
+
+    assert loaded == expected
+    assert parses == []
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища заявок SQLite и работы ExcelIntegration поверх хранилища
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from openpyxl import load_workbook
+
+from application_store import SQLiteApplicationStore
+from excel_integration import ExcelIntegration, _DeferredExport
+
+
+def _row(number: int, day: int = 1, direction: str = "Сочи"):
+    return [f"2026-03-{day:02d} 10:00:{number % 60:02d}", f"Заявитель {number}", str(number), "КВС", direction, ""]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteApplicationStore(str(tmp_path / "applications.db"))
+    yield store
+    store.close()
+
+
+def test_ids_are_consecutive_and_fingerprint_counts_additions(store):
+    assert store.add("ОКЭ 1", _row(1)) == 1
+    assert store.add_many([("ОКЭ 2", _row(2)), ("ОКЭ 1", _row(3))]) == [2, 3]
+    assert store.fingerprint() == 3
+    assert store.count() == 3
+    assert store.counts_by_oke() == {"ОКЭ 1": 2, "ОКЭ 2": 1}
+
+    rows = list(store.iter_applications())
+    assert [row[6] for _, row in rows] == ["1", "2", "3"]
+    assert all(row[7] == "pending" for _, row in rows)
+
+
+def test_filters(store):
+    store.add_many([
+        ("ОКЭ 1", _row(1, day=1)),
+        ("ОКЭ 1", _row(2, day=15, direction="Москва")),
+        ("ОКЭ 2", _row(3, day=31)),
+    ])
+
+    def ids(**filters):
+        return [int(row[6]) for _, row in store.iter_applications(**filters)]
+
+    assert ids(oke="ОКЭ 1") == [1, 2]
+    # Граница периода включает весь последний день
+    assert ids(date_from="2026-03-15", date_to="2026-03-31") == [2, 3]
+    assert ids(direction="Москва") == [2]
+    assert ids(tab_num="3") == [3]
+
+
+def test_status_and_remove_bump_revision(store):
+    store.add_many([("ОКЭ 1", _row(number)) for number in range(1, 4)])
+
+    assert store.update_statuses({2: "approved", 99: "approved"}) == ([2], 1)
+    assert store.remove([1, 99]) == ([1], 2)
+    assert store.remove([99]) == ([], 2)
+    assert [(row[6], row[7]) for _, row in store.iter_applications()] == [("2", "approved"), ("3", "pending")]
+    # Удаленный идентификатор не выдается повторно
+    assert store.add("ОКЭ 1", _row(4)) == 4
+
+
+def test_database_uses_wal(store):
+    store.add("ОКЭ 1", _row(1))
+    conn = sqlite3.connect(store.db_path)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+
+def test_concurrent_writers_get_unique_ids(store):
+    ids = []
+    lock = threading.Lock()
+
+    def write(writer: int):
+        for number in range(25):
+            app_id = store.add(f"ОКЭ {writer}", _row(number))
+            with lock:
+                ids.append(app_id)
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ids) == list(range(1, 101))
+    assert store.count() == 100
+
+
+def test_migration_runs_once(store):
+    assert not store.is_migrated()
+    assert store.migrate([("ОКЭ 1", _row(1)), ("ОКЭ 2", _row(2))]) == 2
+    assert store.is_migrated()
+    assert store.migrate([("ОКЭ 1", _row(3))]) == 0
+    assert store.count() == 2
+
+
+def test_integration_reads_and_exports_store(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    assert excel.add_application("ОКЭ 1", "Иванов И.И.", "1", "КВС", "Сочи", "")
+    assert excel.add_application("ОКЭ 2", "Петров П.П.", "2", "БП", "Москва", "")
+    app_id = int(next(iter(excel.iter_applications("ОКЭ 2")))["ID заявки"])
+    assert excel.update_application_statuses({app_id: "approved"})["updated"] == [app_id]
+
+    stats = excel.get_statistics()
+    assert stats["total_applications"] == 2
+    assert stats["by_oke"]["ОКЭ 1"] == 1
+
+    assert excel.export_master_file() == excel.master_file_path
+    wb = load_workbook(excel.master_file_path, read_only=True)
+    try:
+        rows = list(wb["ОКЭ 2"].iter_rows(min_row=2, values_only=True))
+    finally:
+        wb.close()
+    assert [(row[1], row[7]) for row in rows] == [("Петров П.П.", "approved")]
+
+
+def test_deferred_export_coalesces_writes():
+    exports = []
+    export = _DeferredExport(lambda: exports.append(time.monotonic()), delay=0.2)
+    for _ in range(5):
+        export.schedule()
+    time.sleep(0.6)
+    assert len(exports) == 1
+
+    export.schedule()
+    time.sleep(0.6)
+    assert len(exports) == 2
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тесты массовой загрузки: разбор потоков и запись пакетами с отчетом об ошибках
+"""
+
+import pytest
+
+from bulk_import import iter_bulk_records
+from excel_integration import ExcelIntegration
+
+
+def test_jsonl_records_are_normalized():
+    lines = [
+        '{"ОКЭ": "ОКЭ 1", "ФИО": " Иванов ", "unknown": "x"}\n',
+        "\n",
+        "{не json\n",
+        '["массив"]\n',
+    ]
+    records = list(iter_bulk_records(lines, "jsonl"))
+
+    assert records[0] == {"oke": "ОКЭ 1", "fio": "Иванов"}
+    assert isinstance(records[1], ValueError)
+    assert isinstance(records[2], ValueError)
+    assert len(records) == 3
+
+
+def test_csv_records_with_sheet_headers():
+    lines = [
+        "ОКЭ,ФИО,Направление\n",
+        "ОКЭ 2,Петров,Сочи\n",
+        ",,\n",
+        "ОКЭ 3,Сидоров,\n",
+    ]
+    assert list(iter_bulk_records(lines, "csv")) == [
+        {"oke": "ОКЭ 2", "fio": "Петров", "direction": "Сочи"},
+        {"oke": "ОКЭ 3", "fio": "Сидоров", "direction": ""},
+    ]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        iter_bulk_records([], "xml")
+
+
+@pytest.mark.parametrize("store_backend", ["excel", "sqlite", "partitioned"])
+def test_bulk_load_reports_errors_and_writes_valid_rows(tmp_path, store_backend):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="journal", store_backend=store_backend)
+    records = [
+        {"oke": "ОКЭ 1", "fio": "Иванов", "submitted_at": "2026-03-01 10:00:00"},
+        {"oke": "Нет такого", "fio": "Петров"},
+        {"oke": "ОКЭ 2", "fio": ""},
+        {"oke": "ОКЭ 2", "fio": "Сидоров", "submitted_at": "01.03.2026"},
+        ValueError("Некорректный JSON"),
+        "не словарь",
+    ] + [{"oke": "ОКЭ 3", "fio": f"Заявитель {number}"} for number in range(7)]
+
+    result = excel.add_applications_bulk(records, batch_size=3)
+
+    assert result["added"] == 8
+    assert result["failed"] == 5
+    assert result["batches"] == 3
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4, 5, 6]
+
+    applications = list(excel.iter_all_applications())
+    assert len(applications) == 8
+    ids = [int(application["ID заявки"]) for application in applications]
+    assert len(set(ids)) == 8
+    assert all(application["Статус"] == "pending" for application in applications)
+    assert excel.get_applications_count("ОКЭ 3") == 7
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Тесты ширины колонок: инкрементальный учет при записи и пересчет после удаления строк
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from openpyxl import load_workbook
+
+from excel_integration import ExcelIntegration, _ColumnWidthTracker
+from xlsx_appender import set_column_widths
+
+HEADERS = ["Время", "ФИО", "Номер"]
+LONG_NAME = "Очень длинное имя сотрудника для проверки ширины"
+
+
+def _widths(path: str, sheet: str = "ОКЭ 1"):
+    wb = load_workbook(path)
+    try:
+        ws = wb[sheet]
+        return [ws.column_dimensions[letter].width for letter in "ABCDEFGH"]
+    finally:
+        wb.close()
+
+
+def test_tracker_grows_only_on_longer_values():
+    tracker = _ColumnWidthTracker.from_rows([], HEADERS)
+    assert tracker.widths() == [7, 5, 7]
+
+    tracker.update(["2026-01-01 10:00:00", "Ли", None])
+    assert tracker.changed
+    assert tracker.widths() == [21, 5, 7]
+
+    tracker.changed = False
+    tracker.update(["2026", "Ян", "1"])
+    assert not tracker.changed
+
+    tracker.update(["", "x" * 100, ""])
+    assert tracker.widths()[1] == _ColumnWidthTracker.MAX_WIDTH
+
+
+def test_tracker_restores_from_saved_widths():
+    tracker = _ColumnWidthTracker.from_widths([21, None, 9.5], HEADERS)
+    assert tracker.lengths == [19, len("ФИО"), 7]
+
+
+def test_set_column_widths_round_trip(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    dst = str(tmp_path / "widths.xlsx")
+    widths = [float(12 + column) for column in range(8)]
+
+    assert set_column_widths(excel.master_file_path, dst, {"ОКЭ 1": widths}) == ["ОКЭ 1"]
+    assert _widths(dst) == widths
+    # Ширина не изменилась: файл результата не создается
+    assert set_column_widths(dst, str(tmp_path / "same.xlsx"), {"ОКЭ 1": widths}) == []
+    assert not (tmp_path / "same.xlsx").exists()
+
+
+def test_widths_follow_appends_and_shrink_after_archive(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend="excel")
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Короткий", "position": "КВС", "direction": "Сочи",
+         "submitted_at": "2026-05-01 10:00:00"},
+        {"oke": "ОКЭ 1", "fio": LONG_NAME, "position": "КВС", "direction": "Сочи",
+         "submitted_at": "2025-05-01 10:00:00"},
+    ])
+    assert _widths(excel.master_file_path)[1] == len(LONG_NAME) + _ColumnWidthTracker.PADDING
+
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+
+    # Самая длинная строка ушла в архив: колонка сужается до оставшихся значений
+    assert _widths(excel.master_file_path)[1] == len("Короткий") + _ColumnWidthTracker.PADDING
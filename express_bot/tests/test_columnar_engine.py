@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Тесты движка выборок на pandas: результаты совпадают с движком индексов в памяти
+"""
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from application_dataset import ApplicationDataset  # noqa: E402
+from columnar_engine import GROUP_FIELDS  # noqa: E402
+from excel_integration import ExcelIntegration  # noqa: E402
+
+DIRECTIONS = ["Сочи", "Москва", "Санкт-Петербург", "Минеральные Воды", ""]
+
+QUERIES = [
+    {},
+    {"okes": ["ОКЭ 1", "ОКЭ 3"]},
+    {"date_from": "2026-02-01", "date_to": "2026-03-15"},
+    {"date_from": "2026-03-01", "newest_first": True},
+    {"query": "петр"},
+    {"query": "су", "filters": {"status": "approved"}},
+    {"filters": {"position": "бп", "direction": "воды"}},
+    {"okes": ["ОКЭ 2"], "date_to": "2026-02-28", "filters": {"status": "pend"}, "newest_first": True},
+    {"date_from": "не дата"},
+]
+
+
+def _records(count: int, generator: random.Random):
+    return [
+        {"oke": f"ОКЭ {generator.randint(1, 4)}",
+         "fio": generator.choice(["Петров", "Иванова", "Петрова-Сидорова", "Ёлкин"]) + f" {number}",
+         "tab_num": str(number),
+         "position": generator.choice(["КВС", "ВП", "БП", "Бортпроводник"]),
+         "direction": generator.choice(DIRECTIONS),
+         "flight_info": generator.choice(["SU100", "S7 12", ""]),
+         "submitted_at": f"{generator.choice([2025, 2026])}-{generator.randint(1, 3):02d}-"
+                         f"{generator.randint(1, 28):02d} 10:{generator.randint(0, 1):02d}:00"}
+        for number in range(count)
+    ]
+
+
+def _assert_same(index: ExcelIntegration, columnar: ExcelIntegration):
+    for params in QUERIES:
+        for include_archive in (False, True):
+            expected = [app["ID заявки"] for app in index.iter_all_applications(include_archive=include_archive,
+                                                                                 **params)]
+            found = [app["ID заявки"] for app in columnar.iter_all_applications(include_archive=include_archive,
+                                                                                 **params)]
+            assert found == expected, params
+
+        group_params = {key: value for key, value in params.items() if key != "newest_first"}
+        for field in GROUP_FIELDS:
+            assert columnar.group_applications(field, **group_params) == \
+                index.group_applications(field, **group_params), (field, params)
+
+        expected_page = index.search_page(per_page=7, **group_params)
+        found_page = columnar.search_page(per_page=7, **group_params)
+        assert [app["ID заявки"] for app in found_page["applications"]] == \
+            [app["ID заявки"] for app in expected_page["applications"]]
+        assert found_page["total"] == expected_page["total"]
+
+
+def test_engines_agree_across_writes(tmp_path, monkeypatch):
+    calls = []
+    for name in ("select_columnar", "group_columnar"):
+        original = getattr(ApplicationDataset, name)
+        monkeypatch.setattr(ApplicationDataset, name,
+                            lambda self, *args, _name=name, _original=original:
+                            calls.append(_name) or _original(self, *args))
+    generator = random.Random(3)
+    index = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite", query_engine="index")
+    columnar = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite", query_engine="pandas")
+    assert columnar.search.query_engine == "pandas"
+
+    index.add_applications_bulk(_records(150, generator))
+    _assert_same(index, columnar)
+    assert {"select_columnar", "group_columnar"} <= set(calls)
+
+    index.update_application_statuses({app_id: "approved" for app_id in range(1, 151, 4)})
+    columnar.add_applications_bulk(_records(20, generator))
+    _assert_same(index, columnar)
+
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert index.archive_closed_periods([period])["archived"] > 0
+    _assert_same(index, columnar)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Тесты пакетной записи: одновременные заявки сохраняются общими пакетами
+"""
+
+import threading
+
+import pytest
+from openpyxl import load_workbook
+
+from excel_integration import ExcelIntegration, _GroupCommitWriter
+
+
+def test_concurrent_rows_are_committed_in_batches():
+    batches = []
+    writer = _GroupCommitWriter(lambda rows: batches.append(list(rows)), window=0.2, max_rows=30)
+
+    futures = [writer.submit("ОКЭ 1", [str(number)]) for number in range(50)]
+
+    assert all(future.result(timeout=10) for future in futures)
+    assert sorted(int(row[0]) for batch in batches for _, row in batch) == list(range(50))
+    assert max(len(batch) for batch in batches) == 30
+    assert len(batches) < 50
+
+
+def test_commit_error_fails_whole_batch():
+    def fail(rows):
+        raise OSError("диск заполнен")
+
+    writer = _GroupCommitWriter(fail, window=0.1)
+    futures = [writer.submit("ОКЭ 1", [str(number)]) for number in range(3)]
+
+    for future in futures:
+        with pytest.raises(OSError):
+            future.result(timeout=10)
+
+
+def test_group_commit_mode_writes_every_application(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="group_commit", store_backend="excel",
+                             batch_window=0.05)
+    results = []
+
+    def add(number: int):
+        results.append(excel.add_application("ОКЭ 1", f"Заявитель {number}", str(number), "КВС", "Сочи", ""))
+
+    threads = [threading.Thread(target=add, args=(number,)) for number in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 20
+    wb = load_workbook(excel.master_file_path, read_only=True)
+    try:
+        names = [row[1] for row in wb["ОКЭ 1"].iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+    assert sorted(names) == sorted(f"Заявитель {number}" for number in range(20))
+    assert excel.get_applications_count("ОКЭ 1") == 20
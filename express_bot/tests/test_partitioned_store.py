@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Тесты хранилища, разбитого на сегменты по (ОКЭ, месяц подачи)
+"""
+
+import json
+import os
+
+import pytest
+
+from application_store import PartitionedApplicationStore
+from excel_integration import ExcelIntegration
+
+
+def _row(month: str, number: int):
+    return [f"2026-{month}-01 10:00:{number % 60:02d}", f"Заявитель {number}", str(number), "КВС", "Сочи", ""]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PartitionedApplicationStore(str(tmp_path / "partitions"))
+    yield store
+    store.close()
+
+
+def test_rows_are_split_by_oke_and_month(store):
+    ids = store.add_many([("ОКЭ 1", _row("01", 1)), ("ОКЭ 1", _row("02", 2)), ("ОКЭ 2", _row("01", 3))])
+    assert ids == [1, 2, 3]
+    assert store.add("ОКЭ 1", ["без даты", "Заявитель", "", "", "", ""]) == 4
+
+    partitions = {(p["oke"], p["month"]): p["rows"] for p in store.list_partitions()}
+    assert partitions == {("ОКЭ 1", "2026-01"): 1, ("ОКЭ 1", "2026-02"): 1, ("ОКЭ 2", "2026-01"): 1,
+                          ("ОКЭ 1", "unknown"): 1}
+    assert [int(row[6]) for _, row in store.iter_applications()] == [1, 2, 3, 4]
+    assert store.counts_by_oke() == {"ОКЭ 1": 3, "ОКЭ 2": 1}
+    assert store.fingerprint() == 4
+
+
+def test_period_reads_only_matching_partitions(store, monkeypatch):
+    store.add_many([(oke, _row(f"{month:02d}", month)) for month in range(1, 7) for oke in ("ОКЭ 1", "ОКЭ 2")])
+    opened = []
+    original = PartitionedApplicationStore._read_segment
+    monkeypatch.setattr(PartitionedApplicationStore, "_read_segment",
+                        lambda self, partition: opened.append((partition["oke"], partition["month"]))
+                        or original(self, partition))
+
+    rows = list(store.iter_applications(oke="ОКЭ 1", date_from="2026-03-01", date_to="2026-04-30"))
+
+    assert [(oke, row[0][:7]) for oke, row in rows] == [("ОКЭ 1", "2026-03"), ("ОКЭ 1", "2026-04")]
+    assert sorted(opened) == [("ОКЭ 1", "2026-03"), ("ОКЭ 1", "2026-04")]
+
+
+def test_unaccounted_tail_is_ignored_and_truncated(store):
+    store.add("ОКЭ 1", _row("01", 1))
+    partition = store.list_partitions()[0]
+    path = os.path.join(store.root_dir, partition["file"])
+    # Строка, записанная до сбоя, но не попавшая в манифест
+    with open(path, "ab") as f:
+        f.write(json.dumps({"id": 99, "row": _row("01", 99), "status": "pending"}).encode("utf-8") + b"\n")
+
+    assert [row[6] for _, row in store.iter_applications()] == ["1"]
+    store.add("ОКЭ 1", _row("01", 2))
+    assert [row[6] for _, row in store.iter_applications()] == ["1", "2"]
+
+
+def test_statuses_and_remove(store):
+    store.add_many([("ОКЭ 1", _row("01", number)) for number in range(1, 4)])
+
+    assert store.update_statuses({2: "approved", 99: "approved"}) == ([2], 1)
+    assert store.remove([1, 3]) == ([1, 3], 2)
+    assert [(row[6], row[7]) for _, row in store.iter_applications()] == [("2", "approved")]
+
+    reopened = PartitionedApplicationStore(store.root_dir)
+    assert [(row[6], row[7]) for _, row in reopened.iter_applications()] == [("2", "approved")]
+    assert reopened.revision() == 2
+
+
+def test_integration_period_reads_use_partition_pruning(tmp_path, monkeypatch):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="partitioned")
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": f"Заявитель {number}", "submitted_at": f"2026-{1 + number % 6:02d}-10 10:00:00"}
+        for number in range(12)
+    ])
+    opened = []
+    original = PartitionedApplicationStore._read_segment
+    monkeypatch.setattr(PartitionedApplicationStore, "_read_segment",
+                        lambda self, partition: opened.append(partition["month"]) or original(self, partition))
+
+    applications = list(excel.iter_all_applications(date_from="2026-02-01", date_to="2026-02-28",
+                                                     include_archive=False))
+
+    assert len(applications) == 2
+    assert opened == ["2026-02"]
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Тесты индексов поиска: результат индекса совпадает с полным просмотром строк
+"""
+
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from excel_integration import ExcelIntegration
+from search_index import (BitmapIndex, FuzzyNameIndex, QueryResultCache, TimestampIndex, TrigramIndex, bitmap_of,
+                          edit_distances, iter_bits, max_edits, normalize_text)
+
+COLUMNS = [1, 2, 3, 4, 5]
+NAMES = ["Иванов Иван", "Петров-Водкин Кузьма", "Ёлкина Алёна", "Сидоров", "Иваненко Петр"]
+DIRECTIONS = ["Сочи", "Москва", "Санкт-Петербург", "Минеральные Воды", ""]
+
+
+def _rows(count: int):
+    generator = random.Random(7)
+    return [["2026-03-01 10:00:00", generator.choice(NAMES), str(generator.randint(1, 999)),
+             generator.choice(["КВС", "ВП", "БП"]), generator.choice(DIRECTIONS), f"SU{generator.randint(1, 99)}"]
+            for _ in range(count)]
+
+
+def _brute_force(rows, query):
+    query = normalize_text(query.strip())
+    return [row_id for row_id, row in enumerate(rows)
+            if any(query in normalize_text(row[column]) for column in COLUMNS)]
+
+
+@pytest.fixture(scope="module")
+def indexed():
+    rows = _rows(300)
+    index = TrigramIndex(COLUMNS)
+    for row_id, row in enumerate(rows):
+        index.add(row_id, row)
+    return rows, index
+
+
+@pytest.mark.parametrize("query", ["иван", "ИВАН", "ов", "и", "елкин", "Алена", "водкин кузьма",
+                                   "петербург", "су1", "12", "КВС", "нет такого", "  сочи  "])
+def test_search_matches_full_scan(indexed, query):
+    rows, index = indexed
+    assert index.search(query) == _brute_force(rows, query)
+
+
+def test_fields_are_not_joined(indexed):
+    rows, index = indexed
+    # Конец ФИО и начало табельного номера не образуют общей триграммы
+    assert index.search("ван1") == _brute_force(rows, "ван1") == []
+    assert index.search("") == list(range(len(rows)))
+
+
+def test_prefix_search(indexed):
+    rows, index = indexed
+    found = index.search("водкин", prefix=True)
+    assert found and all("Петров-Водкин" in rows[row_id][1] for row_id in found)
+    assert index.search("етров", prefix=True) == []
+    assert index.search("петр", prefix=True) == _brute_force(rows, "петр")
+
+
+def test_candidates_are_superset_of_matches(indexed):
+    rows, index = indexed
+    for query in ("ова", "ин", "воды"):
+        normalized = normalize_text(query)
+        assert set(_brute_force(rows, query)) <= index.candidates(normalized)
+
+
+def test_dataset_query_uses_index(tmp_path, monkeypatch):
+    searched = []
+    original = TrigramIndex.search
+    monkeypatch.setattr(TrigramIndex, "search",
+                        lambda self, query, prefix=False: searched.append(query) or original(self, query, prefix))
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Ёлкин Пётр", "direction": "Сочи"},
+        {"oke": "ОКЭ 2", "fio": "Иванов", "direction": "Москва", "flight_info": "SU100"},
+        {"oke": "ОКЭ 3", "fio": "Петрова", "direction": "Сочи"},
+    ])
+
+    assert sorted(app["ФИО"] for app in excel.iter_all_applications(query="петр")) == ["Ёлкин Пётр", "Петрова"]
+    assert [app["ФИО"] for app in excel.iter_all_applications(query="su10")] == ["Иванов"]
+    assert list(excel.iter_all_applications(query="Казань")) == []
+    assert searched == ["петр", "su10", "Казань"]
+
+
+def _timestamp_items(count: int):
+    """Много заявок в одну секунду (массовая загрузка) вперемешку с другими временами"""
+    generator = random.Random(11)
+    items = []
+    for app_id in generator.sample(range(1, count + 1), count):
+        second = 0 if app_id % 10 else generator.randint(0, 59)
+        items.append((f"2026-03-01 10:00:{second:02d}", app_id))
+    return items + [("не дата", count + 2), ("", count + 1)]
+
+
+def test_timestamp_index_orders_ties_by_id():
+    items = _timestamp_items(5000)
+    built = TimestampIndex()
+    built.rebuild(items)
+    added = TimestampIndex()
+    for row_id, (submitted_at, app_id) in enumerate(items):
+        added.add(row_id, submitted_at, app_id)
+
+    expected = sorted(range(len(items) - 2), key=lambda row_id: (items[row_id][0], items[row_id][1]))
+    undated = [len(items) - 1, len(items) - 2]
+    for index in (built, added):
+        assert index.select() == expected + undated
+        assert index.select(newest_first=True) == expected[::-1] + undated[::-1]
+        assert index.select("2026-03-01", "2026-03-01") == expected
+        assert index.count("2026-03-02") == 0
+
+
+def test_timestamp_index_cursor_inside_ties():
+    items = _timestamp_items(3000)
+    index = TimestampIndex()
+    for row_id, (submitted_at, app_id) in enumerate(items):
+        index.add(row_id, submitted_at, app_id)
+    newest = index.select(newest_first=True)
+
+    for position in (0, 1, 1500, len(newest) - 3, len(newest) - 1):
+        row_id = newest[position]
+        assert list(index.iter_newest(after=items[row_id])) == newest[position + 1:]
+
+
+def test_bitmap_helpers_round_trip():
+    row_ids = [0, 1, 7, 8, 63, 64, 1000, 4095]
+    bitmap = bitmap_of(row_ids)
+    assert bitmap == sum(1 << row_id for row_id in row_ids)
+    assert list(iter_bits(bitmap)) == row_ids
+    assert list(iter_bits(0)) == []
+
+
+def test_bitmap_index_match_and_change():
+    index = BitmapIndex(["oke", "status"])
+    index.rebuild([("ОКЭ 1", "pending"), ("ОКЭ 2", "pending"), ("ОКЭ 1", "approved")])
+    index.add(3, ("ОКЭ 3", "pending"))
+
+    assert list(iter_bits(index.match("oke", values=["ОКЭ 1", "ОКЭ 3"]))) == [0, 2, 3]
+    assert list(iter_bits(index.match("status", substring="PEND"))) == [0, 1, 3]
+
+    index.change("status", 0, "pending", "rejected")
+    index.change("status", 2, "approved", "rejected")
+    assert list(iter_bits(index.match("status", values=["rejected"]))) == [0, 2]
+    assert "approved" not in index.bitmaps["status"]
+
+
+def test_filters_match_full_scan(tmp_path, monkeypatch):
+    matched = []
+    original = BitmapIndex.match
+    monkeypatch.setattr(BitmapIndex, "match",
+                        lambda self, field, values=None, substring=None:
+                        matched.append(field) or original(self, field, values, substring))
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    generator = random.Random(5)
+    excel.add_applications_bulk([
+        {"oke": f"ОКЭ {generator.randint(1, 4)}", "fio": f"Заявитель {number}",
+         "position": generator.choice(["КВС", "ВП", "БП", "Бортпроводник"]),
+         "direction": generator.choice(DIRECTIONS),
+         "submitted_at": f"{generator.choice([2025, 2026])}-03-{1 + number % 28:02d} 10:00:00"}
+        for number in range(200)
+    ])
+    excel.update_application_statuses({app_id: "approved" for app_id in range(1, 201, 3)})
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] > 0
+    everything = list(excel.iter_all_applications(include_archive=True))
+
+    cases = [
+        (None, {"position": "бП"}),
+        (["ОКЭ 1", "ОКЭ 3"], {"direction": "воды"}),
+        (["ОКЭ 2"], {"status": "approved", "position": "квс"}),
+        (None, {"direction": "", "status": "pend"}),
+    ]
+    for okes, filters in cases:
+        expected = [
+            application["ID заявки"] for application in everything
+            if (okes is None or application["oke"] in okes)
+            and all(normalize_text(value) in normalize_text(application[header].strip())
+                    for header, value in (("Должность", filters.get("position")),
+                                          ("Направление", filters.get("direction")),
+                                          ("Статус", filters.get("status"))) if value)
+        ]
+        found = [application["ID заявки"]
+                 for application in excel.iter_all_applications(okes, include_archive=True, filters=filters)]
+        assert sorted(found, key=int) == sorted(expected, key=int)
+        assert found
+    # Рабочие заявки отбираются по битовым картам, архивные - проверкой строк
+    assert {"oke", "position", "direction", "status"} <= set(matched)
+
+
+def test_result_cache_versions_and_eviction():
+    cache = QueryResultCache(capacity=2)
+    cache.put("a", 1, [1, 2])
+    cache.put("b", 1, [3])
+
+    assert cache.get("a", 1) == [1, 2]
+    # Запись другой версии данных не отдается и удаляется
+    assert cache.get("b", 2) is None
+    assert cache.get("b", 1) is None
+    cache.put("b", 2, [4])
+    cache.put("c", 2, [5])
+    # Вытесняется самый давний запрос
+    assert cache.get("a", 1) is None
+    assert (cache.get("b", 2), cache.get("c", 2)) == ([4], [5])
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def _page_names(excel: ExcelIntegration, **params):
+    page = excel.search_page(per_page=50, **params)
+    return sorted(application["ФИО"] for application in page["applications"])
+
+
+def test_search_results_are_cached_and_invalidated(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Петров", "direction": "Сочи", "submitted_at": "2025-05-01 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Петрова", "direction": "Москва", "submitted_at": "2026-03-01 10:00:00"},
+        {"oke": "ОКЭ 3", "fio": "Иванов", "direction": "Сочи", "submitted_at": "2026-03-02 10:00:00"},
+    ])
+    cache = excel.dataset.search_results
+    params = {"query": "  ПЕТР ", "filters": {"status": "pending"}, "include_archive": True}
+
+    assert _page_names(excel, **params) == ["Петров", "Петрова"]
+    hits = cache.hits
+    # Тот же запрос в другой записи (регистр, пробелы) берется из кэша
+    assert _page_names(excel, query="петр", filters={"status": "PENDING"}, include_archive=True) == \
+        ["Петров", "Петрова"]
+    assert cache.hits > hits
+
+    assert excel.add_application("ОКЭ 1", "Петренко", "4", "КВС", "Сочи", "")
+    assert _page_names(excel, **params) == ["Петренко", "Петров", "Петрова"]
+
+    assert excel.update_application_statuses({2: "approved"})["updated"] == [2]
+    assert _page_names(excel, **params) == ["Петренко", "Петров"]
+
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+    assert _page_names(excel, **params) == ["Петренко", "Петров"]
+    assert _page_names(excel, query="петр", filters={"status": "pending"}, include_archive=False) == ["Петренко"]
+
+
+def test_edit_distances_and_limits():
+    assert [max_edits(length) for length in (1, 3, 4, 6, 7, 12)] == [0, 0, 1, 1, 2, 2]
+    assert edit_distances("иванов", "иванов", 1) == (0, 0)
+    assert edit_distances("иваноф", "иванов", 1) == (1, 1)
+    assert edit_distances("сокол", "соколянский", 1) == (2, 0)
+    # Расстояние больше допустимого заменяется на limit + 1
+    assert edit_distances("петров", "сидоров", 1) == (2, 2)
+    assert FuzzyNameIndex.word_score("сокол", "соколянский") == 1
+    assert FuzzyNameIndex.word_score("соколв", "соколов") == 2
+    assert FuzzyNameIndex.word_score("ива", "иво") is None
+
+
+def test_fuzzy_index_matches_matcher():
+    names = ["Иванов Иван", "Иваненко Петр", "Соколянский Олег", "Соколов Иван", "Ёлкина Алёна",
+             "Петров-Водкин Кузьма", "Сидоров"] * 3
+    index = FuzzyNameIndex(0)
+    for row_id, name in enumerate(names):
+        index.add(row_id, [name])
+
+    for query in ("иваноф", "сокол", "елкина алена", "ИВАН ИВАНОВ", "Водкен", "сидор петр", "и", ""):
+        score = FuzzyNameIndex.matcher(query)
+        expected = {row_id: score(name) for row_id, name in enumerate(names) if score(name) is not None}
+        assert index.search(query) == expected, query
+
+    assert {names[row_id] for row_id in index.search("иваноф")} == {"Иванов Иван"}
+    found = index.search("сокол")
+    assert {names[row_id] for row_id in found} == {"Соколянский Олег", "Соколов Иван"}
+
+
+def test_fuzzy_search_page_ranks_and_pages(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), store_backend="sqlite")
+    excel.add_applications_bulk([
+        {"oke": "ОКЭ 1", "fio": "Соколов Петр", "submitted_at": "2026-03-01 10:00:00"},
+        {"oke": "ОКЭ 2", "fio": "Соколянский Олег", "submitted_at": "2026-03-02 10:00:00"},
+        {"oke": "ОКЭ 1", "fio": "Сокол Иван", "submitted_at": "2026-03-03 10:00:00"},
+        {"oke": "ОКЭ 3", "fio": "Соколова Анна", "submitted_at": "2025-05-01 10:00:00"},
+        {"oke": "ОКЭ 3", "fio": "Петров", "submitted_at": "2026-03-04 10:00:00"},
+    ])
+    period = SimpleNamespace(id="2025", name="2025", start_date=datetime(2025, 1, 1),
+                             end_date=datetime(2025, 12, 31, 23, 59, 59))
+    assert excel.archive_closed_periods([period])["archived"] == 1
+
+    page = excel.search_page(query="сокол", fuzzy=True, include_archive=True, per_page=50)
+    # Целое слово выше начала слова; при равной оценке - новые, архивные сливаются по оценке
+    assert [application["ФИО"] for application in page["applications"]] == [
+        "Сокол Иван", "Соколянский Олег", "Соколов Петр", "Соколова Анна"]
+    assert page["total"] == 4
+    assert page["next_cursor"] is None
+
+    names = []
+    cursor = None
+    while True:
+        page = excel.search_page(query="сокол", fuzzy=True, include_archive=True, per_page=1, cursor=cursor)
+        names.extend(application["ФИО"] for application in page["applications"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["Сокол Иван", "Соколянский Олег", "Соколов Петр", "Соколова Анна"]
+
+    assert [application["ФИО"] for application in
+            excel.search_page(query="саколов", fuzzy=True, per_page=50)["applications"]] == ["Соколов Петр"]
+    with pytest.raises(ValueError):
+        excel.search_page(query="сокол", fuzzy=True, cursor="не курсор")
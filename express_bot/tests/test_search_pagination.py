@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Тесты постраничного поиска: курсор продолжения не теряет и не повторяет заявки при параллельной записи
+"""
+
+import threading
+
+import pytest
+
+from excel_integration import ExcelIntegration
+
+
+def _records(count: int, month: int = 1, fio: str = "Иванов"):
+    # Много заявок с одинаковым временем подачи: порядок внутри секунды задает идентификатор
+    return [
+        {
+            "oke": f"ОКЭ {1 + number % 3}",
+            "fio": fio,
+            "tab_num": str(number),
+            "position": "КВС" if number % 2 else "БП",
+            "direction": "Сочи",
+            "flight_info": "",
+            "submitted_at": f"2026-{month:02d}-{1 + number % 20:02d} 10:00:00"
+        }
+        for number in range(count)
+    ]
+
+
+def _key(application: dict):
+    return application["Время подачи заявки"], int(application["ID заявки"])
+
+
+@pytest.fixture(params=["excel", "sqlite"])
+def excel(request, tmp_path):
+    integration = ExcelIntegration(data_dir=str(tmp_path), write_mode="direct", store_backend=request.param)
+    assert integration.add_applications_bulk(_records(120, month=3))["added"] == 120
+    return integration
+
+
+def _page_through(excel: ExcelIntegration, per_page: int, between_pages=None, **conditions):
+    applications = []
+    cursor = None
+    while True:
+        result = excel.search_page(cursor=cursor, per_page=per_page, **conditions)
+        applications.extend(result["applications"])
+        cursor = result["next_cursor"]
+        if not cursor:
+            return applications
+        if between_pages is not None:
+            between_pages()
+
+
+def test_cursor_pages_match_full_ordering(excel):
+    expected = sorted(excel.iter_all_applications(newest_first=True), key=_key, reverse=True)
+    pages = _page_through(excel, per_page=17)
+    assert [_key(application) for application in pages] == [_key(application) for application in expected]
+
+    filtered = _page_through(excel, per_page=7, filters={"position": "кв"})
+    assert len(filtered) == 60
+    assert all(application["Должность"] == "КВС" for application in filtered)
+
+
+def test_cursor_continuity_under_inserts(excel):
+    initial = {application["ID заявки"] for application in excel.iter_all_applications()}
+    inserted = iter(range(10))
+
+    def insert():
+        number = next(inserted, None)
+        if number is None:
+            return
+        # Новые заявки попадают и до, и после позиции курсора
+        excel.add_applications_bulk(_records(2, month=1 + number % 2 * 5, fio="Новый"))
+
+    pages = _page_through(excel, per_page=10, between_pages=insert)
+    ids = [application["ID заявки"] for application in pages]
+    keys = [_key(application) for application in pages]
+
+    assert len(ids) == len(set(ids))
+    assert initial <= set(ids)
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_cursor_continuity_under_concurrent_writer(excel):
+    initial = {application["ID заявки"] for application in excel.iter_all_applications()}
+    done = threading.Event()
+
+    def write():
+        month = 1
+        while not done.is_set():
+            excel.add_applications_bulk(_records(3, month=month, fio="Иванов Параллельный"))
+            month = 6 if month == 1 else 1
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        pages = _page_through(excel, per_page=5, query="иванов")
+    finally:
+        done.set()
+        writer.join()
+
+    ids = [application["ID заявки"] for application in pages]
+    assert len(ids) == len(set(ids))
+    assert initial <= set(ids)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тесты выбора процесса-писателя и пересылки ему записей между двумя процессами
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import write_coordinator
+from write_coordinator import WriteCoordinator
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(write_coordinator.__file__))
+
+# Второй процесс: становится писателем, отвечает своим pid и ждет закрытия stdin
+WRITER_SCRIPT = """
+import os, sys, time
+sys.path.insert(0, sys.argv[1])
+from write_coordinator import WriteCoordinator
+coordinator = WriteCoordinator(sys.argv[2])
+coordinator.register("whoami", lambda: os.getpid())
+coordinator.register("add", lambda a, b: a + b)
+while not coordinator.is_writer():
+    time.sleep(0.01)
+print("ready", flush=True)
+sys.stdin.read()
+coordinator.close()
+"""
+
+
+def _wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_writes_are_forwarded_to_writer_and_failover(tmp_path):
+    base_path = str(tmp_path / "master.xlsx")
+    writer = subprocess.Popen([sys.executable, "-c", WRITER_SCRIPT, BACKEND_DIR, base_path],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    coordinator = None
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+
+        coordinator = WriteCoordinator(base_path)
+        coordinator.register("whoami", lambda: os.getpid())
+        coordinator.register("add", lambda a, b: a + b)
+        promoted = []
+        coordinator.on_promoted("test", lambda: promoted.append(os.getpid()))
+        assert not coordinator.is_writer()
+        assert promoted == []
+
+        # Записи выполняет процесс-писатель, номер последовательности общий
+        assert coordinator.submit("whoami") == writer.pid
+        assert coordinator.submit("add", a=2, b=3) == 5
+        assert coordinator.last_sequence() == 2
+
+        # Писатель завершился: его место занимает ожидающий процесс
+        writer.stdin.close()
+        assert writer.wait(timeout=10) == 0
+        assert _wait_until(coordinator.is_writer)
+        assert promoted == [os.getpid()]
+        assert coordinator.submit("whoami") == os.getpid()
+        assert coordinator.last_sequence() == 3
+    finally:
+        if writer.poll() is None:
+            writer.kill()
+            writer.wait()
+        if coordinator is not None:
+            coordinator.close()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Тесты правки XLSX на уровне zip-архива: результат должен читаться openpyxl так же, как после его сохранения
+"""
+
+import os
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from xlsx_appender import RowRemovals, XlsxAppendUnsupported, append_rows, remove_rows
+
+HEADERS = ["Время подачи заявки", "ФИО", "Табельный номер", "Должность",
+           "Направление", "Информация о рейсе", "ID заявки", "Статус"]
+ID_INDEX = HEADERS.index("ID заявки")
+
+
+def _row(number: int, status: str = "pending"):
+    return [f"2026-01-{number:02d} 10:00:00", f"Заявитель {number}", str(number), "КВС", "Сочи",
+            f"Рейс {number}", str(number), status]
+
+
+def _read(path: str):
+    """Строки листов, как их видит openpyxl"""
+    wb = load_workbook(path)
+    try:
+        return {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Мастер-файл в формате openpyxl: два листа с заголовком и строками, ID записаны числами"""
+    path = str(tmp_path / "master.xlsx")
+    wb = Workbook()
+    sheets = [wb.active, wb.create_sheet("ОКЭ 2")]
+    sheets[0].title = "ОКЭ 1"
+    for ws in sheets:
+        ws.append(HEADERS)
+    for number in range(1, 11):
+        values = _row(number)
+        values[ID_INDEX] = number
+        sheets[number % 2].append(values)
+    wb.save(path)
+    return path
+
+
+def test_append_rows_round_trip(workbook, tmp_path):
+    dst = str(tmp_path / "appended.xlsx")
+    before = _read(workbook)
+    new_rows = [
+        ("ОКЭ 1", _row(21)),
+        ("ОКЭ 2", _row(22)),
+        ("ОКЭ 1", ["2026-01-23", "Кавычки \"<&>\"", "", "", "", "", "23", ""])
+    ]
+
+    last_rows = append_rows(workbook, dst, new_rows, len(HEADERS))
+
+    after = _read(dst)
+    assert last_rows == {"ОКЭ 1": len(before["ОКЭ 1"]) + 2, "ОКЭ 2": len(before["ОКЭ 2"]) + 1}
+    assert after["ОКЭ 1"][:len(before["ОКЭ 1"])] == before["ОКЭ 1"]
+    assert after["ОКЭ 1"][-2] == _row(21)
+    # Пустые значения openpyxl читает как отсутствующие ячейки
+    assert after["ОКЭ 1"][-1] == ["2026-01-23", "Кавычки \"<&>\"", None, None, None, None, "23", None]
+    assert after["ОКЭ 2"][-1] == _row(22)
+
+
+def test_append_rows_unknown_sheet(workbook, tmp_path):
+    with pytest.raises(XlsxAppendUnsupported):
+        append_rows(workbook, str(tmp_path / "missing.xlsx"), [("Нет такого листа", _row(1))], len(HEADERS))
+
+
+def test_remove_rows_shifts_following_rows(workbook, tmp_path):
+    dst = str(tmp_path / "removed.xlsx")
+    before = _read(workbook)
+
+    removed = remove_rows(workbook, dst, RowRemovals(ID_INDEX, {"3", "4", "10", "999"}))
+
+    assert removed == {"ОКЭ 1": 2, "ОКЭ 2": 1}
+    after = _read(dst)
+    for sheet, rows in before.items():
+        assert after[sheet] == [row for row in rows if row[ID_INDEX] not in (3, 4, 10)]
+
+    wb = load_workbook(dst)
+    try:
+        for ws in wb.worksheets:
+            assert ws.max_row == len(after[ws.title])
+            for row_number, row in enumerate(ws.iter_rows(), 1):
+                assert all(cell.row == row_number for cell in row)
+    finally:
+        wb.close()
+
+
+def test_remove_rows_without_matches_keeps_file(workbook, tmp_path):
+    dst = str(tmp_path / "untouched.xlsx")
+    assert remove_rows(workbook, dst, RowRemovals(ID_INDEX, {"999"})) == {}
+    assert not os.path.exists(dst)
+
+
+def test_remove_rows_rejects_formulas(workbook, tmp_path):
+    wb = load_workbook(workbook)
+    wb["ОКЭ 1"]["J2"] = "=1+1"
+    wb.save(workbook)
+
+    with pytest.raises(XlsxAppendUnsupported):
+        remove_rows(workbook, str(tmp_path / "formula.xlsx"), RowRemovals(ID_INDEX, {"2"}))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Тесты потокового читателя XLSX: значения должны совпадать со str() значений openpyxl
+"""
+
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from excel_integration import ExcelIntegration, _stat_signature
+from xlsx_reader import FastXlsxReader
+
+COLUMNS = 6
+
+
+def _openpyxl_rows(path: str, sheet: str, min_row: int = 1):
+    wb = load_workbook(path)
+    try:
+        return [[str(value) if value is not None else "" for value in values]
+                for values in wb[sheet].iter_rows(min_row=min_row, max_col=COLUMNS, values_only=True)]
+    finally:
+        wb.close()
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Книга openpyxl с общими строками, числами, датами, пропусками и лишними колонками"""
+    path = str(tmp_path / "book.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ОКЭ 1"
+    ws.append(["Время", "ФИО", "Номер", "Доля", "Флаг", "Комментарий"])
+    ws.append([datetime(2026, 3, 1, 10, 30), "Иванов", 12, 1.5, True, "Спецсимволы <&> \"кавычки\""])
+    ws.append(["2026-03-02 10:00:00", "Иванов", 12345678901, 2e-05, False, None])
+    ws.append(["2026-03-03 10:00:00", None, None, 3.0, None, "последняя колонка", "лишняя"])
+    wb.create_sheet("ОКЭ 2").append(["Только заголовок"])
+    wb.save(path)
+    return path
+
+
+def test_rows_match_openpyxl(workbook):
+    with FastXlsxReader(workbook) as reader:
+        assert reader.sheetnames == ["ОКЭ 1", "ОКЭ 2"]
+        rows = list(reader.iter_rows("ОКЭ 1", COLUMNS))
+        assert list(reader.iter_rows("ОКЭ 2", COLUMNS)) == [["Только заголовок"] + [""] * (COLUMNS - 1)]
+
+    assert rows == _openpyxl_rows(workbook, "ОКЭ 1")
+    assert rows[1][0] == "2026-03-01 10:30:00"
+    assert rows[3][1:3] == ["", ""]
+
+
+def test_min_row_skips_header(workbook):
+    with FastXlsxReader(workbook) as reader:
+        rows = list(reader.iter_rows("ОКЭ 1", COLUMNS, min_row=2))
+    assert rows == _openpyxl_rows(workbook, "ОКЭ 1", min_row=2)
+
+
+def test_unknown_sheet(workbook):
+    with FastXlsxReader(workbook) as reader:
+        with pytest.raises(KeyError):
+            list(reader.iter_rows("Нет такого листа", COLUMNS))
+
+
+def test_master_file_parsers_agree(tmp_path):
+    excel = ExcelIntegration(data_dir=str(tmp_path), write_mode="journal", store_backend="excel")
+    for number in range(5):
+        assert excel.add_application(f"ОКЭ {1 + number % 3}", f"Заявитель {number}", str(number),
+                                     "КВС", "Сочи", "рейс & <пересадка>")
+    excel.compact_journal()
+    source = _stat_signature(excel.master_file_path)
+
+    fast = excel._parse_workbook_fast(source)
+
+    assert fast == excel._parse_workbook_openpyxl(source)
+    assert fast.generation is not None
+    assert sum(len(rows) for rows in fast.rows.values()) == 5